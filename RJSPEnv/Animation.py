@@ -0,0 +1,108 @@
+import os
+import shutil
+import subprocess
+import numpy as np
+
+# render(mode="rgb_array") frame을 받아 GIF / MP4로 바로 encoding하는 writer
+# frame을 메모리에 모아두지 않고 write_frame 할 때마다 파일에 기록한다
+#   .gif : Pillow의 GIF frame encoder로 frame마다 block을 이어 쓴다
+#   .mp4 : ffmpeg process의 stdin으로 raw frame을 흘려보낸다 (ffmpeg 필요)
+
+
+class GanttAnimationWriter():
+    def __init__(self, path, fps=4, loop=0):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.format = os.path.splitext(path)[1].lower()
+        if self.format not in (".gif", ".mp4"):
+            raise ValueError(f"Unsupported animation format : {self.format}")
+        self.num_frames = 0
+        self.frame_shape = None
+        self._file = None
+        self._process = None
+        self._previous_frame = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write_frame(self, frame):
+        frame = np.ascontiguousarray(frame[..., :3], dtype=np.uint8)
+        if self.frame_shape is None:
+            self.frame_shape = frame.shape
+            self._open(frame)
+        elif frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape changed from {self.frame_shape} to {frame.shape}")
+
+        if self.format == ".gif":
+            self._write_gif_frame(frame)
+        else:
+            self._process.stdin.write(frame.tobytes())
+        self.num_frames += 1
+
+    def _open(self, frame):
+        if self.format == ".gif":
+            self._file = open(self.path, "wb")
+            return
+
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("MP4 export requires ffmpeg on PATH")
+        height, width = frame.shape[:2]
+        self._process = subprocess.Popen([
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(self.fps), "-i", "-",
+            # yuv420p는 짝수 해상도가 필요하다
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p", "-vcodec", "libx264", self.path,
+        ], stdin=subprocess.PIPE)
+
+    def _write_gif_frame(self, frame):
+        from PIL import Image, GifImagePlugin
+
+        duration = int(1000 / self.fps)
+        if self.num_frames == 0:
+            image = Image.fromarray(frame).convert("P", palette=Image.Palette.ADAPTIVE, colors=256)
+            header, _ = GifImagePlugin.getheader(image)
+            for block in header:
+                self._file.write(block)
+            # NETSCAPE2.0 loop extension
+            self._file.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + self.loop.to_bytes(2, "little") + b"\x00")
+            blocks = GifImagePlugin.getdata(image, duration=duration)
+        else:
+            # 이전 frame과 달라진 영역만 offset을 줘서 기록한다
+            changed = np.any(frame != self._previous_frame, axis=-1)
+            rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+            if len(rows) == 0:
+                rows, cols = np.array([0]), np.array([0])
+            top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+            image = Image.fromarray(frame[top:bottom, left:right]).convert("P", palette=Image.Palette.ADAPTIVE, colors=256)
+            blocks = GifImagePlugin.getdata(image, offset=(int(left), int(top)), duration=duration, include_color_table=True)
+        for block in blocks:
+            self._file.write(block)
+        self._previous_frame = frame
+
+    def close(self):
+        if self._file is not None:
+            self._file.write(b";")
+            self._file.close()
+            self._file = None
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process = None
+
+
+def save_episode_animation(env, select_action, path, fps=4):
+    # select_action(env, observation) -> action 으로 episode를 진행하면서 step마다 frame을 기록한다
+    observation, _ = env.reset()
+    with GanttAnimationWriter(path, fps=fps) as writer:
+        writer.write_frame(env.render(mode="rgb_array"))
+        while True:
+            observation, reward, terminated, truncated, info = env.step(select_action(env, observation))
+            writer.write_frame(env.render(mode="rgb_array"))
+            if terminated or truncated:
+                break
+    return writer.num_frames
@@ -0,0 +1,108 @@
+import itertools
+import math
+
+from RJSPEnv.Scheduler import type_encoding
+
+# makespan / deadline 초과 시간 / final cost의 lower bound
+# _calculate_target_time (전체 duration / 머신 수)과 달리 머신 ability, job 선후관계, earliest start를 고려한다
+#
+# makespan
+#   1. job chain : repeat 하나는 release + operation duration 합보다 빨리 끝날 수 없다
+#   2. type capacity : type 집합 S의 operation은 S 중 하나라도 처리할 수 있는 머신 N(S)에서만 돌 수 있으므로
+#      min release(S) + (S의 duration 합) / |N(S)| 보다 빨리 끝날 수 없다 (type이 적으면 모든 부분집합, 많으면 1개 / 2개 / 전체)
+# deadline 초과 시간 : 아래 두 relaxation 중 큰 값
+#   1. repeat별 (release + chain 길이 - deadline)의 양수 부분 합 (다른 repeat과 경쟁하지 않는다)
+#   2. k번째로 빨리 끝나는 repeat의 완료 시각은 (k번째로 작은 release + chain)과
+#      (min release + 가장 작은 repeat k개의 duration 합 / 머신 수) 이상이다 (operation을 나눠서 모든 머신에 흘려보내는 relaxation)
+#      이 완료 시각 하한과 deadline을 각각 정렬해서 짝지은 초과 시간 합은 어떤 배정보다도 작다
+# hole 시간 : 0, processing 시간 : 모든 operation duration 합 (머신과 관계없이 고정)
+#
+# 같은 (instance, repeats)는 다시 계산하지 않는다 (_BOUND_CACHE)
+
+MAX_SUBSET_TYPES = 12  # type 수가 이 이하이면 모든 type 부분집합을 본다
+
+_BOUND_CACHE = {}
+
+
+def _type_sets(types):
+    types = sorted(types)
+    if len(types) <= MAX_SUBSET_TYPES:
+        return [subset for size in range(1, len(types) + 1) for subset in itertools.combinations(types, size)]
+    return [(t, ) for t in types] + list(itertools.combinations(types, 2)) + [tuple(types)]
+
+
+def compute_lower_bounds(jobs, machines, repeats):
+    # jobs / machines : RJSPEnv._load_jobs_repeat / _load_machines 형식, repeats : job별 반복 횟수
+    machine_abilities = [{type_encoding(ability) for ability in machine['ability']} for machine in machines]
+
+    chain_makespan = 0
+    time_exceeded = 0
+    repeat_ends, repeat_works, deadlines, releases = [], [], [], []
+    up_time = 0
+    work_per_type = {}
+    release_per_type = {}
+    for job, repeat in zip(jobs, repeats):
+        release = job['operations'][0]['earliest_start'] or 0
+        chain = sum(operation['duration'] for operation in job['operations'])
+        chain_makespan = max(chain_makespan, release + chain) if repeat > 0 else chain_makespan
+        for deadline in job['deadline'][:repeat]:
+            time_exceeded += max(0, release + chain - deadline)
+            repeat_ends.append(release + chain)
+            repeat_works.append(chain)
+            deadlines.append(deadline)
+            releases.append(release)
+        up_time += chain * repeat
+        for operation in job['operations']:
+            operation_type = type_encoding(operation['type'])
+            work_per_type[operation_type] = work_per_type.get(operation_type, 0) + operation['duration'] * repeat
+            release_per_type[operation_type] = min(release_per_type.get(operation_type, release), release)
+
+    if deadlines:
+        min_release = min(releases)
+        cumulative_work = list(itertools.accumulate(sorted(repeat_works)))
+        completion_bounds = [max(end, min_release + math.ceil(work / len(machines))) for end, work in zip(sorted(repeat_ends), cumulative_work)]
+        sorted_time_exceeded = sum(max(0, completion - deadline) for completion, deadline in zip(completion_bounds, sorted(deadlines)))
+        time_exceeded = max(time_exceeded, sorted_time_exceeded)
+
+    capacity_makespan = 0
+    for type_set in _type_sets(work_per_type):
+        num_machines = sum(1 for ability in machine_abilities if ability.intersection(type_set))
+        if num_machines == 0:
+            continue
+        work = sum(work_per_type[t] for t in type_set)
+        release = min(release_per_type[t] for t in type_set)
+        capacity_makespan = max(capacity_makespan, release + math.ceil(work / num_machines))
+
+    return {
+        'makespan': max(chain_makespan, capacity_makespan),
+        'makespan_chain': chain_makespan,
+        'makespan_capacity': capacity_makespan,
+        'time_exceeded': time_exceeded,
+        'hole_time': 0,
+        'up_time': up_time,
+    }
+
+
+def instance_lower_bounds(jobs, machines, repeats, instance_key=None):
+    # instance_key (예: config 경로 쌍)가 있으면 (instance_key, repeats) 단위로 cache 한다
+    if instance_key is None:
+        return compute_lower_bounds(jobs, machines, repeats)
+    key = (instance_key, tuple(int(repeat) for repeat in repeats))
+    if key not in _BOUND_CACHE:
+        _BOUND_CACHE[key] = compute_lower_bounds(jobs, machines, repeats)
+    return _BOUND_CACHE[key]
+
+
+def lower_bound_cost(bounds, cost_deadline_per_time, cost_hole_per_time, cost_processing_per_time, cost_makespan_per_time):
+    # customRepeatableScheduler.cal_final_cost와 같은 식에 lower bound를 넣는다
+    return (
+        bounds['time_exceeded'] / 100 * cost_deadline_per_time
+        + bounds['hole_time'] * cost_hole_per_time / 100
+        + bounds['up_time'] * cost_processing_per_time / 100
+        + bounds['makespan'] * cost_makespan_per_time / 100
+    )
+
+
+def optimality_gap(cost, lower_bound):
+    # (cost - lower bound) / lower bound
+    return (cost - lower_bound) / lower_bound if lower_bound > 0 else float('inf')
@@ -0,0 +1,25 @@
+import numpy as np
+from sb3_contrib.common.maskable.buffers import MaskableDictRolloutBuffer
+
+# observation_mode="compact"용 MaskablePPO rollout buffer
+# SB3의 DictRolloutBuffer는 observation space의 dtype과 관계없이 모든 key를 float32로,
+# action mask도 float32로 저장하므로 compact observation을 넣어도 buffer 크기는 그대로다
+# 이 buffer는 observation은 observation space의 dtype으로, action mask는 bool로 저장한다
+# (mini-batch를 만들 때 policy의 preprocess_obs가 float로 바꾸므로 학습 결과는 같다)
+#
+#   model = MaskablePPO("MultiInputPolicy", env, rollout_buffer_class=CompactMaskableDictRolloutBuffer)
+
+
+class CompactMaskableDictRolloutBuffer(MaskableDictRolloutBuffer):
+    def reset(self):
+        # np.zeros는 page를 건드리기 전까지 실제로 메모리를 잡지 않으므로 부모가 만든 float32 배열은 바로 교체해도 된다
+        super().reset()
+        for key, space in self.observation_space.spaces.items():
+            self.observations[key] = np.zeros((self.buffer_size, self.n_envs, *self.obs_shape[key]), dtype=space.dtype)
+        self.action_masks = np.ones((self.buffer_size, self.n_envs, self.mask_dims), dtype=bool)
+
+
+def rollout_buffer_nbytes(buffer):
+    # rollout buffer가 observation과 action mask 저장에 쓰는 byte 수
+    observations = buffer.observations.values() if isinstance(buffer.observations, dict) else [buffer.observations]
+    return sum(array.nbytes for array in observations) + buffer.action_masks.nbytes
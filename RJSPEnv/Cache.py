@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+from RJSPEnv.Env import ENV_VERSION
+from RJSPEnv.Rescore import COST_WEIGHT_NAMES, DEFAULT_COST_WEIGHTS, ScheduleBatch, ScheduleRecord
+
+# episode 평가 결과 on-disk cache
+# key = sha256(model zip 내용, jobs / machines JSON 내용, current_repeats, cost parameter, seed, env kwargs, ENV_VERSION)
+# entry 하나 = <key>.npz (ScheduleRecord 배열 + KPI row JSON)
+# 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 entry부터 지운다 (사용 시각 = 파일 mtime)
+#
+#   cache = EvaluationCache("~/.cache/rjsp-eval")
+#   key = cache.make_key(checkpoint, machine_config_path, job_config_path, repeats, seed, env_kwargs)
+#   hit = cache.get(key)          # (row, ScheduleRecord) 또는 None
+#   cache.put(key, row, ScheduleRecord.from_scheduler(env.custom_scheduler))
+
+ENTRY_SUFFIX = ".npz"
+RECORD_FIELDS = ScheduleBatch.OPERATION_FIELDS + ScheduleBatch.REPEAT_FIELDS
+RECORD_SCALARS = ("num_machines", "profit_time")
+
+
+def _cost_params(env_kwargs):
+    # env_kwargs에 없는 cost parameter는 RJSPEnv 기본값
+    return {name: env_kwargs.get(name, default) for name, default in zip(COST_WEIGHT_NAMES, DEFAULT_COST_WEIGHTS)}
+
+
+class EvaluationCache():
+    def __init__(self, cache_dir, max_bytes=256 * 2**20):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.file_hashes = {}  # (path, size, mtime) -> sha256, 같은 model zip을 매번 다시 읽지 않는다
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+        self.hits = 0
+        self.misses = 0
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # 다른 process가 방금 지운 entry
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self.file_hashes:
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(2**20), b""):
+                    digest.update(chunk)
+            self.file_hashes[memo_key] = digest.hexdigest()
+        return self.file_hashes[memo_key]
+
+    def make_key(self, checkpoint, machine_config_path, job_config_path, current_repeats, seed, env_kwargs=None):
+        # checkpoint가 파일이 아니면 (예: "rule:edd") 이름 자체를 key에 쓴다
+        env_kwargs = dict(env_kwargs or {})
+        payload = {
+            "model": self.file_hash(checkpoint) if os.path.isfile(checkpoint) else checkpoint,
+            "machines": self.file_hash(machine_config_path),
+            "jobs": self.file_hash(job_config_path),
+            "current_repeats": [int(repeat) for repeat in current_repeats],
+            "cost_params": _cost_params(env_kwargs),
+            "seed": seed,
+            "env_kwargs": {name: value for name, value in env_kwargs.items() if name not in COST_WEIGHT_NAMES},
+            "env_version": ENV_VERSION,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (FileNotFoundError, OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # LRU용 사용 시각 갱신
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        row = json.loads(str(arrays.pop("row")))
+        scalars = {name: int(arrays.pop(name)) for name in RECORD_SCALARS}
+        return row, ScheduleRecord(**arrays, **scalars)
+
+    def put(self, key, row, record):
+        # 같은 directory에 임시 파일로 쓰고 os.replace로 교체한다 (여러 process가 써도 깨진 entry가 보이지 않는다)
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        arrays = {name: getattr(record, name) for name in RECORD_FIELDS + RECORD_SCALARS}
+        with open(temp_path, "wb") as file:
+            np.savez(file, row=np.array(json.dumps(row)), **arrays)
+        previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(temp_path, path)
+        self.total_bytes += os.path.getsize(path) - previous_size
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes=None):
+        # 오래 사용하지 않은 entry부터 지워서 max_bytes 이하로 맞춘다
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total_bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total_bytes <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+        self.total_bytes = total_bytes
+        return total_bytes
+
+    def clear(self):
+        return self.evict(max_bytes=0)
@@ -0,0 +1,220 @@
+import bisect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import numpy as np
+from gymnasium import spaces
+
+from RJSPEnv.Env import RJSPEnv
+from RJSPEnv.Heuristics import dispatch_action
+
+# MaskablePPO warm-start를 위한 behaviour cloning dataset 생성
+# dispatching rule로 RJSPEnv를 process pool에서 돌리고
+# (observation-v4, action mask, action, return) sample을 shard 단위 .npy 파일로 저장한다
+#
+# output_dir/
+#   manifest.json
+#   shard-000-00000/ obs.<key>.npy, action_mask.npy, action.npy, return.npy, episode.npy
+#   ...
+# 모든 파일은 np.load(mmap_mode="r")로 열 수 있어 전체를 메모리에 올리지 않는다
+
+MANIFEST_NAME = "manifest.json"
+FLAT_OBSERVATION_KEY = "observation"  # flatten_observation=True 인 env의 obs.<key>
+
+
+def _action_mask_size(action_space):
+    if isinstance(action_space, spaces.MultiDiscrete):
+        return int(np.sum(action_space.nvec))
+    return int(action_space.n)
+
+
+def _observation_spaces(observation_space):
+    if isinstance(observation_space, spaces.Dict):
+        return observation_space.spaces
+    return {FLAT_OBSERVATION_KEY: observation_space}
+
+
+class _ShardWriter():
+    def __init__(self, output_dir, worker_id, observation_space, action_space, shard_size):
+        self.output_dir = output_dir
+        self.worker_id = worker_id
+        self.shard_size = shard_size
+        self.fields = {f"obs.{key}": (space.shape, space.dtype) for key, space in _observation_spaces(observation_space).items()}
+        self.fields["action_mask"] = ((_action_mask_size(action_space), ), np.dtype(bool))
+        self.fields["action"] = (action_space.shape, np.dtype(np.int64))
+        self.fields["return"] = ((), np.dtype(np.float32))
+        self.fields["episode"] = ((), np.dtype(np.int64))
+        self.buffers = {name: np.zeros((shard_size, ) + shape, dtype=dtype) for name, (shape, dtype) in self.fields.items()}
+        self.count = 0
+        self.shards = []
+
+    def add_episode(self, episode, samples, returns):
+        for (observation, action_mask, action), episode_return in zip(samples, returns):
+            if not isinstance(observation, dict):
+                observation = {FLAT_OBSERVATION_KEY: observation}
+            for key, value in observation.items():
+                self.buffers[f"obs.{key}"][self.count] = value
+            self.buffers["action_mask"][self.count] = action_mask
+            self.buffers["action"][self.count] = action
+            self.buffers["return"][self.count] = episode_return
+            self.buffers["episode"][self.count] = episode
+            self.count += 1
+            if self.count == self.shard_size:
+                self.flush()
+
+    def flush(self):
+        if self.count == 0:
+            return
+        name = f"shard-{self.worker_id:03d}-{len(self.shards):05d}"
+        shard_dir = os.path.join(self.output_dir, name)
+        os.makedirs(shard_dir, exist_ok=True)
+        for field, buffer in self.buffers.items():
+            np.save(os.path.join(shard_dir, f"{field}.npy"), buffer[:self.count])
+        self.shards.append({"name": name, "count": self.count})
+        self.count = 0
+
+
+def _samples_per_shard(observation_space, action_space, shard_bytes):
+    sample_bytes = sum(int(np.prod(space.shape)) * space.dtype.itemsize for space in _observation_spaces(observation_space).values())
+    sample_bytes += _action_mask_size(action_space) + 8 * int(np.prod(action_space.shape)) + 4 + 8
+    return max(1, shard_bytes // sample_bytes)
+
+
+def _rollout_worker(task):
+    worker_id, episodes, config = task
+    rng = np.random.default_rng(config["seed"] + worker_id)
+    env = RJSPEnv(config["machine_config_path"], config["job_config_path"], config["job_repeats_params"], **config["env_kwargs"])
+    writer = _ShardWriter(config["output_dir"], worker_id, env.observation_space, env.action_space, config["shard_size"])
+    rules = config["rules"]
+    gamma = config["gamma"]
+
+    for episode in episodes:
+        rule = rules[episode % len(rules)]
+        observation, _ = env.reset(seed=config["seed"] + episode)
+        samples, rewards = [], []
+        while True:
+            # schedule_heatmap 등은 scheduler가 step마다 in-place로 갱신하는 배열이므로 step 전에 복사해 둔다
+            if isinstance(observation, dict):
+                observation = {key: np.array(value) for key, value in observation.items()}
+            else:
+                observation = np.array(observation)
+            action_mask = env.action_masks().copy()
+            action = dispatch_action(env, rule, rng, epsilon=config["epsilon"])
+            next_observation, reward, terminated, truncated, _ = env.step(action)
+            samples.append((observation, action_mask, action))
+            rewards.append(reward)
+            observation = next_observation
+            if terminated or truncated:
+                break
+
+        # gamma로 할인한 return-to-go
+        returns = np.zeros(len(rewards), dtype=np.float64)
+        running = 0.0
+        for t in reversed(range(len(rewards))):
+            running = rewards[t] + gamma * running
+            returns[t] = running
+        writer.add_episode(episode, samples, returns)
+
+    writer.flush()
+    fields = {name: {"shape": [int(size) for size in shape], "dtype": dtype.str} for name, (shape, dtype) in writer.fields.items()}
+    return writer.shards, fields
+
+
+def generate_bc_dataset(output_dir, machine_config_path, job_config_path, job_repeats_params, num_episodes, rules=("edd", "spt", "mwkr", "tardiness"), num_workers=None, shard_bytes=64 * 2**20, gamma=1.0, epsilon=0.0, seed=0, env_kwargs=None):
+    env_kwargs = dict(env_kwargs or {})
+    num_workers = num_workers or os.cpu_count() or 1
+    num_workers = max(1, min(num_workers, num_episodes))
+    os.makedirs(output_dir, exist_ok=True)
+
+    # shard 크기는 observation 크기에서 역산한다
+    probe = RJSPEnv(machine_config_path, job_config_path, job_repeats_params, **env_kwargs)
+    shard_size = _samples_per_shard(probe.observation_space, probe.action_space, shard_bytes)
+
+    config = {
+        "output_dir": output_dir,
+        "machine_config_path": machine_config_path,
+        "job_config_path": job_config_path,
+        "job_repeats_params": job_repeats_params,
+        "env_kwargs": env_kwargs,
+        "rules": list(rules),
+        "shard_size": shard_size,
+        "gamma": gamma,
+        "epsilon": epsilon,
+        "seed": seed,
+    }
+    tasks = [(worker_id, list(range(worker_id, num_episodes, num_workers)), config) for worker_id in range(num_workers)]
+
+    shards, fields = [], None
+    # worker에서 exception이 나도 pool이 정리되도록 with로 연다
+    with ProcessPoolExecutor(max_workers=num_workers) if num_workers > 1 else nullcontext() as executor:
+        results = map(_rollout_worker, tasks) if executor is None else executor.map(_rollout_worker, tasks)
+        for worker_shards, worker_fields in results:
+            shards.extend(worker_shards)
+            fields = worker_fields
+
+    manifest = {
+        "machine_config_path": machine_config_path,
+        "job_config_path": job_config_path,
+        "job_repeats_params": job_repeats_params,
+        "rules": list(rules),
+        "gamma": gamma,
+        "epsilon": epsilon,
+        "seed": seed,
+        "num_episodes": num_episodes,
+        "num_samples": sum(shard["count"] for shard in shards),
+        "flat_observation": not isinstance(probe.observation_space, spaces.Dict),
+        "fields": fields,
+        "shards": shards,
+    }
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+class BCDataset():
+    # torch.utils.data.DataLoader에 그대로 넣을 수 있는 map-style dataset
+    # shard 파일은 처음 접근할 때 mmap으로 열리므로 DataLoader worker마다 따로 열린다
+    def __init__(self, dataset_dir):
+        self.dataset_dir = dataset_dir
+        with open(os.path.join(dataset_dir, MANIFEST_NAME)) as file:
+            self.manifest = json.load(file)
+        self.shards = self.manifest["shards"]
+        self.offsets = np.cumsum([0] + [shard["count"] for shard in self.shards]).tolist()
+        self.observation_keys = [name[len("obs."):] for name in self.manifest["fields"] if name.startswith("obs.")]
+        self._arrays = {}
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def _shard_arrays(self, shard_index):
+        if shard_index not in self._arrays:
+            shard_dir = os.path.join(self.dataset_dir, self.shards[shard_index]["name"])
+            self._arrays[shard_index] = {
+                field: np.load(os.path.join(shard_dir, f"{field}.npy"), mmap_mode="r")
+                for field in self.manifest["fields"]
+            }
+        return self._arrays[shard_index]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        shard_index = bisect.bisect_right(self.offsets, index) - 1
+        arrays = self._shard_arrays(shard_index)
+        row = index - self.offsets[shard_index]
+        if self.manifest.get("flat_observation", False):
+            observation = np.array(arrays[f"obs.{FLAT_OBSERVATION_KEY}"][row])
+        else:
+            observation = {key: np.array(arrays[f"obs.{key}"][row]) for key in self.observation_keys}
+        return {
+            "observation": observation,
+            "action_mask": np.array(arrays["action_mask"][row]),
+            "action": int(arrays["action"][row]) if arrays["action"].ndim == 1 else np.array(arrays["action"][row]),
+            "return": float(arrays["return"][row]),
+        }
+
+    def __getstate__(self):
+        # DataLoader worker로 넘길 때 열린 mmap은 넘기지 않는다
+        state = self.__dict__.copy()
+        state["_arrays"] = {}
+        return state
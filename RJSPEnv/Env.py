@@ -1,17 +1,20 @@
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
-import pandas as pd
 import json
-from stable_baselines3.common.env_checker import check_env
-from RJSPEnv.Scheduler import customRepeatableScheduler
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches  # 필요한 모듈을 가져옵니다.
+from RJSPEnv.Scheduler import customRepeatableScheduler, type_encoding, HEATMAP_MODES
+from RJSPEnv.Heuristics import conflict_set, dispatch
+from RJSPEnv.Bounds import instance_lower_bounds, lower_bound_cost
 from collections import defaultdict
 
-from stable_baselines3.common.preprocessing import get_flattened_obs_dim, is_image_space
+# pandas / matplotlib / stable_baselines3는 출력, 시각화 함수 안에서만 import 한다
+
+# schedule / cost / observation 결과가 바뀌는 수정을 하면 올린다 (RJSPEnv.Cache의 평가 결과 cache key에 들어간다)
+ENV_VERSION = 2
 
 class RJSPEnv(gym.Env):
+    metadata = {"render_modes": ["human", "seaborn", "rgb_array"], "render_fps": 4}
+
     def _load_machines(self, file_path):
         machines = []
 
@@ -72,9 +75,11 @@ class RJSPEnv(gym.Env):
 
         return jobs
 
-    def __init__(self, machine_config_path, job_config_path, job_repeats_params, render_mode="seaborn", cost_deadline_per_time = 5, cost_hole_per_time = 1, cost_processing_per_time = 2, cost_makespan_per_time = 10, profit_per_time = 10, target_time = None, test_mode=False, max_time = 150, num_of_types = 4, sample_mode = "normal"):
+    def __init__(self, machine_config_path, job_config_path, job_repeats_params, render_mode="seaborn", cost_deadline_per_time = 5, cost_hole_per_time = 1, cost_processing_per_time = 2, cost_makespan_per_time = 10, profit_per_time = 10, target_time = None, test_mode=False, max_time = 150, num_of_types = 4, sample_mode = "normal", reward_mode = "terminal", info_mode = "full", observation_mode = "default", flatten_observation = False, heatmap_mode = "dense", heatmap_pool = 8, heatmap_levels = ((1, 16), (4, 8), (16, 8)), decision_mode = "every_step", action_mode = "single", macro_sizes = (1, 2, 4), macro_rules = ("edd", "spt", "mwkr", "tardiness"), streaming = False, streaming_horizon_lag = None, incumbent_cost = None, kernel_backend = "python"):
         super(RJSPEnv, self).__init__()
 
+        self.render_mode = render_mode
+
         # cost 관련 변수
         self.cost_deadline_per_time = cost_deadline_per_time
         self.cost_hole_per_time = cost_hole_per_time
@@ -84,6 +89,49 @@ class RJSPEnv(gym.Env):
         # profit 관련 변수
         self.profit_per_time = profit_per_time
 
+        # reward 관련 변수
+        # "terminal" : episode 종료 시 calculate_final_reward만 준다
+        # "dense" : 매 step cost 증가분을 음의 보상으로 주고, 종료 시 profit 항(100)을 더한다
+        if reward_mode not in ("terminal", "dense"):
+            raise ValueError(f"Unknown reward_mode : {reward_mode}")
+        self.reward_mode = reward_mode
+
+        # info 관련 변수
+        # "minimal" : counter만 / "terminal" : 종료 step에서만 전체 정보 / "full" : 매 step 전체 정보
+        if info_mode not in ("minimal", "terminal", "full"):
+            raise ValueError(f"Unknown info_mode : {info_mode}")
+        self.info_mode = info_mode
+
+        # decision 관련 변수
+        # "every_step" : operation 하나를 배치할 때마다 action을 받는다
+        # "forced" : legal action이 하나뿐인 배치는 env가 바로 적용하고 선택지가 있을 때만 agent에게 돌려준다
+        # "event" : forced + 가장 먼저 끝나는 머신에서 경쟁하는 operation이 하나뿐이면 (Giffler-Thompson conflict set 크기 1) 바로 배치한다
+        #           남은 job이 하나뿐인 경우도 여기에 포함된다
+        # 자동으로 적용한 배치 수는 info['auto_resolved'] (이번 step), info['num_auto_resolved'] (episode 누적)
+        if decision_mode not in ("every_step", "forced", "event"):
+            raise ValueError(f"Unknown decision_mode : {decision_mode}")
+        self.decision_mode = decision_mode
+        self.auto_resolved = 0
+        self.num_auto_resolved = 0
+        # reset 중에 자동 배치된 operation의 dense reward, 첫 step의 reward에 더한다
+        self._pending_auto_reward = 0.0
+
+        # streaming 관련 변수
+        # streaming=True이면 inject_repeat으로 episode 중에 repeat을 추가하고 advance_horizon으로 frozen horizon을 옮긴다
+        # streaming_horizon_lag (max_time 단위)을 주면 매 step 전에 horizon을 (freeze time - lag)까지 자동으로 옮긴다
+        # episode는 지금까지 추가된 repeat이 모두 끝나면 종료된다
+        self.streaming = streaming
+        self.streaming_horizon_lag = streaming_horizon_lag
+
+        # branch-and-bound pruning 관련 변수
+        # incumbent_cost (final cost)를 주면 배치할 때마다 남은 배치로 얻을 수 있는 final cost의 lower bound를 계산하고
+        # incumbent 이상이면 episode를 바로 종료한다 (info['pruned'] = True)
+        # 종료 reward는 final cost 대신 lower bound로 계산한다 (실제로 끝까지 배치한 경우보다 작지 않다)
+        self.incumbent_cost = incumbent_cost
+
+        # scheduler 내부 계산 backend ("python" / "numpy" / "numba", 결과는 모두 같다, RJSPEnv.Kernels)
+        self.kernel_backend = kernel_backend
+
         self.target_time = target_time
         self.total_durations = 0
         
@@ -95,6 +143,8 @@ class RJSPEnv(gym.Env):
 
         self.jobs = self._load_jobs_repeat(job_config_path)
         self.machine_config = self._load_machines(machine_config_path)
+        self.instance_key = (machine_config_path, job_config_path)
+        self.lower_bounds = None  # RJSPEnv.Bounds, reset마다 (instance, repeats) 기준으로 갱신
 
         self.custom_scheduler = None
 
@@ -118,7 +168,34 @@ class RJSPEnv(gym.Env):
         self.total_count_per_type = None
         self.num_of_types = num_of_types
 
-        self.action_space = spaces.Discrete(self.len_machines * self.len_jobs)
+        # schedule_heatmap encoding ("dense" / "pooled" / "pyramid" / "packed", customRepeatableScheduler 참고)
+        if heatmap_mode not in HEATMAP_MODES:
+            raise ValueError(f"Unknown heatmap_mode : {heatmap_mode}")
+        self.heatmap_mode = heatmap_mode
+        self.heatmap_pool = heatmap_pool
+        self.heatmap_levels = heatmap_levels
+
+        # action 관련 변수
+        # "single" : action = machine * len_jobs + job, operation 하나를 배치한다
+        # "macro" : [0, M*J*len(macro_sizes)) 구간은 size_index * M*J + machine * len_jobs + job
+        #               -> job의 다음 frontier operation을 최대 macro_sizes[size_index]개 machine에 배치한다 (배치할 수 없으면 멈춤)
+        #           그 뒤 len(macro_rules) 개는 dispatching rule로 한 round (schedule_buffer에 있는 job 수만큼) 배치한다
+        #           여러 배치는 customRepeatableScheduler.update_state_batch로 한 번에 적용하고 reward는 batch 전체 기준이다
+        # "factorized" : action = [job, machine] (MultiDiscrete), mask는 [job mask (J), machine mask (M)]
+        #           job을 먼저 고르고 machine_action_mask(job)으로 머신을 고르는 autoregressive policy에도 쓸 수 있다
+        #           MaskablePPO처럼 축마다 따로 고르면 job이 쓸 수 없는 머신이 나올 수 있으므로
+        #           그때는 그 job의 frontier operation을 가장 먼저 시작할 수 있는 legal 머신으로 바꿔서 배치한다
+        if action_mode not in ("single", "macro", "factorized"):
+            raise ValueError(f"Unknown action_mode : {action_mode}")
+        self.action_mode = action_mode
+        self.macro_sizes = tuple(macro_sizes)
+        self.macro_rules = tuple(macro_rules)
+        if action_mode == "macro":
+            self.action_space = spaces.Discrete(self.len_machines * self.len_jobs * len(self.macro_sizes) + len(self.macro_rules))
+        elif action_mode == "factorized":
+            self.action_space = spaces.MultiDiscrete([self.len_jobs, self.len_machines])
+        else:
+            self.action_space = spaces.Discrete(self.len_machines * self.len_jobs)
 
         observation_space_v1 = spaces.Dict({
             # Vaild 행동, Invalid 행동 관련 지표
@@ -226,7 +303,7 @@ class RJSPEnv(gym.Env):
         })        
         observation_space_v4 = spaces.Dict({
             # Vaild 행동, Invalid 행동 관련 지표
-            "action_masks": spaces.Box(low=0, high=1, shape=(self.len_machines * self.len_jobs, ), dtype=np.int8),
+            "action_masks": spaces.Box(low=0, high=1, shape=(self._action_mask_observation_size(), ), dtype=np.int8),
             # Instance 특징에 대한 지표            
             # Operation Type별 지표
             "total_count_per_type": spaces.Box(low=-1, high=50, shape=(num_of_types, ), dtype=np.int64),
@@ -242,7 +319,7 @@ class RJSPEnv(gym.Env):
             "machine_utilization_rate": spaces.Box(low=0, high=1, shape=(self.len_machines, ), dtype=np.float64),
             'remaining_repeats': spaces.Box(low=0, high=20, shape=(self.len_jobs, ), dtype=np.int64),
             # schedule_heatmap 관련 지표
-            "schedule_heatmap": spaces.Box(low=-1, high=2, shape=(self.len_machines, max_time), dtype=np.int8),
+            "schedule_heatmap": self._heatmap_space(),
             # schedule_buffer 관련 지표
             "schedule_buffer_job_repeat": spaces.Box(low=-1, high=10, shape=(self.len_jobs, ), dtype=np.int64),
             "schedule_buffer_operation_index": spaces.Box(low=-1, high=10, shape=(self.len_jobs, ), dtype=np.int64),
@@ -259,10 +336,103 @@ class RJSPEnv(gym.Env):
             # cost 관련 지표
             "current_costs": spaces.Box(low=0, high=50000, shape=(4, ), dtype=np.float64),
         })
-        self.observation_space = observation_space_v4
+
+        # observation 저장 형식
+        # "default" : observation_space_v4 그대로 (int64 / float64)
+        # "compact" : instance에서 나올 수 있는 최댓값에 맞춘 가장 작은 정수형, 실수는 float32
+        # flatten_observation=True 이면 위 Dict를 key 순서대로 이어 붙인 float32 Box 하나로 준다
+        #   각 key의 위치는 self.observation_layout[key] = (start, end, shape)
+        if observation_mode not in ("default", "compact"):
+            raise ValueError(f"Unknown observation_mode : {observation_mode}")
+        self.observation_mode = observation_mode
+        self.flatten_observation = flatten_observation
+        if observation_mode == "compact":
+            observation_space_v4 = self._compact_observation_space(observation_space_v4)
+        self.observation_dict_space = observation_space_v4
+        self.observation_layout = None
+        if flatten_observation:
+            self.observation_layout, self.observation_space = self._flat_observation_space(observation_space_v4)
+        else:
+            self.observation_space = observation_space_v4
+
+    def _action_mask_observation_size(self):
+        if self.action_mode == "factorized":
+            return self.len_machines + self.len_jobs
+        return self.len_machines * self.len_jobs
+
+    def _heatmap_space(self):
+        if self.heatmap_mode == "pooled":
+            return spaces.Box(low=0, high=1, shape=(self.len_machines, -(-self.max_time // self.heatmap_pool)), dtype=np.float32)
+        if self.heatmap_mode == "pyramid":
+            return spaces.Box(low=0, high=1, shape=(self.len_machines, 2 * sum(count for _, count in self.heatmap_levels)), dtype=np.float32)
+        if self.heatmap_mode == "packed":
+            return spaces.Box(low=0, high=255, shape=(self.len_machines, -(-self.max_time // 8)), dtype=np.uint8)
+        return spaces.Box(low=-1, high=2, shape=(self.len_machines, self.max_time), dtype=np.int8)
+
+    def _observation_value_bounds(self):
+        # instance (모든 repeat을 다 쓰는 경우)에서 각 정수 지표가 가질 수 있는 최댓값
+        max_repeats = max(len(job['deadline']) for job in self.jobs)
+        max_operations = max(len(job['operations']) for job in self.jobs)
+        job_durations = [sum(op['duration'] for op in job['operations']) for job in self.jobs]
+        total_duration = sum(duration * len(job['deadline']) for duration, job in zip(job_durations, self.jobs))
+        max_earliest_start = max(op['earliest_start'] or 0 for job in self.jobs for op in job['operations'])
+        time_bound = (max_earliest_start + total_duration) // 100
+        return {
+            "total_count_per_type": sum(len(job['operations']) * len(job['deadline']) for job in self.jobs),
+            "last_finish_time_per_machine": time_bound,
+            "machine_ability": max(sum(2**type_encoding(ability) for ability in machine['ability']) for machine in self.machine_config),
+            "hole_length_per_machine": time_bound,
+            "remaining_repeats": max_repeats,
+            "schedule_buffer_job_repeat": max_repeats,
+            "schedule_buffer_operation_index": max_operations,
+            "cur_op_earliest_start": time_bound,
+            "cur_job_deadline": max(max(job['deadline']) for job in self.jobs) // 100,
+            "cur_op_duration": max(op['duration'] for job in self.jobs for op in job['operations']) // 100,
+            "cur_op_type": self.num_of_types - 1,
+            "cur_remain_working_time": max(job_durations) // 100,
+            "cur_remain_num_op": max_operations,
+        }
+
+    def _compact_observation_space(self, observation_space):
+        value_bounds = self._observation_value_bounds()
+        compact_spaces = {}
+        for key, space in observation_space.spaces.items():
+            if space.dtype.kind == "u":
+                compact_spaces[key] = space
+                continue
+            if np.issubdtype(space.dtype, np.floating):
+                compact_spaces[key] = spaces.Box(low=space.low.astype(np.float32), high=space.high.astype(np.float32), shape=space.shape, dtype=np.float32)
+                continue
+            low = int(space.low.min())
+            high = max(int(space.high.max()), value_bounds.get(key, 0))
+            for dtype in (np.int8, np.int16, np.int32, np.int64):
+                if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                    break
+            compact_spaces[key] = spaces.Box(low=low, high=high, shape=space.shape, dtype=dtype)
+        return spaces.Dict(compact_spaces)
+
+    def _flat_observation_space(self, observation_space):
+        # gymnasium Dict는 key를 정렬해서 저장하므로 SB3 CombinedExtractor와 같은 순서가 된다
+        layout = {}
+        lows, highs = [], []
+        start = 0
+        for key, space in observation_space.spaces.items():
+            end = start + int(np.prod(space.shape))
+            layout[key] = (start, end, space.shape)
+            lows.append(np.broadcast_to(space.low, space.shape).ravel())
+            highs.append(np.broadcast_to(space.high, space.shape).ravel())
+            start = end
+        flat_space = spaces.Box(low=np.concatenate(lows).astype(np.float32), high=np.concatenate(highs).astype(np.float32), dtype=np.float32)
+        return layout, flat_space
+
+    def unflatten_observation(self, observation):
+        # flat observation을 key별 배열로 되돌린다 (view)
+        return {key: observation[..., start:end].reshape(observation.shape[:-1] + shape) for key, (start, end, shape) in self.observation_layout.items()}
 
     def is_image(self):
-        print(is_image_space(self.observation_space["schedule_heatmap"]))
+        from stable_baselines3.common.preprocessing import is_image_space
+
+        print(is_image_space(self.observation_dict_space["schedule_heatmap"]))
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed, options=options)
@@ -273,6 +443,8 @@ class RJSPEnv(gym.Env):
         self.num_steps = 0
         self.cal_env_info()
         self.cal_job_info()
+        self.num_auto_resolved = 0
+        self.auto_resolved, self._pending_auto_reward = self._auto_resolve()
 
         return self._get_observation(), self._get_info()
     
@@ -282,27 +454,67 @@ class RJSPEnv(gym.Env):
     # def test_cal_estimated_tardiness(self):
     #     self.custom_scheduler.test_cal_estimated_tardiness()
 
+    def inject_repeat(self, job_index, deadline, release_time=0):
+        # streaming mode : job_index의 repeat을 추가한다, 추가된 repeat의 index를 반환
+        if not self.streaming:
+            raise ValueError("inject_repeat requires streaming=True")
+        # self.current_repeats는 다음 reset에서 쓰이므로 그대로 두고 추가된 repeat 수는 scheduler가 관리한다
+        repeat_index = self.custom_scheduler.inject_repeat(job_index, deadline, release_time)
+        self.total_durations += sum(op['duration'] for op in self.jobs[job_index]['operations'])
+        return repeat_index
+
+    def set_incumbent(self, cost):
+        # 지금 episode와 이후 reset에 쓸 incumbent final cost, None이면 pruning을 끈다
+        self.incumbent_cost = cost
+        if self.custom_scheduler is not None:
+            self.custom_scheduler.set_incumbent(cost)
+
+    def advance_horizon(self, time):
+        # streaming mode : frozen horizon을 time (절대 시간)까지 옮긴다, 새 horizon을 반환
+        if not self.streaming:
+            raise ValueError("advance_horizon requires streaming=True")
+        return self.custom_scheduler.advance_horizon(time)
+
     def step(self, action):
+        if self.streaming and self.streaming_horizon_lag is not None:
+            self.advance_horizon(self.custom_scheduler.get_freeze_time() - self.streaming_horizon_lag * 100)
+
+        if self.action_mode == "macro":
+            return self._step_macro(action)
+
         # Map the action to the corresponding machine and job
-        selected_machine_id = action // self.len_jobs
-        selected_job_id = action % self.len_jobs
-        action = [selected_machine_id, selected_job_id]
+        action = self.decode_action(action)
 
         # error_action이 아니라면 step의 수를 증가시킨다
         self.num_steps += 1
         reward = 0.0
+        self.auto_resolved = 0
 
         if self._is_legal(action):
             # reward += self._calculate_step_reward(action)
             self._update_state(action)
+            if self.reward_mode == "dense":
+                reward += self._calculate_dense_reward()
+            self.auto_resolved, auto_reward = self._auto_resolve()
+            reward += auto_reward
         else:  # Illegal action
             reward = -0.5
 
+        return self._finish_step(reward)
+
+    def _finish_step(self, reward):
+        reward += self._pending_auto_reward
+        self._pending_auto_reward = 0.0
         terminated = self._is_done()
         if terminated:
             final_makespan = self.custom_scheduler._get_final_operation_finish()
             self.best_makespan = min(self.best_makespan, final_makespan)  # Update the best makespan
-            reward += self._calculate_final_reward()
+            if self.custom_scheduler.pruned:
+                reward += self._calculate_pruned_reward()
+            elif self.reward_mode == "dense":
+                reward += 100.0
+            else:
+                reward += self._calculate_final_reward()
 
         truncated = bool(self.num_steps == 10000)
         if truncated:
@@ -313,14 +525,90 @@ class RJSPEnv(gym.Env):
             reward,
             terminated,
             truncated,
-            self._get_info(),
+            self._get_info(done=terminated or truncated),
         )
 
+    def _step_macro(self, action):
+        self.num_steps += 1
+        reward = 0.0
+        self.auto_resolved = 0
+
+        placements = self._macro_placements(int(action))
+        if placements is not None:
+            self.custom_scheduler.update_state_batch(placements)
+            if self.reward_mode == "dense":
+                reward += self._calculate_dense_reward()
+            self.auto_resolved, auto_reward = self._auto_resolve()
+            reward += auto_reward
+        else:  # Illegal action
+            reward = -0.5
+
+        return self._finish_step(reward)
+
+    def decode_action(self, action):
+        # action -> (첫 번째로 배치할) [machine, job], dispatching rule macro action이면 [-1, -1]
+        # factorized action [job, machine]에서 job이 쓸 수 없는 머신은 가장 먼저 시작할 수 있는 legal 머신으로 바꾼다
+        if self.action_mode == "factorized":
+            job_index, machine_index = int(action[0]), int(action[1])
+            legal_machines = self.custom_scheduler.legal_machines(job_index)
+            if len(legal_machines) and not self.custom_scheduler.legal_actions[machine_index, job_index]:
+                machine_index = min(legal_machines, key=lambda machine: (self.custom_scheduler.placement_start([int(machine), job_index]), machine))
+            return [int(machine_index), job_index]
+        action = int(action)
+        if self.action_mode == "macro":
+            num_pairs = self.len_machines * self.len_jobs
+            if action >= num_pairs * len(self.macro_sizes):
+                return [-1, -1]
+            action %= num_pairs
+        return [action // self.len_jobs, action % self.len_jobs]
+
+    def _macro_placements(self, action):
+        # macro action이 배치할 [machine, job] generator, illegal action이면 None
+        num_pairs = self.len_machines * self.len_jobs
+        if action < num_pairs * len(self.macro_sizes):
+            size = self.macro_sizes[action // num_pairs]
+            pair = self.decode_action(action)
+            if not self._is_legal(pair):
+                return None
+            return (pair for _ in range(size))
+
+        if self._is_done():
+            return None
+        rule = self.macro_rules[action - num_pairs * len(self.macro_sizes)]
+        num_active_jobs = sum(1 for repeat_index, _ in self.custom_scheduler.schedule_buffer if repeat_index != -1)
+        return (dispatch(self.custom_scheduler, rule, self.np_random) for _ in range(num_active_jobs))
+
+    def _forced_action(self):
+        # agent에게 물어볼 필요가 없는 [machine, job], 선택지가 있으면 None
+        legal_actions = self.custom_scheduler.legal_action_list()
+        if len(legal_actions) == 1:
+            return [int(legal_actions[0] // self.len_jobs), int(legal_actions[0] % self.len_jobs)]
+        if self.decision_mode == "event":
+            conflicts = conflict_set(self.custom_scheduler)
+            if len(conflicts) == 1:
+                return conflicts[0]
+        return None
+
+    def _auto_resolve(self):
+        count, reward = 0, 0.0
+        if self.decision_mode == "every_step":
+            return count, reward
+        while not self._is_done():
+            action = self._forced_action()
+            if action is None:
+                break
+            self._update_state(action)
+            if self.reward_mode == "dense":
+                reward += self._calculate_dense_reward()
+            count += 1
+        self.num_auto_resolved += count
+        return count, reward
+
     def _is_legal(self, action):
         return self.custom_scheduler.is_legal(action)
 
     def _is_done(self):
-        return self.custom_scheduler.is_done()
+        return self.custom_scheduler.is_done() or self.custom_scheduler.pruned
 
     def _update_state(self, action):
         self.custom_scheduler.update_state(action)
@@ -377,8 +665,15 @@ class RJSPEnv(gym.Env):
 
 
         
-
-        
+        if self.action_mode == "factorized":
+            observation["action_masks"] = self.action_masks()
+        if self.observation_mode == "compact":
+            observation = {key: np.asarray(value).astype(self.observation_dict_space[key].dtype, copy=False) for key, value in observation.items()}
+        if self.flatten_observation:
+            flat_observation = np.empty(self.observation_space.shape, dtype=np.float32)
+            for key, (start, end, _) in self.observation_layout.items():
+                flat_observation[start:end] = np.ravel(observation[key])
+            return flat_observation
         return observation
     
     def set_test_mode(self, test_mode):
@@ -387,45 +682,115 @@ class RJSPEnv(gym.Env):
 
     # For MaskablePPO
     def action_masks(self):
-        return self.custom_scheduler.action_masks()
-
-    def _get_info(self):
-        info = self.custom_scheduler.get_info()
+        action_mask = self.custom_scheduler.action_masks()
+        if self.action_mode == "macro":
+            # macro placement는 첫 배치가 legal이면 legal, rule은 배치할 operation이 남아 있으면 legal
+            return np.concatenate([np.tile(action_mask, len(self.macro_sizes)), np.full(len(self.macro_rules), action_mask.any())])
+        if self.action_mode == "factorized":
+            return np.concatenate([self.job_action_mask(), self.machine_action_mask()])
+        return action_mask
+
+    def legal_actions(self):
+        # action_masks()가 True인 action 목록
+        # single / macro : action index 오름차순 int 배열, factorized : (L, 2) [job, machine] 배열
+        scheduler = self.custom_scheduler
+        if self.action_mode == "factorized":
+            return scheduler.legal_action_pairs()[:, ::-1].copy()
+        legal_actions = scheduler.legal_action_list()
+        if self.action_mode == "macro":
+            num_pairs = self.len_machines * self.len_jobs
+            blocks = [legal_actions + size_index * num_pairs for size_index in range(len(self.macro_sizes))]
+            if len(legal_actions):
+                blocks.append(num_pairs * len(self.macro_sizes) + np.arange(len(self.macro_rules)))
+            return np.concatenate(blocks)
+        return legal_actions
+
+    def legal_action_counts(self):
+        # job별 / 머신별 legal (machine, job) 쌍의 수
+        return {
+            "per_job": self.custom_scheduler.legal_count_per_job.copy(),
+            "per_machine": self.custom_scheduler.legal_count_per_machine.copy(),
+        }
+
+    def job_action_mask(self):
+        # schedule_buffer에 배치할 operation이 올라와 있고, 처리할 수 있는 머신이 있는 job
+        return self.custom_scheduler.legal_actions.any(axis=0)
+
+    def machine_action_mask(self, job_index=None):
+        # job_index가 주어지면 그 job의 frontier operation을 처리할 수 있는 머신
+        # 없으면 legal job 중 하나라도 처리할 수 있는 머신
+        legal_actions = self.custom_scheduler.legal_actions
+        if job_index is None:
+            return legal_actions.any(axis=1)
+        return legal_actions[:, job_index].copy()
+
+    def _get_info(self, done=False):
+        if self.info_mode == "full" or (self.info_mode == "terminal" and done):
+            info = self.custom_scheduler.get_info(mode="full")
+        else:
+            info = self.custom_scheduler.get_info(mode="minimal")
         info['num_steps'] = self.num_steps
+        info['auto_resolved'] = self.auto_resolved
+        info['num_auto_resolved'] = self.num_auto_resolved
         info['current_repeats'] = self.current_repeats
+        info['lower_bound_makespan'] = self.lower_bounds['makespan']
+        info['lower_bound_time_exceeded'] = self.lower_bounds['time_exceeded']
+        info['lower_bound_cost'] = self.lower_bound_cost()
+        info['pruned'] = self.custom_scheduler.pruned
+        if self.streaming:
+            info['current_repeats'] = self.custom_scheduler.current_repeats
+            info.update(self.custom_scheduler.get_streaming_summary())
         return info
 
+    def lower_bound_cost(self):
+        # 이번 episode (instance, repeats)의 final cost lower bound
+        return lower_bound_cost(self.lower_bounds, self.cost_deadline_per_time, self.cost_hole_per_time, self.cost_processing_per_time, self.cost_makespan_per_time)
+
     def _calculate_final_reward(self):
         return self.custom_scheduler.calculate_final_reward()
     
+    def _calculate_dense_reward(self):
+        return self.custom_scheduler.calculate_dense_reward()
+
+    def _calculate_pruned_reward(self):
+        # pruning으로 끝난 episode의 종료 reward
+        # terminal : lower bound를 final cost로 본 calculate_final_reward
+        # dense : 지금까지 받은 cost 증가분에 (lower bound - 현재 cost)를 더 뺀 뒤 profit 항(100)을 더한다
+        scheduler = self.custom_scheduler
+        profit = scheduler.cal_profit()
+        if self.reward_mode == "dense":
+            return 100.0 - (scheduler.lower_bound - scheduler.cal_final_cost()) / profit * 100
+        return (profit - scheduler.lower_bound) / profit * 100
+
     def _calculate_step_reward(self, action):
         return self.custom_scheduler.calculate_step_reward(action)
 
     def sample_job_repeats(self, mode = "normal"):
+        # 전역 np.random 대신 env마다 가진 self.np_random을 쓴다 (reset(seed=...)로 재현 가능, thread마다 독립)
         if mode == "normal":
             repeats_list = []
             for mean, std in self.job_repeats_params:
-                repeats = max(1, int(np.random.normal(mean, std)))
+                repeats = max(1, int(self.np_random.normal(mean, std)))
                 repeats_list.append(repeats)
             self.current_repeats = repeats_list[::]
         elif mode == "uniform":
             repeats_list = []
             for mean, std in self.job_repeats_params:
-                repeats = max(1, np.random.randint(mean - 3*std, mean + 3*std + 1))
+                repeats = max(1, self.np_random.integers(mean - 3*std, mean + 3*std + 1))
                 repeats_list.append(repeats)
             self.current_repeats = repeats_list[::]
         elif mode == "tiny_normal":
             previous_repeats = self.current_repeats[::]
-            random_index = np.random.randint(0, len(self.current_repeats))
+            random_index = self.np_random.integers(0, len(self.current_repeats))
             mean = self.job_repeats_params[random_index][0]
             std = self.job_repeats_params[random_index][1]
-            repeat = max(1, int(np.random.normal(mean, std)))
+            repeat = max(1, int(self.np_random.normal(mean, std)))
             previous_repeats[random_index] = repeat
             self.current_repeats = previous_repeats[::]
         elif mode == "tiny_stairs":
             previous_repeats = self.current_repeats[::]
-            random_index = np.random.randint(0, len(self.current_repeats))
-            previous_repeats[random_index] += np.random.choice([-1, 1])
+            random_index = self.np_random.integers(0, len(self.current_repeats))
+            previous_repeats[random_index] += self.np_random.choice([-1, 1])
             if previous_repeats[random_index] < 1:
                 previous_repeats[random_index] = 1
             self.current_repeats = previous_repeats[::]
@@ -458,11 +823,13 @@ class RJSPEnv(gym.Env):
             random_jobs.append(random_job_info)
 
         # 랜덤 Job 인스턴스를 사용하여 customScheduler 초기화
-        self.custom_scheduler = customRepeatableScheduler(jobs=random_jobs, machines=self.machine_config, cost_deadline_per_time= self.cost_deadline_per_time, cost_hole_per_time = self.cost_hole_per_time, cost_processing_per_time = self.cost_processing_per_time, cost_makespan_per_time = self.cost_makespan_per_time, profit_per_time = self.profit_per_time, current_repeats=self.current_repeats, max_time=self.max_time, num_of_types=self.num_of_types)
+        self.custom_scheduler = customRepeatableScheduler(jobs=random_jobs, machines=self.machine_config, cost_deadline_per_time= self.cost_deadline_per_time, cost_hole_per_time = self.cost_hole_per_time, cost_processing_per_time = self.cost_processing_per_time, cost_makespan_per_time = self.cost_makespan_per_time, profit_per_time = self.profit_per_time, current_repeats=self.current_repeats, max_time=self.max_time, num_of_types=self.num_of_types, heatmap_mode=self.heatmap_mode, heatmap_pool=self.heatmap_pool, heatmap_levels=self.heatmap_levels, streaming=self.streaming, kernel_backend=self.kernel_backend)
             
         self._calculate_target_time()
+        self.lower_bounds = instance_lower_bounds(self.jobs, self.machine_config, self.current_repeats, self.instance_key)
 
         self.custom_scheduler.reset()
+        self.custom_scheduler.set_incumbent(self.incumbent_cost)
 
     def _calculate_target_time(self):
         total_duration = 0
@@ -473,13 +840,18 @@ class RJSPEnv(gym.Env):
         self.total_durations = total_duration
         self.target_time = total_duration / self.len_machines
 
-    def render(self, mode="human"):
-        self.custom_scheduler.render(mode=mode, num_steps=self.num_steps)
+    def render(self, mode=None):
+        # mode="rgb_array"이면 (H, W, 3) uint8 frame을 반환한다
+        mode = mode or self.render_mode
+        return self.custom_scheduler.render(mode=mode, num_steps=self.num_steps)
 
     def visualize_graph(self):
         self.custom_scheduler.visualize_graph()
 
     def print_result(self, info, detail_mode = False):
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as mpatches
+
         current_repeats = info['current_repeats']
         print(f"Current Repeats\t\t\t:\t{current_repeats}")
 
@@ -621,6 +993,8 @@ class RJSPEnv(gym.Env):
         return data
 
     def show_env_info(self):
+        import pandas as pd
+
         data = self.cal_env_info()
 
         # DataFrame으로 변환하여 표 형식으로 출력
@@ -674,6 +1048,8 @@ class RJSPEnv(gym.Env):
         return job_data
 
     def show_job_info(self):
+        import pandas as pd
+
         # Job별 통계 정보 수집
         job_data = self.cal_job_info()
 
@@ -694,6 +1070,8 @@ class RJSPEnv(gym.Env):
         return styled_job_df
 
 if __name__ == "__main__":
+    from stable_baselines3.common.env_checker import check_env
+
     env_5_8_8_2 = SchedulingEnv(machine_config_path= "instances/Machines/v0-5.json", job_config_path = "instances/Jobs/v0-8x12-deadline.json", job_repeats_params = [(8, 2)] * 8)
     env = env_5_8_8_2
     check_env(env)
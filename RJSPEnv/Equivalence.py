@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from gymnasium import spaces
+
+from RJSPEnv.Env import RJSPEnv
+from RJSPEnv.Generator import generate_instance, suggest_env_params, write_instance
+
+# reference env와 candidate env (최적화한 backend / 설정)를 같은 action으로 나란히 돌려서
+# 매 step observation, action mask, reward, 종료 여부와 마지막 schedule / cost가 같은지 확인한다
+# 학습된 checkpoint가 그대로 동작하려면 최적화한 구현이 지금 동작을 정확히 재현해야 한다
+#
+#   python -m RJSPEnv.Equivalence --candidate info_mode=full --cases 50
+#   python -m RJSPEnv.Equivalence --candidate <optimized kwargs> --scale 4 --min-speedup 1.5
+#
+# case : Generator로 만든 random instance (seed와 크기) + repeat vector + random legal action 순서 (policy_seed)
+# 다른 case가 나오면 instance 크기 / repeat / action 수를 줄여서 가장 작은 재현 case를 JSON으로 남긴다 (replay로 다시 실행)
+# 각 phase (_schedule_operation, _update_job_state, cal_best_finish_time, get_observation, step) 시간을 재서 speedup을 보고한다
+# 값은 dtype과 관계없이 정확히 같아야 한다 (observation_mode="compact"의 float32 반올림도 차이로 잡힌다)
+
+PHASES = ("step", "_schedule_operation", "_update_job_state", "cal_best_finish_time", "get_observation")
+SIZE_FIELDS = ("num_jobs", "num_machines", "num_types", "num_repeats", "max_operations")
+
+
+def random_case(seed, scale=1):
+    # 작은 instance를 많이 돌리는 편이 shrinking / 디버깅에 유리하다, 속도 비교는 scale을 키운다
+    rng = np.random.default_rng(seed)
+    case = {
+        "seed": int(seed),
+        "num_jobs": int(rng.integers(2, 8 * scale + 1)),
+        "num_machines": int(rng.integers(2, 6 * scale + 1)),
+        "num_types": int(rng.integers(1, 6)),
+        "num_repeats": int(rng.integers(1, 5)),
+        "max_operations": int(rng.integers(1, 5)),
+        "policy_seed": int(rng.integers(2**31)),
+    }
+    case["repeats"] = [int(repeat) for repeat in rng.integers(1, case["num_repeats"] + 1, size=case["num_jobs"])]
+    return case
+
+
+def _build_instance(case, directory):
+    jobs, machines = generate_instance(
+        case["num_jobs"], case["num_machines"], case["num_types"], case["num_repeats"],
+        abilities_per_machine=(1, 3), operations_per_job=(1, case["max_operations"]), seed=case["seed"],
+    )
+    name = "case-{seed}-{num_jobs}x{num_machines}".format(**case)
+    job_path = os.path.join(directory, "Jobs", f"{name}.json")
+    machine_path = os.path.join(directory, "Machines", f"{name}.json")
+    write_instance(jobs, machines, job_path, machine_path)
+    return machine_path, job_path, suggest_env_params(jobs, machines, case["repeats"])
+
+
+def _time_phases(env, timings):
+    # scheduler / machine instance의 method를 시간 재는 wrapper로 바꾼다 (reset마다 새로 만들어지므로 reset 후에 호출)
+    def timed(name, function):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        return wrapper
+
+    scheduler = env.custom_scheduler
+    for name in ("_schedule_operation", "_update_job_state", "get_observation"):
+        setattr(scheduler, name, timed(name, getattr(scheduler, name)))
+    if scheduler.kernels is not None:
+        # kernel_backend에서는 Machine.cal_best_finish_time 대신 머신 전체를 한 번에 계산한다
+        scheduler._cached_best_finish_times = timed("cal_best_finish_time", scheduler._cached_best_finish_times)
+    for machine in scheduler.machines:
+        machine.cal_best_finish_time = timed("cal_best_finish_time", machine.cal_best_finish_time)
+
+
+def _first_difference(reference, candidate, path=""):
+    # 같으면 None, 다르면 어디가 어떻게 다른지 문자열 (dtype은 무시하고 값만 비교한다)
+    if isinstance(reference, dict) or isinstance(candidate, dict):
+        if not isinstance(reference, dict) or not isinstance(candidate, dict):
+            return f"{path} : type {type(reference).__name__} != {type(candidate).__name__}"
+        if set(reference) != set(candidate):
+            return f"{path} : keys {sorted(set(reference) ^ set(candidate))} differ"
+        for key in sorted(reference):
+            difference = _first_difference(reference[key], candidate[key], f"{path}.{key}" if path else key)
+            if difference is not None:
+                return difference
+        return None
+    reference, candidate = np.asarray(reference), np.asarray(candidate)
+    if reference.shape != candidate.shape:
+        return f"{path} : shape {reference.shape} != {candidate.shape}"
+    if not np.array_equal(reference, candidate, equal_nan=reference.dtype.kind == "f" and candidate.dtype.kind == "f"):
+        index = tuple(int(i) for i in np.argwhere(reference != candidate)[0]) if reference.ndim else ()
+        return f"{path}{list(index) if index else ''} : {reference[index]} != {candidate[index]}"
+    return None
+
+
+def _final_state(env):
+    scheduler = env.custom_scheduler
+    schedule = [(op.machine, int(op.job), op.job_index, op.index, op.start, op.finish) for op in scheduler.current_schedule]
+    costs = [scheduler.cost_deadline, scheduler.cost_hole, scheduler.cost_processing, scheduler.cost_makespan, scheduler.makespan]
+    return {"schedule": np.array(schedule, dtype=np.int64).reshape(-1, 6), "costs": np.array(costs, dtype=np.float64)}
+
+
+def _sample_action(env, mask, rng):
+    # env의 action_space에 맞는 random legal action
+    # factorized (MultiDiscrete)의 mask는 job / machine 축별이라 조합이 legal한지 알 수 없으므로 legal (job, machine) 쌍에서 고른다
+    if isinstance(env.action_space, spaces.MultiDiscrete):
+        action = int(rng.choice(env.custom_scheduler.legal_action_list()))
+        return [action % env.len_jobs, action // env.len_jobs]
+    return int(rng.choice(np.flatnonzero(mask)))
+
+
+def run_case(case, candidate_kwargs, reference_kwargs=None, timings=None, max_steps=None):
+    # (mismatch 또는 None, 실제로 둔 action list)
+    # mismatch : {"step", "field", "detail"}, candidate에서 난 exception도 mismatch로 본다
+    # case에 "actions"가 있으면 random 대신 그 action들을 순서대로 쓴다
+    timings = timings if timings is not None else {"reference": {}, "candidate": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        machine_path, job_path, env_params = _build_instance(case, directory)
+        envs, observations = {}, {}
+        for name, kwargs in (("reference", reference_kwargs or {}), ("candidate", candidate_kwargs)):
+            kwargs = {**env_params, "test_mode": True, "info_mode": "minimal", **kwargs}
+            try:
+                envs[name] = RJSPEnv(machine_path, job_path, [(repeat, 0) for repeat in case["repeats"]], **kwargs)
+                observations[name], _ = envs[name].reset(seed=case["seed"])
+            except Exception as error:
+                if name == "reference":
+                    raise
+                return {"step": 0, "field": "reset", "detail": f"{type(error).__name__}: {error}"}, []
+            _time_phases(envs[name], timings.setdefault(name, {}))
+
+        reference, candidate = envs["reference"], envs["candidate"]
+        difference = _first_difference(observations["reference"], observations["candidate"])
+        if difference is not None:
+            return {"step": 0, "field": "observation", "detail": difference}, []
+
+        rng = np.random.default_rng(case["policy_seed"])
+        scripted = case.get("actions")
+        actions = []
+        step = 0
+        while True:
+            mask = reference.action_masks().copy()
+            difference = _first_difference(mask, candidate.action_masks())
+            if difference is not None:
+                return {"step": step, "field": "action_mask", "detail": difference}, actions
+            if scripted is not None and step >= len(scripted):
+                break
+            if max_steps is not None and step >= max_steps:
+                break
+            action = scripted[step] if scripted is not None else _sample_action(reference, mask, rng)
+            actions.append(action)
+            step += 1
+
+            results = {}
+            for name, env in envs.items():
+                start = time.perf_counter()
+                try:
+                    results[name] = env.step(action)
+                except Exception as error:
+                    if name == "reference":
+                        raise
+                    return {"step": step, "field": "step", "detail": f"{type(error).__name__}: {error}"}, actions
+                timings[name]["step"] = timings[name].get("step", 0.0) + time.perf_counter() - start
+
+            (reference_observation, reference_reward, reference_terminated, reference_truncated, _) = results["reference"]
+            (candidate_observation, candidate_reward, candidate_terminated, candidate_truncated, _) = results["candidate"]
+            for field, reference_value, candidate_value in (
+                ("observation", reference_observation, candidate_observation),
+                ("reward", reference_reward, candidate_reward),
+                ("terminated", reference_terminated, candidate_terminated),
+                ("truncated", reference_truncated, candidate_truncated),
+            ):
+                difference = _first_difference(reference_value, candidate_value)
+                if difference is not None:
+                    return {"step": step, "field": field, "detail": difference}, actions
+            if reference_terminated or reference_truncated:
+                break
+
+        difference = _first_difference(_final_state(reference), _final_state(candidate))
+        if difference is not None:
+            return {"step": step, "field": "final", "detail": difference}, actions
+    return None, actions
+
+
+def _smaller_cases(case):
+    # 한 번에 한 가지씩 줄인 case들 (앞쪽일수록 많이 줄어든다)
+    for field in SIZE_FIELDS:
+        if case[field] > 1:
+            smaller = {**case, field: case[field] - 1}
+            if field == "num_jobs":
+                smaller["repeats"] = case["repeats"][:-1]
+            if field == "num_repeats":
+                smaller["repeats"] = [min(repeat, smaller["num_repeats"]) for repeat in case["repeats"]]
+            smaller.pop("actions", None)
+            yield smaller
+    for job_index, repeat in enumerate(case["repeats"]):
+        if repeat > 1:
+            repeats = list(case["repeats"])
+            repeats[job_index] -= 1
+            smaller = {**case, "repeats": repeats}
+            smaller.pop("actions", None)
+            yield smaller
+
+
+def shrink(case, candidate_kwargs, reference_kwargs=None, max_attempts=200):
+    # 여전히 다르게 동작하는 가장 작은 case를 찾는다 (greedy)
+    # instance 크기 / repeat을 줄이면 random action 순서가 바뀌므로 policy_seed는 그대로 두고 다시 돌린다
+    # 마지막에 action list를 mismatch가 난 step까지로 고정해서 replay 할 수 있게 한다
+    mismatch, actions = run_case(case, candidate_kwargs, reference_kwargs)
+    if mismatch is None:
+        return None
+    attempts = 0
+    improved = True
+    while improved and attempts < max_attempts:
+        improved = False
+        for smaller in _smaller_cases(case):
+            attempts += 1
+            smaller_mismatch, smaller_actions = run_case(smaller, candidate_kwargs, reference_kwargs)
+            if smaller_mismatch is not None:
+                case, mismatch, actions = smaller, smaller_mismatch, smaller_actions
+                improved = True
+                break
+            if attempts >= max_attempts:
+                break
+    return {**case, "actions": actions[:mismatch["step"]], "mismatch": mismatch}
+
+
+def replay(reproduction, candidate_kwargs, reference_kwargs=None):
+    # shrink 결과 (JSON)를 다시 돌린다
+    case = {key: value for key, value in reproduction.items() if key != "mismatch"}
+    return run_case(case, candidate_kwargs, reference_kwargs)[0]
+
+
+def check_equivalence(candidate_kwargs, reference_kwargs=None, num_cases=50, seed=0, shrink_failures=True, max_steps=None, scale=1):
+    # (실패한 case list, phase별 {"reference", "candidate", "speedup"})
+    timings = {"reference": {}, "candidate": {}}
+    failures = []
+    for index in range(num_cases):
+        case = random_case(seed + index, scale)
+        mismatch, _ = run_case(case, candidate_kwargs, reference_kwargs, timings, max_steps)
+        if mismatch is not None:
+            failures.append(shrink(case, candidate_kwargs, reference_kwargs) if shrink_failures else {**case, "mismatch": mismatch})
+
+    phases = {}
+    for phase in PHASES:
+        reference_time = timings["reference"].get(phase, 0.0)
+        candidate_time = timings["candidate"].get(phase, 0.0)
+        phases[phase] = {
+            "reference": reference_time,
+            "candidate": candidate_time,
+            # 한쪽에서 호출되지 않은 phase는 None (n/a)
+            "speedup": reference_time / candidate_time if reference_time > 0 and candidate_time > 0 else None,
+        }
+    return failures, phases
+
+
+def _parse_kwargs(items):
+    # ["key=value", ...] -> dict (value는 JSON으로 읽고 안 되면 문자열)
+    kwargs = {}
+    for item in items or []:
+        key, _, value = item.partition("=")
+        try:
+            kwargs[key] = json.loads(value)
+        except json.JSONDecodeError:
+            kwargs[key] = value
+    return kwargs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that an optimized env configuration reproduces the reference scheduler step by step")
+    parser.add_argument("--candidate", action="append", metavar="KEY=VALUE", help="RJSPEnv kwargs of the optimized engine")
+    parser.add_argument("--reference", action="append", metavar="KEY=VALUE", help="RJSPEnv kwargs of the reference engine (default: current defaults)")
+    parser.add_argument("--cases", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-steps", type=int, default=None)
+    parser.add_argument("--scale", type=int, default=1, help="multiply the job / machine count range of random instances")
+    parser.add_argument("--no-shrink", action="store_true")
+    parser.add_argument("--min-speedup", type=float, default=None, help="fail unless the step speedup reaches this value")
+    parser.add_argument("--output", default=None, help="write shrunk reproductions here (JSON)")
+    parser.add_argument("--replay", default=None, help="re-run reproductions from a previous --output file")
+    args = parser.parse_args()
+
+    candidate_kwargs, reference_kwargs = _parse_kwargs(args.candidate), _parse_kwargs(args.reference)
+    if args.replay:
+        with open(args.replay, "r") as file:
+            reproductions = json.load(file)
+        mismatches = [replay(reproduction, candidate_kwargs, reference_kwargs) for reproduction in reproductions]
+        for reproduction, mismatch in zip(reproductions, mismatches):
+            print(f"case {reproduction['seed']} : {mismatch or 'equivalent'}")
+        sys.exit(1 if any(mismatches) else 0)
+
+    failures, phases = check_equivalence(candidate_kwargs, reference_kwargs, args.cases, args.seed, not args.no_shrink, args.max_steps, args.scale)
+    print(f"{args.cases - len(failures)} / {args.cases} cases equivalent")
+    for failure in failures:
+        sizes = " ".join(f"{field}={failure[field]}" for field in SIZE_FIELDS)
+        print(f"  case {failure['seed']} ({sizes}, repeats={failure['repeats']}, {len(failure['actions']) if 'actions' in failure else '?'} actions) : step {failure['mismatch']['step']} {failure['mismatch']['field']} - {failure['mismatch']['detail']}")
+    print(f"{'phase':<22} {'reference':>12} {'candidate':>12} {'speedup':>8}")
+    for phase, result in phases.items():
+        speedup = "n/a" if result["speedup"] is None else f"{result['speedup']:.2f}x"
+        print(f"{phase:<22} {result['reference']:11.3f}s {result['candidate']:11.3f}s {speedup:>8}")
+    if args.output and failures:
+        with open(args.output, "w") as file:
+            json.dump(failures, file, indent=2)
+        print(f"reproductions : {args.output}")
+
+    too_slow = args.min_speedup is not None and not (phases["step"]["speedup"] or 0.0) >= args.min_speedup
+    sys.exit(1 if failures or too_slow else 0)
@@ -0,0 +1,288 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+import numpy as np
+from gymnasium import spaces
+
+from RJSPEnv.Bounds import optimality_gap
+from RJSPEnv.Cache import EvaluationCache
+from RJSPEnv.Env import RJSPEnv
+from RJSPEnv.Generator import suggest_env_params
+from RJSPEnv.Heuristics import dispatch_action
+from RJSPEnv.Rescore import ScheduleRecord
+
+# checkpoint 일괄 평가
+# (checkpoint x instance x 샘플링한 repeat vector x seed) episode를 process pool에서 돌리고
+# episode별 KPI를 CSV 한 줄씩 바로 기록한다 (plot / print_result 없음)
+# model은 worker마다 checkpoint 당 한 번만 load 한다
+#
+#   python -m RJSPEnv.Evaluation --models models/paper --output results.csv --repeat-samples 4 --seeds 3
+#   python -m RJSPEnv.Evaluation --checkpoint rule:edd --checkpoint rule:spt --instances instances
+#
+# checkpoint는 MaskablePPO .zip 경로 또는 "rule:<dispatching rule>" (baseline)
+# model과 observation / action space가 맞지 않는 instance는 건너뛰고 이유를 반환한다
+# max_time / num_of_types는 model의 observation space에서 읽고, rule이면 instance에서 추천값을 쓴다
+# cache_dir을 주면 이미 평가한 (model, instance, repeats, cost, seed) 조합은 다시 돌리지 않는다 (RJSPEnv.Cache)
+# incumbents (예: load_incumbents("previous.csv"))를 주면 episode마다 그 cost를 incumbent로 pruning 한다
+# pruned = 1인 줄의 cost는 중간 값이고 gap은 pruning 시점의 lower bound 기준이다 (cache에는 저장하지 않는다)
+
+RULE_PREFIX = "rule:"
+CHECKPOINT_NAMES = ("best_model.zip", "final_model.zip")
+RESULT_FIELDS = (
+    "checkpoint", "instance", "repeats", "seed",
+    "reward", "cost_deadline", "cost_hole", "cost_processing", "cost_makespan",
+    "makespan", "target_time", "makespan_ratio", "num_steps", "num_illegal",
+    "tardiness", "lower_bound_cost", "lower_bound_makespan", "gap", "pruned", "seconds", "cached",
+)
+
+_POLICIES = {}  # worker process 안에서 checkpoint -> model
+
+
+def find_checkpoints(models_dir):
+    # models_dir/*/best_model.zip, final_model.zip
+    checkpoints = []
+    for name in CHECKPOINT_NAMES:
+        checkpoints.extend(glob.glob(os.path.join(models_dir, "*", name)))
+    return sorted(checkpoints)
+
+
+def find_instances(instances_dir):
+    # instances_dir/Jobs/<machine name>-<repeats>.json 와 instances_dir/Machines/<machine name>.json 짝
+    instances = []
+    for job_config_path in sorted(glob.glob(os.path.join(instances_dir, "Jobs", "*.json"))):
+        name = os.path.splitext(os.path.basename(job_config_path))[0]
+        machine_config_path = os.path.join(instances_dir, "Machines", name.rsplit("-", 1)[0] + ".json")
+        if os.path.exists(machine_config_path):
+            instances.append((name, machine_config_path, job_config_path))
+    return instances
+
+
+def sample_repeat_vectors(job_config_path, job_repeats_params, num_samples, seed=0):
+    # Env.sample_job_repeats("normal")과 같은 분포, instance의 deadline 수를 넘지 않는다
+    with open(job_config_path, "r") as file:
+        max_repeats = [len(job["deadline"]) for job in json.load(file)["jobs"]]
+    rng = np.random.default_rng(seed)
+    vectors = []
+    for _ in range(num_samples):
+        vectors.append([int(np.clip(int(rng.normal(mean, std)), 1, limit)) for (mean, std), limit in zip(job_repeats_params, max_repeats)])
+    return vectors
+
+
+def load_incumbents(csv_path):
+    # 이전 평가 CSV에서 (instance, repeats, seed)별로 끝까지 배치한 episode 중 가장 작은 final cost
+    incumbents = {}
+    with open(csv_path, "r", newline="") as file:
+        for row in csv.DictReader(file):
+            if int(row.get("pruned") or 0):
+                continue
+            key = (row["instance"], row["repeats"], int(row["seed"]))
+            cost = sum(float(row[name]) for name in ("cost_deadline", "cost_hole", "cost_processing", "cost_makespan"))
+            incumbents[key] = min(cost, incumbents.get(key, cost))
+    return incumbents
+
+
+def env_kwargs_from_space(observation_space):
+    # model이 학습된 env의 max_time / num_of_types를 observation space shape에서 역산한다
+    env_kwargs = {}
+    if isinstance(observation_space, spaces.Dict):
+        if "schedule_heatmap" in observation_space.spaces:
+            env_kwargs["max_time"] = int(observation_space["schedule_heatmap"].shape[-1])
+        if "total_count_per_type" in observation_space.spaces:
+            env_kwargs["num_of_types"] = int(observation_space["total_count_per_type"].shape[0])
+    return env_kwargs
+
+
+def _space_mismatch(model_space, env_space):
+    # 다르면 이유 문자열, 같으면 None
+    if isinstance(model_space, spaces.Dict) and isinstance(env_space, spaces.Dict):
+        model_keys, env_keys = set(model_space.spaces), set(env_space.spaces)
+        if model_keys != env_keys:
+            return f"observation keys differ (model only: {sorted(model_keys - env_keys)}, env only: {sorted(env_keys - model_keys)})"
+        for key in sorted(model_keys):
+            if model_space[key].shape != env_space[key].shape:
+                return f"observation '{key}' shape {model_space[key].shape} != {env_space[key].shape}"
+        return None
+    if model_space.shape != env_space.shape:
+        return f"observation shape {model_space.shape} != {env_space.shape}"
+    return None
+
+
+def _load_policy(checkpoint):
+    if checkpoint not in _POLICIES:
+        if checkpoint.startswith(RULE_PREFIX):
+            _POLICIES[checkpoint] = None
+        else:
+            from sb3_contrib import MaskablePPO
+            _POLICIES[checkpoint] = MaskablePPO.load(checkpoint, device="cpu")
+    return _POLICIES[checkpoint]
+
+
+def _init_worker():
+    # process 수만큼 torch thread가 겹치지 않도록 worker 당 1개만 쓴다
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def _run_episode(env, policy, rule, rng, repeats, seed, incumbent=None):
+    env.current_repeats = list(repeats)
+    env.set_incumbent(incumbent)
+    observation, _ = env.reset(seed=seed)
+    scheduler = env.custom_scheduler
+    start_time = time.perf_counter()
+    total_reward, num_illegal = 0.0, 0
+    while True:
+        num_scheduled_before = scheduler.num_scheduled_operations
+        if policy is None:
+            action = dispatch_action(env, rule, rng)
+        else:
+            action, _ = policy.predict(observation, deterministic=True, action_masks=env.action_masks())
+        observation, reward, terminated, truncated, _ = env.step(action)
+        total_reward += reward
+        num_illegal += scheduler.num_scheduled_operations == num_scheduled_before
+        if terminated or truncated:
+            break
+
+    total_cost = scheduler.cal_final_cost()
+    lower_bound = env.lower_bound_cost()
+    tardiness = [job.tardiness for job_list in scheduler.jobs for job in sorted(job_list, key=lambda job: job.index)]
+    return {
+        "repeats": " ".join(str(repeat) for repeat in repeats),
+        "seed": seed,
+        "reward": total_reward,
+        "cost_deadline": scheduler.cost_deadline,
+        "cost_hole": scheduler.cost_hole,
+        "cost_processing": scheduler.cost_processing,
+        "cost_makespan": scheduler.cost_makespan,
+        "makespan": scheduler.makespan,
+        "target_time": env.target_time,
+        "makespan_ratio": scheduler.makespan / env.target_time,
+        "num_steps": env.num_steps,
+        "num_illegal": int(num_illegal),
+        "tardiness": " ".join(str(value) for value in tardiness),
+        "lower_bound_cost": lower_bound,
+        "lower_bound_makespan": env.lower_bounds['makespan'],
+        "gap": optimality_gap(scheduler.lower_bound if scheduler.pruned else total_cost, lower_bound),
+        "pruned": int(scheduler.pruned),
+        "seconds": time.perf_counter() - start_time,
+        "cached": 0,
+    }
+
+
+def _evaluate_worker(task):
+    # task 하나 = (checkpoint, instance) 조합의 episode 묶음
+    checkpoint, (instance_name, machine_config_path, job_config_path), job_repeats_params, episodes, env_kwargs, keep_records = task
+    policy = _load_policy(checkpoint)
+    with open(job_config_path, "r") as job_file, open(machine_config_path, "r") as machine_file:
+        default_kwargs = suggest_env_params(json.load(job_file), json.load(machine_file))
+    if policy is not None:
+        default_kwargs.update(env_kwargs_from_space(policy.observation_space))
+    env_kwargs = {**default_kwargs, **env_kwargs}
+    env = RJSPEnv(machine_config_path, job_config_path, job_repeats_params, test_mode=True, info_mode="minimal", **env_kwargs)
+
+    if policy is not None:
+        mismatch = _space_mismatch(policy.observation_space, env.observation_space)
+        if mismatch is None and policy.action_space != env.action_space:
+            mismatch = f"action space {policy.action_space} != {env.action_space}"
+        if mismatch is not None:
+            return checkpoint, instance_name, [], mismatch
+
+    rule = checkpoint[len(RULE_PREFIX):] if policy is None else None
+    rows = []
+    for key, repeats, seed, incumbent in episodes:
+        row = _run_episode(env, policy, rule, np.random.default_rng(seed), repeats, seed, incumbent)
+        record = ScheduleRecord.from_scheduler(env.custom_scheduler) if keep_records else None
+        rows.append((key, {"checkpoint": checkpoint, "instance": instance_name, **row}, record))
+    return checkpoint, instance_name, rows, None
+
+
+def evaluate_checkpoints(output_path, checkpoints, instances, job_repeats_params=(3, 1), num_repeat_samples=4, seeds=(0, ), num_workers=None, episodes_per_task=8, env_kwargs=None, seed=0, cache_dir=None, cache_bytes=256 * 2**20, incumbents=None):
+    # output_path CSV에 episode별 KPI를 기록하고 건너뛴 (checkpoint, instance, 이유) list를 반환한다
+    # job_repeats_params는 job 공통 (mean, std) 하나 또는 instance 이름 -> [(mean, std), ...] dict
+    # incumbents는 (instance 이름, "repeats" 문자열, seed) -> final cost dict
+    env_kwargs = dict(env_kwargs or {})
+    incumbents = incumbents or {}
+    cache = EvaluationCache(cache_dir, cache_bytes) if cache_dir else None
+    cached_rows = []
+    tasks = []
+    for instance in instances:
+        instance_name, _, job_config_path = instance
+        with open(job_config_path, "r") as file:
+            num_jobs = len(json.load(file)["jobs"])
+        if isinstance(job_repeats_params, dict):
+            repeats_params = list(job_repeats_params[instance_name])
+        else:
+            repeats_params = [tuple(job_repeats_params)] * num_jobs
+        # 모든 checkpoint가 같은 repeat vector / seed로 평가되도록 instance 단위로 한 번만 샘플링한다
+        episodes = [(repeats, episode_seed) for repeats in sample_repeat_vectors(job_config_path, repeats_params, num_repeat_samples, seed) for episode_seed in seeds]
+        for checkpoint in checkpoints:
+            pending = []
+            for repeats, episode_seed in episodes:
+                key = cache.make_key(checkpoint, instance[1], job_config_path, repeats, episode_seed, env_kwargs) if cache else None
+                hit = cache.get(key) if cache else None
+                if hit is not None:
+                    cached_rows.append({"pruned": 0, **hit[0], "cached": 1})
+                else:
+                    incumbent = incumbents.get((instance_name, " ".join(str(repeat) for repeat in repeats), episode_seed))
+                    pending.append((key, repeats, episode_seed, incumbent))
+            for start in range(0, len(pending), episodes_per_task):
+                tasks.append((checkpoint, instance, repeats_params, pending[start:start + episodes_per_task], env_kwargs, cache is not None))
+
+    num_workers = max(1, min(num_workers or os.cpu_count() or 1, len(tasks) or 1))
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    skipped = {}
+    with open(output_path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(cached_rows)
+        # 평가 중 exception이 나도 executor가 shutdown 되도록 with 블록 안에서 결과를 쓴다
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker) if num_workers > 1 else nullcontext() as executor:
+            if executor is None:
+                _init_worker()
+                results = map(_evaluate_worker, tasks)
+            else:
+                results = (future.result() for future in as_completed([executor.submit(_evaluate_worker, task) for task in tasks]))
+            for checkpoint, instance_name, rows, mismatch in results:
+                if mismatch is not None:
+                    skipped[(checkpoint, instance_name)] = mismatch
+                for key, row, record in rows:
+                    writer.writerow(row)
+                    if cache and not row["pruned"]:
+                        cache.put(key, row, record)
+                file.flush()
+
+    return [(checkpoint, instance_name, reason) for (checkpoint, instance_name), reason in skipped.items()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate MaskablePPO checkpoints and dispatching rules over instances")
+    parser.add_argument("--models", default="models/paper", help="directory searched for */best_model.zip and */final_model.zip")
+    parser.add_argument("--checkpoint", action="append", help="checkpoint path or rule:<name> (overrides --models)")
+    parser.add_argument("--instances", default="instances")
+    parser.add_argument("--output", default="evaluation.csv")
+    parser.add_argument("--repeats", type=float, nargs=2, default=(3, 1), metavar=("MEAN", "STD"))
+    parser.add_argument("--repeat-samples", type=int, default=4)
+    parser.add_argument("--seeds", type=int, default=1, help="number of seeds per repeat vector")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-dir", default=None, help="reuse episode results stored here (RJSPEnv.Cache)")
+    parser.add_argument("--cache-mb", type=int, default=256)
+    parser.add_argument("--prune-against", default=None, help="previous results CSV whose best cost per episode is used as the pruning incumbent")
+    args = parser.parse_args()
+
+    checkpoints = args.checkpoint or find_checkpoints(args.models)
+    start_time = time.perf_counter()
+    skipped = evaluate_checkpoints(args.output, checkpoints, find_instances(args.instances), tuple(args.repeats), args.repeat_samples, tuple(range(args.seeds)), args.workers, seed=args.seed, cache_dir=args.cache_dir, cache_bytes=args.cache_mb * 2**20, incumbents=load_incumbents(args.prune_against) if args.prune_against else None)
+    for checkpoint, instance_name, reason in skipped:
+        print(f"skipped {checkpoint} on {instance_name} : {reason}")
+    print(f"{args.output} ({time.perf_counter() - start_time:.1f}s)")
@@ -0,0 +1,168 @@
+import json
+import numpy as np
+import torch
+from gymnasium import spaces
+
+# 학습된 MaskablePPO checkpoint를 서빙용 독립 module로 내보낸다
+# 입력은 flatten_observation=True env의 flat v4 observation (float32, key 정렬 순서)과 action mask,
+# 출력은 mask를 적용한 (argmax action, action 확률)
+# SB3 / sb3_contrib 없이 torch.jit.load (또는 onnxruntime)만으로 추론할 수 있다
+#
+#   export_torchscript("models/.../best_model.zip", "policy.pt")
+#   runner = PolicyRunner("policy.pt")
+#   action = runner.predict(env._get_observation(), env.action_masks())       # 1개
+#   actions = runner.predict(batch_observations, batch_masks)                  # (B, ...) batch
+#
+# Dict observation env를 그대로 써도 된다 (runner가 layout대로 이어 붙인다)
+
+MASKED_LOGIT = -1e8  # sb3_contrib MaskableCategorical과 같은 값
+METADATA_NAME = "rjsp_policy.json"
+
+
+def _observation_layout(observation_space):
+    # RJSPEnv._flat_observation_space와 같은 layout (gymnasium Dict는 key를 정렬해서 저장한다)
+    if not isinstance(observation_space, spaces.Dict):
+        return {None: (0, int(np.prod(observation_space.shape)), observation_space.shape)}
+    layout = {}
+    start = 0
+    for key, space in observation_space.spaces.items():
+        end = start + int(np.prod(space.shape))
+        layout[key] = (start, end, space.shape)
+        start = end
+    return layout
+
+
+def _action_dims(action_space):
+    if isinstance(action_space, spaces.MultiDiscrete):
+        return [int(n) for n in action_space.nvec]
+    if isinstance(action_space, spaces.Discrete):
+        return [int(action_space.n)]
+    raise ValueError(f"Unknown action space : {action_space}")
+
+
+class MaskedPolicy(torch.nn.Module):
+    # MaskablePPO policy의 actor 부분만 떼어내고 mask 적용까지 한 번에 한다
+    def __init__(self, policy):
+        super().__init__()
+        self.policy = policy
+        self.layout = _observation_layout(policy.observation_space)
+        self.action_dims = _action_dims(policy.action_space)
+
+    def forward(self, observation, action_mask):
+        from stable_baselines3.common.preprocessing import preprocess_obs
+
+        if None in self.layout:
+            observation_dict = observation
+        else:
+            observation_dict = {key: observation[:, start:end].reshape((-1, ) + tuple(shape)) for key, (start, end, shape) in self.layout.items()}
+        features = self.policy.pi_features_extractor(preprocess_obs(observation_dict, self.policy.observation_space, normalize_images=self.policy.normalize_images))
+        logits = self.policy.action_net(self.policy.mlp_extractor.forward_actor(features))
+        logits = torch.where(action_mask, logits, torch.full_like(logits, MASKED_LOGIT))
+
+        # MultiDiscrete는 차원별로 따로 softmax / argmax
+        actions, probabilities = [], []
+        for segment in torch.split(logits, self.action_dims, dim=1):
+            actions.append(torch.argmax(segment, dim=1))
+            probabilities.append(torch.softmax(segment, dim=1))
+        return torch.stack(actions, dim=1), torch.cat(probabilities, dim=1)
+
+
+def _load_masked_policy(checkpoint):
+    from sb3_contrib import MaskablePPO
+
+    model = MaskablePPO.load(checkpoint, device="cpu")
+    module = MaskedPolicy(model.policy).eval()
+    layout = module.layout
+    observation_size = max(end for _, end, _ in layout.values())
+    example = (torch.zeros((1, observation_size), dtype=torch.float32), torch.ones((1, sum(module.action_dims)), dtype=torch.bool))
+    metadata = {
+        "layout": {str(key): [start, end, list(shape)] for key, (start, end, shape) in layout.items()},
+        "action_dims": module.action_dims,
+        "observation_size": observation_size,
+    }
+    return module, example, metadata
+
+
+def export_torchscript(checkpoint, output_path):
+    # trace로 key 분리 / preprocessing / mask까지 하나의 graph로 만든다 (batch 크기는 자유)
+    module, example, metadata = _load_masked_policy(checkpoint)
+    with torch.no_grad():
+        traced = torch.jit.trace(module, example)
+        traced = torch.jit.freeze(traced)
+    torch.jit.save(traced, output_path, _extra_files={METADATA_NAME: json.dumps(metadata)})
+    return metadata
+
+
+def export_onnx(checkpoint, output_path, opset_version=17):
+    # onnx / onnxruntime은 선택 사항이므로 이 함수에서만 필요하다
+    module, example, metadata = _load_masked_policy(checkpoint)
+    with torch.no_grad():
+        torch.onnx.export(
+            module, example, output_path, opset_version=opset_version,
+            input_names=["observation", "action_mask"], output_names=["action", "probabilities"],
+            dynamic_axes={name: {0: "batch"} for name in ("observation", "action_mask", "action", "probabilities")},
+            dynamo=False,
+        )
+    with open(output_path + ".json", "w") as file:
+        json.dump(metadata, file)
+    return metadata
+
+
+class PolicyRunner():
+    # export_torchscript / export_onnx 결과로 RJSPEnv observation에서 바로 action을 고른다
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        if path.endswith(".onnx"):
+            import onnxruntime
+
+            with open(path + ".json", "r") as file:
+                metadata = json.load(file)
+            options = onnxruntime.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            self.module = None
+        else:
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            extra_files = {METADATA_NAME: ""}
+            self.module = torch.jit.load(path, map_location="cpu", _extra_files=extra_files)
+            self.session = None
+            metadata = json.loads(extra_files[METADATA_NAME])
+        self.layout = {key: (start, end, tuple(shape)) for key, (start, end, shape) in metadata["layout"].items()}
+        self.action_dims = metadata["action_dims"]
+        self.observation_size = metadata["observation_size"]
+
+    def flatten(self, observation):
+        # Dict observation (1개 또는 batch)을 flat float32 배열로
+        if not isinstance(observation, dict):
+            return np.asarray(observation, dtype=np.float32)
+        first = np.asarray(next(iter(observation.values())))
+        key = next(iter(observation))
+        batch_shape = first.shape[:first.ndim - len(self.layout[key][2])]
+        flat_observation = np.empty(batch_shape + (self.observation_size, ), dtype=np.float32)
+        for key, (start, end, _) in self.layout.items():
+            flat_observation[..., start:end] = np.asarray(observation[key]).reshape(batch_shape + (-1, ))
+        return flat_observation
+
+    def __call__(self, observation, action_mask):
+        # (actions, probabilities), 입력이 1개면 batch 차원 없이 반환
+        observation = self.flatten(observation)
+        action_mask = np.asarray(action_mask, dtype=bool)
+        single = observation.ndim == 1
+        if single:
+            observation, action_mask = observation[None], action_mask[None]
+        if self.session is not None:
+            actions, probabilities = self.session.run(None, {"observation": observation, "action_mask": action_mask})
+        else:
+            with torch.inference_mode():
+                actions, probabilities = self.module(torch.from_numpy(observation), torch.from_numpy(action_mask))
+            actions, probabilities = actions.numpy(), probabilities.numpy()
+        if len(self.action_dims) == 1:
+            actions = actions[:, 0]
+        if single:
+            return actions[0], probabilities[0]
+        return actions, probabilities
+
+    def predict(self, observation, action_mask):
+        return self(observation, action_mask)[0]
@@ -0,0 +1,181 @@
+import argparse
+import colorsys
+import json
+import os
+import string
+import numpy as np
+
+# scaling 실험용 synthetic instance 생성기
+# instances/Jobs, instances/Machines 와 같은 JSON schema로 저장하거나
+# 바로 사용할 수 있는 배열 형식(.npz)으로 저장한다
+
+TYPE_LETTERS = string.ascii_uppercase  # type_encoding이 지원하는 'A' ~ 'Z'
+
+
+def _job_colors(num_jobs):
+    colors = []
+    for i in range(num_jobs):
+        hue = (i * 0.618033988749895) % 1.0
+        r, g, b = colorsys.hsv_to_rgb(hue, 0.65, 0.85)
+        colors.append("#{:02x}{:02x}{:02x}".format(int(r * 255), int(g * 255), int(b * 255)))
+    return colors
+
+
+def _sample_durations(rng, size, distribution, params):
+    # duration은 100 단위 (Env/Scheduler가 // 100으로 다루므로)
+    if distribution == "uniform":
+        low, high = params
+        units = rng.integers(int(low), int(high) + 1, size=size)
+    elif distribution == "normal":
+        mean, std = params
+        units = np.rint(rng.normal(mean, std, size=size))
+    elif distribution == "lognormal":
+        mean, sigma = params
+        units = np.rint(rng.lognormal(np.log(mean), sigma, size=size))
+    else:
+        raise ValueError(f"Unknown duration distribution : {distribution}")
+    return (np.maximum(units, 1) * 100).astype(int)
+
+
+def _sample_abilities(rng, num_machines, num_types, abilities_per_machine):
+    low, high = abilities_per_machine
+    high = min(high, num_types)
+    abilities = []
+    for _ in range(num_machines):
+        count = int(rng.integers(low, high + 1))
+        abilities.append(set(rng.choice(num_types, size=count, replace=False).tolist()))
+    # 모든 type은 최소 한 대의 머신에서 처리할 수 있어야 한다
+    for op_type in range(num_types):
+        if not any(op_type in ability for ability in abilities):
+            abilities[int(rng.integers(num_machines))].add(op_type)
+    return [sorted(ability) for ability in abilities]
+
+
+def generate_instance(num_jobs=100, num_machines=50, num_types=26, num_repeats=20, abilities_per_machine=(1, 3), operations_per_job=(2, 5), duration_distribution="uniform", duration_params=(1, 5), deadline_tightness=1.0, deadline_jitter=0.1, seed=0):
+    # abilities_per_machine : 머신 하나가 처리할 수 있는 type 수 범위 (클수록 ability overlap 증가)
+    # operations_per_job : job 하나의 operation 수 범위 (precedence chain 깊이)
+    # deadline_tightness : 1보다 작을수록 deadline이 빡빡해진다
+    if not 1 <= num_types <= len(TYPE_LETTERS):
+        raise ValueError(f"num_of_types must be between 1 and {len(TYPE_LETTERS)}")
+    rng = np.random.default_rng(seed)
+
+    abilities = _sample_abilities(rng, num_machines, num_types, abilities_per_machine)
+    machines = [
+        {"name": f"machine {i + 1}", "type": ", ".join(TYPE_LETTERS[t] for t in ability)}
+        for i, ability in enumerate(abilities)
+    ]
+
+    colors = _job_colors(num_jobs)
+    jobs = []
+    operation_index = 0
+    for j in range(num_jobs):
+        num_operations = int(rng.integers(operations_per_job[0], operations_per_job[1] + 1))
+        types = rng.integers(num_types, size=num_operations)
+        durations = _sample_durations(rng, num_operations, duration_distribution, duration_params)
+        operations = []
+        for k in range(num_operations):
+            operations.append({
+                "index": operation_index,
+                "type": TYPE_LETTERS[int(types[k])],
+                "duration": int(durations[k]),
+                "predecessor": None if k == 0 else operation_index - 1,
+            })
+            operation_index += 1
+        jobs.append({
+            "name": f"Job {j + 1}",
+            "color": colors[j],
+            "earliest_start": 0,
+            "operations": operations,
+            "deadline": [],
+        })
+
+    # deadline : 한 round (모든 job을 한 번씩 처리)에 걸리는 시간을 기준으로 repeat마다 늘어난다
+    total_work = sum(op["duration"] for job in jobs for op in job["operations"])
+    round_time = total_work / num_machines
+    for job in jobs:
+        chain_time = sum(op["duration"] for op in job["operations"])
+        for r in range(num_repeats):
+            deadline = deadline_tightness * (chain_time + r * round_time)
+            deadline *= 1 + rng.uniform(-deadline_jitter, deadline_jitter)
+            job["deadline"].append(int(max(chain_time, np.ceil(deadline / 100) * 100)))
+        job["deadline"].sort()
+
+    return {"jobs": jobs}, {"machines": machines}
+
+
+def suggest_env_params(jobs, machines, repeats=None):
+    # RJSPEnv의 max_time, num_of_types 추천값
+    # max_time : 평균 부하 기준 makespan 추정치의 2배 (100 단위)
+    jobs = jobs["jobs"] if isinstance(jobs, dict) else jobs
+    machines = machines["machines"] if isinstance(machines, dict) else machines
+    repeats = repeats or [len(job["deadline"]) for job in jobs]
+    total_work = sum(sum(op["duration"] for op in job["operations"]) * repeat for job, repeat in zip(jobs, repeats))
+    longest_chain = max(sum(op["duration"] for op in job["operations"]) for job in jobs)
+    makespan_estimate = max(total_work / len(machines), longest_chain)
+    types = {op["type"] for job in jobs for op in job["operations"]}
+    return {
+        "max_time": int(np.ceil(2 * makespan_estimate / 100)) + 1,
+        "num_of_types": TYPE_LETTERS.index(max(types)) + 1,
+    }
+
+
+def compile_instance(jobs, machines):
+    # JSON instance를 배열 형식으로 변환한다
+    jobs = jobs["jobs"] if isinstance(jobs, dict) else jobs
+    machines = machines["machines"] if isinstance(machines, dict) else machines
+    operations = [(j, op) for j, job in enumerate(jobs) for op in job["operations"]]
+    max_repeats = max(len(job["deadline"]) for job in jobs)
+    deadlines = np.full((len(jobs), max_repeats), -1, dtype=np.int64)
+    for j, job in enumerate(jobs):
+        deadlines[j, :len(job["deadline"])] = job["deadline"]
+    machine_ability = np.zeros(len(machines), dtype=np.int64)
+    for m, machine in enumerate(machines):
+        for letter in machine["type"].split(", "):
+            machine_ability[m] |= 1 << TYPE_LETTERS.index(letter)
+    return {
+        "operation_job": np.array([j for j, _ in operations], dtype=np.int32),
+        "operation_index": np.array([op["index"] for _, op in operations], dtype=np.int32),
+        "operation_type": np.array([TYPE_LETTERS.index(op["type"]) for _, op in operations], dtype=np.int8),
+        "operation_duration": np.array([op["duration"] for _, op in operations], dtype=np.int64),
+        "operation_predecessor": np.array([-1 if op["predecessor"] is None else op["predecessor"] for _, op in operations], dtype=np.int32),
+        "job_earliest_start": np.array([job["earliest_start"] for job in jobs], dtype=np.int64),
+        "job_deadline": deadlines,
+        "machine_ability": machine_ability,
+    }
+
+
+def write_instance(jobs, machines, job_path, machine_path, compiled_path=None):
+    for path, data in ((job_path, jobs), (machine_path, machines)):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(data, file, indent=2)
+    if compiled_path:
+        np.savez(compiled_path, **compile_instance(jobs, machines))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic repeatable job shop instance")
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--machines", type=int, default=50)
+    parser.add_argument("--types", type=int, default=26)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--abilities", type=int, nargs=2, default=(1, 3), metavar=("MIN", "MAX"))
+    parser.add_argument("--operations", type=int, nargs=2, default=(2, 5), metavar=("MIN", "MAX"))
+    parser.add_argument("--duration-distribution", default="uniform", choices=("uniform", "normal", "lognormal"))
+    parser.add_argument("--duration-params", type=float, nargs=2, default=(1, 5))
+    parser.add_argument("--tightness", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="instances")
+    parser.add_argument("--compiled", action="store_true", help="also write an .npz array version")
+    args = parser.parse_args()
+
+    jobs, machines = generate_instance(args.jobs, args.machines, args.types, args.repeats, tuple(args.abilities), tuple(args.operations), args.duration_distribution, tuple(args.duration_params), args.tightness, seed=args.seed)
+    name = f"syn{args.seed}-{args.jobs}x{args.machines}"
+    job_path = os.path.join(args.out, "Jobs", f"{name}-{args.repeats}.json")
+    machine_path = os.path.join(args.out, "Machines", f"{name}.json")
+    compiled_path = os.path.join(args.out, f"{name}-{args.repeats}.npz") if args.compiled else None
+    write_instance(jobs, machines, job_path, machine_path, compiled_path)
+    print(f"{job_path}\n{machine_path}")
+    print(suggest_env_params(jobs, machines))
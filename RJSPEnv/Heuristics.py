@@ -0,0 +1,98 @@
+import numpy as np
+
+# customRepeatableScheduler 위에서 동작하는 dispatching rule 모음
+# 1. rule에 따라 schedule_buffer에 올라와 있는 job 하나를 고른다
+# 2. 해당 operation을 가장 빨리 끝낼 수 있는 머신 (cal_best_finish_time 최소)을 고른다
+
+DISPATCHING_RULES = ("random", "edd", "spt", "lpt", "mwkr", "tardiness")
+
+
+def frontier_operations(scheduler):
+    # schedule_buffer에 올라와 있는 (job index, repeat, operation) 목록
+    result = []
+    for job_index, (repeat_index, operation_index) in enumerate(scheduler.schedule_buffer):
+        if repeat_index == -1:
+            continue
+        job = scheduler.jobs[job_index][0]
+        result.append((job_index, job, job.operation_queue[operation_index]))
+    return result
+
+
+def _job_priority(rule, job, operation):
+    # 작을수록 먼저 선택된다
+    if rule == "edd":
+        return job.deadline
+    if rule == "spt":
+        return operation.duration
+    if rule == "lpt":
+        return -operation.duration
+    if rule == "mwkr":
+        return -sum(op.duration for op in job.operation_queue if op.finish is None)
+    if rule == "tardiness":
+        return -job.estimated_tardiness
+    raise ValueError(f"Unknown dispatching rule : {rule}")
+
+
+def select_job(scheduler, rule="edd", rng=None):
+    candidates = frontier_operations(scheduler)
+    if not candidates:
+        return None
+    if rule == "random":
+        rng = rng if rng is not None else np.random.default_rng()
+        return candidates[rng.integers(len(candidates))][0]
+    # 동점이면 job index가 작은 쪽
+    return min(candidates, key=lambda x: (_job_priority(rule, x[1], x[2]), x[0]))[0]
+
+
+def select_machine(scheduler, job_index):
+    job = scheduler.jobs[job_index][0]
+    operation = job.operation_queue[scheduler.schedule_buffer[job_index][1]]
+    best_machine, best_finish_time = None, None
+    for machine_index in scheduler.legal_machines(job_index):
+        machine_index = int(machine_index)
+        finish_time = scheduler.machines[machine_index].cal_best_finish_time(op_duration=operation.duration, op_type=operation.type, op_earliest_start=operation.earliest_start)
+        if best_finish_time is None or finish_time < best_finish_time:
+            best_machine, best_finish_time = machine_index, finish_time
+    return best_machine
+
+
+def conflict_set(scheduler):
+    # Giffler-Thompson conflict set
+    # 모든 legal [machine, job] 중 가장 빨리 끝나는 배치의 finish를 C*, 그 머신을 m*라고 할 때
+    # m*에서 C*보다 먼저 시작할 수 있는 배치들 (이 중 하나만 남으면 agent에게 물어볼 필요가 없다)
+    # start / finish는 추정 (cal_best_finish_time)이 아니라 실제 배치 규칙 (placement_start)으로 계산한다
+    candidates = []
+    for job_index, job, operation in frontier_operations(scheduler):
+        for machine_index in scheduler.legal_machines(job_index):
+            machine_index = int(machine_index)
+            start = scheduler.placement_start([machine_index, job_index])
+            candidates.append((start + operation.duration, machine_index, job_index, start))
+    if not candidates:
+        return []
+    earliest_finish, earliest_machine, _, _ = min(candidates)
+    return [[machine_index, job_index] for _, machine_index, job_index, start in candidates if machine_index == earliest_machine and start < earliest_finish]
+
+
+def dispatch(scheduler, rule="edd", rng=None):
+    # rule에 따른 [machine, job] action, 더 배치할 operation이 없으면 None
+    job_index = select_job(scheduler, rule, rng)
+    if job_index is None:
+        return None
+    return [select_machine(scheduler, job_index), job_index]
+
+
+def dispatch_action(env, rule="edd", rng=None, epsilon=0.0):
+    # RJSPEnv의 action 형식으로 변환한 dispatch 결과 (Discrete index, factorized mode이면 [job, machine])
+    # epsilon 확률로 legal action 중 하나를 무작위로 고른다 (dataset 다양성 확보용)
+    scheduler = env.custom_scheduler
+    explore = False
+    if epsilon > 0:
+        rng = rng if rng is not None else np.random.default_rng()
+        explore = rng.random() < epsilon
+    if explore:
+        machine_index, job_index = divmod(int(rng.choice(scheduler.legal_action_list())), env.len_jobs)
+    else:
+        machine_index, job_index = dispatch(scheduler, rule, rng)
+    if env.action_mode == "factorized":
+        return np.array([job_index, machine_index])
+    return machine_index * env.len_jobs + job_index
@@ -0,0 +1,111 @@
+import warnings
+import numpy as np
+
+# customRepeatableScheduler의 kernel_backend용 정수 kernel
+# 머신별 operation (start, finish)를 start 순으로 담은 padded 배열 (M, capacity)과 머신별 operation 수 (M, )를 입력으로 받는다
+#
+# fit_start         : _schedule_operation의 빈 구간 (window) 탐색, operation이 들어갈 가장 이른 시작 시각
+# best_finish_rows  : _update_job_state의 repeat별 추정에 쓰는 머신 (rows)별 Machine.cal_best_finish_time (배열)
+#
+# "numba" : 아래 loop 구현을 numba.njit로 compile 한다 (numba가 없으면 경고 후 "numpy")
+# "numpy" : 같은 계산을 머신 / operation 축으로 vectorize 한다
+# 두 backend 모두 python 구현 (Machine.cal_best_finish_time, _schedule_operation)과 같은 값을 낸다 (RJSPEnv.Equivalence로 확인)
+
+KERNEL_BACKENDS = ("python", "numpy", "numba")
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _best_finish_loop(starts, finishes, count, duration, earliest_start):
+    # Machine.cal_best_finish_time과 같은 규칙 (operation이 2개 이상이면 첫 operation 앞은 보지 않는다)
+    if count == 0:
+        return earliest_start + duration
+    if count == 1:
+        if starts[0] >= earliest_start + duration:
+            return earliest_start + duration
+        return max(finishes[0], earliest_start) + duration
+    for i in range(1, count):
+        start = max(finishes[i - 1], earliest_start)
+        if starts[i] - start >= duration:
+            return start + duration
+    return max(finishes[count - 1], earliest_start) + duration
+
+
+def _best_finish_rows_loop(starts, finishes, counts, rows, duration, earliest_start):
+    best = np.empty(len(rows), dtype=np.int64)
+    for i in range(len(rows)):
+        row = rows[i]
+        best[i] = _best_finish_loop(starts[row], finishes[row], counts[row], duration, earliest_start)
+    return best
+
+
+def _fit_start_loop(starts, finishes, count, duration, earliest_start):
+    # _schedule_operation과 같은 규칙 : 0부터 시작하는 빈 구간 중 처음으로 들어가는 곳, 없으면 마지막 operation 뒤
+    window_start = 0
+    last_finish = 0
+    for i in range(count):
+        window_end = starts[i]
+        if window_end > window_start and earliest_start <= window_end:
+            start = max(earliest_start, window_start)
+            if start + duration <= window_end:
+                return start
+        window_start = finishes[i]
+        last_finish = max(last_finish, window_start)
+    return max(earliest_start, last_finish)
+
+
+def _best_finish_rows_numpy(starts, finishes, counts, rows, duration, earliest_start):
+    counts = counts[rows]
+    width = int(counts.max())
+    if width == 0:
+        return np.full(len(rows), earliest_start + duration, dtype=np.int64)
+    starts, finishes = starts[rows, :width], finishes[rows, :width]
+    rows_index = np.arange(len(rows))
+    best = np.maximum(finishes[rows_index, np.maximum(counts - 1, 0)], earliest_start) + duration
+    if width > 1:
+        # i-1번째와 i번째 operation 사이 (i < count)에 들어가는 첫 구간
+        candidate = np.maximum(finishes[:, :-1], earliest_start)
+        fits = (starts[:, 1:] - candidate >= duration) & (np.arange(width - 1) < (counts - 1)[:, None])
+        first = fits.argmax(axis=1)
+        best = np.where(fits[rows_index, first], candidate[rows_index, first] + duration, best)
+    # operation이 1개면 앞쪽 빈 구간도 보고, 없으면 earliest_start에 바로 시작한다
+    before_first = (counts == 1) & (starts[:, 0] >= earliest_start + duration)
+    return np.where((counts == 0) | before_first, earliest_start + duration, best)
+
+
+def _fit_start_numpy(starts, finishes, count, duration, earliest_start):
+    if count == 0:
+        return max(earliest_start, 0)
+    starts, finishes = starts[:count], finishes[:count]
+    window_starts = np.concatenate(([0], finishes[:-1]))
+    candidate = np.maximum(window_starts, earliest_start)
+    fits = (starts > window_starts) & (earliest_start <= starts) & (candidate + duration <= starts)
+    if fits.any():
+        return int(candidate[fits.argmax()])
+    return max(earliest_start, int(finishes.max()))
+
+
+if numba is not None:
+    # loop 구현을 그대로 compile 한다 (_best_finish_rows_loop 안의 _best_finish_loop도 compile된 버전을 부른다)
+    _best_finish_loop = numba.njit(cache=True)(_best_finish_loop)
+    _best_finish_rows_loop = numba.njit(cache=True)(_best_finish_rows_loop)
+    _fit_start_loop = numba.njit(cache=True)(_fit_start_loop)
+
+
+class Kernels():
+    def __init__(self, backend):
+        if backend not in KERNEL_BACKENDS or backend == "python":
+            raise ValueError(f"Unknown kernel_backend : {backend}")
+        if backend == "numba" and numba is None:
+            warnings.warn("numba is not installed, falling back to kernel_backend='numpy'")
+            backend = "numpy"
+        self.backend = backend
+        if backend == "numba":
+            self.fit_start = _fit_start_loop
+            self.best_finish_rows = _best_finish_rows_loop
+        else:
+            self.fit_start = _fit_start_numpy
+            self.best_finish_rows = _best_finish_rows_numpy
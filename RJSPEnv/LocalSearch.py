@@ -0,0 +1,278 @@
+import random
+import time
+import numpy as np
+
+# 끝난 customRepeatableScheduler schedule을 시간 제한 안에서 개선하는 local search
+# schedule을 머신별 operation 순서로 보고, 각 operation은 (job 선행 operation, 머신 앞 operation, release) 중 가장 늦은 시각에 시작한다
+# (semi-active decoding : 순서만 정하면 모든 operation이 최대한 왼쪽으로 당겨진다 -> hole로 shift left)
+#
+# move
+#   "swap"     : 같은 머신에서 이웃한 두 operation 순서 교환
+#   "reinsert" : 같은 머신 안에서 operation 위치 이동
+#   "reassign" : 처리 가능한 다른 머신으로 옮긴다 (비슷한 시각 위치에 끼워 넣는다)
+#
+# move를 평가할 때는 바뀐 위치에서 도달 가능한 operation만 다시 계산하고
+# cost도 바뀐 repeat의 deadline 초과 / 바뀐 머신의 hole / makespan 차이만 더한다 (cal_final_cost를 다시 부르지 않는다)
+#
+#   search = LocalSearch(scheduler)
+#   result = search.run(time_budget=1.0, seed=0)    # result["curve"] = [(경과 시간, cost), ...]
+#   search.apply(scheduler)                         # 개선된 schedule을 scheduler에 반영
+
+MOVES = ("swap", "reinsert", "reassign")
+
+
+class LocalSearch():
+    def __init__(self, scheduler, reinsert_window=5):
+        if not scheduler.is_done():
+            raise ValueError("LocalSearch requires a finished schedule")
+        if scheduler.horizon > 0:
+            raise ValueError("LocalSearch does not support compacted (streaming) schedules")
+        self.reinsert_window = reinsert_window
+        self.weights = (scheduler.cost_deadline_per_time, scheduler.cost_hole_per_time, scheduler.cost_processing_per_time, scheduler.cost_makespan_per_time)
+        self.initial_cost = scheduler.cal_final_cost()
+
+        # operation 단위 배열 (index = current_schedule 순서)
+        self.operations = list(scheduler.current_schedule)
+        index_of = {id(operation): i for i, operation in enumerate(self.operations)}
+        num_operations = len(self.operations)
+        self.duration = [operation.duration for operation in self.operations]
+        self.release = [0] * num_operations
+        self.job_prev = [-1] * num_operations
+        self.job_next = [-1] * num_operations
+        self.deadline = [None] * num_operations  # repeat의 마지막 operation만 deadline을 가진다
+        self.capable = [None] * num_operations
+        for job_index, job_list in enumerate(scheduler.jobs):
+            for job in job_list:
+                previous = -1
+                for operation_index, operation in enumerate(job.operation_queue):
+                    i = index_of[id(operation)]
+                    self.capable[i] = [int(machine) for machine in np.flatnonzero(scheduler.capable_machines[job_index][operation_index])]
+                    if previous == -1:
+                        self.release[i] = operation.earliest_start or 0
+                    else:
+                        self.job_prev[i] = previous
+                        self.job_next[previous] = i
+                    previous = i
+                self.deadline[previous] = job.deadline
+
+        # 머신별 순서 (start 순)
+        num_machines = len(scheduler.machines)
+        self.sequences = [[] for _ in range(num_machines)]
+        for i in sorted(range(num_operations), key=lambda i: self.operations[i].start):
+            self.sequences[self.operations[i].machine].append(i)
+        self.machine_of = [operation.machine for operation in self.operations]
+        self.position = [0] * num_operations
+        for sequence in self.sequences:
+            for k, i in enumerate(sequence):
+                self.position[i] = k
+
+        self.start = [operation.start for operation in self.operations]
+        self.finish = [operation.finish for operation in self.operations]
+        self.work = [sum(self.duration[i] for i in sequence) for sequence in self.sequences]
+        self.up_time = sum(self.duration)
+
+        # 원래 schedule을 semi-active로 다시 계산 (shift left)
+        self._propagate(list(range(num_operations)))
+        self.hole = [self._machine_hole(machine) for machine in range(num_machines)]
+        self.last_finish = [self.finish[sequence[-1]] if sequence else 0 for sequence in self.sequences]
+        self.sum_of_time_exceeded = sum(max(0, self.finish[i] - self.deadline[i]) for i in range(num_operations) if self.deadline[i] is not None)
+        self.cost = self._cost(self.sum_of_time_exceeded, sum(self.hole), max(self.last_finish))
+
+    def _cost(self, time_exceeded, hole_time, makespan):
+        # customRepeatableScheduler.cal_final_cost와 같은 식
+        weight_deadline, weight_hole, weight_processing, weight_makespan = self.weights
+        return time_exceeded / 100 * weight_deadline + hole_time * weight_hole / 100 + self.up_time * weight_processing / 100 + makespan * weight_makespan / 100
+
+    def _machine_hole(self, machine):
+        sequence = self.sequences[machine]
+        if not sequence:
+            return 0
+        return self.finish[sequence[-1]] - self.start[sequence[0]] - self.work[machine]
+
+    def _propagate(self, seeds):
+        # seeds에서 (job 다음, 머신 다음) 방향으로 도달 가능한 operation의 시작 시각을 위상 순서로 다시 계산한다
+        # 순서가 순환하면 (job 선후관계와 머신 순서가 충돌) 아무것도 바꾸지 않고 None
+        # 아니면 다시 계산한 operation의 {index: (이전 start, 이전 finish)}
+        affected = set()
+        stack = list(seeds)
+        while stack:
+            i = stack.pop()
+            if i in affected:
+                continue
+            affected.add(i)
+            if self.job_next[i] != -1:
+                stack.append(self.job_next[i])
+            sequence = self.sequences[self.machine_of[i]]
+            if self.position[i] + 1 < len(sequence):
+                stack.append(sequence[self.position[i] + 1])
+
+        in_degree = {}
+        for i in affected:
+            machine_prev = self.sequences[self.machine_of[i]][self.position[i] - 1] if self.position[i] > 0 else -1
+            in_degree[i] = (self.job_prev[i] in affected) + (machine_prev in affected)
+        ready = [i for i, degree in in_degree.items() if degree == 0]
+        order = []
+        while ready:
+            i = ready.pop()
+            order.append(i)
+            for j in (self.job_next[i], self._machine_next(i)):
+                if j != -1 and j in in_degree:
+                    in_degree[j] -= 1
+                    if in_degree[j] == 0:
+                        ready.append(j)
+        if len(order) < len(affected):
+            return None
+
+        old_times = {}
+        for i in order:
+            old_times[i] = (self.start[i], self.finish[i])
+            start = self.release[i]
+            if self.job_prev[i] != -1:
+                start = max(start, self.finish[self.job_prev[i]])
+            if self.position[i] > 0:
+                start = max(start, self.finish[self.sequences[self.machine_of[i]][self.position[i] - 1]])
+            self.start[i] = start
+            self.finish[i] = start + self.duration[i]
+        return old_times
+
+    def _machine_next(self, i):
+        sequence = self.sequences[self.machine_of[i]]
+        return sequence[self.position[i] + 1] if self.position[i] + 1 < len(sequence) else -1
+
+    def _set_sequence(self, machine, sequence):
+        self.sequences[machine] = sequence
+        for k, i in enumerate(sequence):
+            self.position[i] = k
+            self.machine_of[i] = machine
+
+    def _propose(self, rng):
+        # {machine: 새 순서} (적용할 수 없으면 None)
+        move = rng.choice(MOVES)
+        i = rng.randrange(len(self.operations))
+        machine = self.machine_of[i]
+        sequence = self.sequences[machine]
+        k = self.position[i]
+        if move == "swap":
+            if k + 1 >= len(sequence):
+                return None
+            new_sequence = sequence[:]
+            new_sequence[k], new_sequence[k + 1] = new_sequence[k + 1], new_sequence[k]
+            return {machine: new_sequence}
+        if move == "reinsert":
+            target = min(max(0, k + rng.randint(-self.reinsert_window, self.reinsert_window)), len(sequence) - 1)
+            if target == k:
+                return None
+            new_sequence = sequence[:k] + sequence[k + 1:]
+            new_sequence.insert(target, i)
+            return {machine: new_sequence}
+        candidates = [m for m in self.capable[i] if m != machine]
+        if not candidates:
+            return None
+        target_machine = rng.choice(candidates)
+        target_sequence = self.sequences[target_machine]
+        # 지금 시작 시각과 비슷한 위치 (앞뒤 한 칸까지)
+        target = sum(1 for j in target_sequence if self.start[j] < self.start[i]) + rng.randint(-1, 1)
+        target = min(max(0, target), len(target_sequence))
+        new_target_sequence = target_sequence[:target] + [i] + target_sequence[target:]
+        return {machine: sequence[:k] + sequence[k + 1:], target_machine: new_target_sequence}
+
+    def _try(self, changes):
+        # changes를 적용해보고 cost가 줄면 유지 (True), 아니면 되돌린다 (False)
+        old_sequences = {machine: self.sequences[machine] for machine in changes}
+        old_work = {machine: self.work[machine] for machine in changes}
+        seeds = []
+        for machine, new_sequence in changes.items():
+            old_sequence = self.sequences[machine]
+            first_changed = next((k for k, (a, b) in enumerate(zip(old_sequence, new_sequence)) if a != b), min(len(old_sequence), len(new_sequence)))
+            seeds.extend(new_sequence[first_changed:])
+        for machine, new_sequence in changes.items():
+            self._set_sequence(machine, new_sequence)
+            self.work[machine] = sum(self.duration[i] for i in new_sequence)
+
+        old_times = self._propagate(seeds)
+        if old_times is not None:
+            machines = set(changes) | {self.machine_of[i] for i in old_times}
+            delta_exceeded = 0
+            for i in old_times:
+                if self.deadline[i] is not None:
+                    delta_exceeded += max(0, self.finish[i] - self.deadline[i]) - max(0, old_times[i][1] - self.deadline[i])
+            new_hole = {machine: self._machine_hole(machine) for machine in machines}
+            new_last_finish = {machine: self.finish[self.sequences[machine][-1]] if self.sequences[machine] else 0 for machine in machines}
+            hole_time = sum(self.hole) + sum(new_hole[machine] - self.hole[machine] for machine in machines)
+            makespan = max(new_last_finish.get(machine, self.last_finish[machine]) for machine in range(len(self.sequences)))
+            new_cost = self._cost(self.sum_of_time_exceeded + delta_exceeded, hole_time, makespan)
+            if new_cost < self.cost - 1e-9:
+                self.sum_of_time_exceeded += delta_exceeded
+                for machine in machines:
+                    self.hole[machine] = new_hole[machine]
+                    self.last_finish[machine] = new_last_finish[machine]
+                self.cost = new_cost
+                return True
+
+        # 되돌리기
+        for i, (start, finish) in (old_times or {}).items():
+            self.start[i], self.finish[i] = start, finish
+        for machine, old_sequence in old_sequences.items():
+            self._set_sequence(machine, old_sequence)
+            self.work[machine] = old_work[machine]
+        return False
+
+    def run(self, time_budget=1.0, seed=0, max_moves=None):
+        rng = random.Random(seed)
+        start_time = time.perf_counter()
+        curve = [(0.0, self.initial_cost), (time.perf_counter() - start_time, self.cost)]
+        num_evaluated, num_accepted = 0, 0
+        while time.perf_counter() - start_time < time_budget and (max_moves is None or num_evaluated < max_moves):
+            changes = self._propose(rng)
+            if changes is None:
+                continue
+            num_evaluated += 1
+            if self._try(changes):
+                num_accepted += 1
+                curve.append((time.perf_counter() - start_time, self.cost))
+        return {
+            "initial_cost": self.initial_cost,
+            "cost": self.cost,
+            "cost_deadline": self.sum_of_time_exceeded / 100 * self.weights[0],
+            "cost_hole": sum(self.hole) * self.weights[1] / 100,
+            "cost_processing": self.up_time * self.weights[2] / 100,
+            "cost_makespan": max(self.last_finish) * self.weights[3] / 100,
+            "curve": curve,
+            "num_evaluated": num_evaluated,
+            "num_accepted": num_accepted,
+            "seconds": time.perf_counter() - start_time,
+        }
+
+    def apply(self, scheduler):
+        # 개선된 시작 시각 / 머신을 scheduler의 operation, machine, cost 누적값에 반영한다
+        for i, operation in enumerate(self.operations):
+            operation.start, operation.finish, operation.machine = self.start[i], self.finish[i], self.machine_of[i]
+        for machine_index, machine in enumerate(scheduler.machines):
+            sequence = self.sequences[machine_index]
+            machine.operation_schedule = [self.operations[i] for i in sequence]
+            machine.working_time = self.work[machine_index]
+            machine.first_start = self.start[sequence[0]] if sequence else None
+            machine.last_finish = self.finish[sequence[-1]] if sequence else 0
+        if scheduler.kernels is not None:
+            scheduler.rebuild_machine_arrays()
+        for job_list in scheduler.jobs:
+            for job in job_list:
+                last_operation = job.operation_queue[-1]
+                job.tardiness = last_operation.finish - job.deadline
+                job.time_exceeded = max(0, job.tardiness)
+                job.estimated_tardiness = float(job.tardiness)
+
+        scheduler.sum_of_time_exceeded = self.sum_of_time_exceeded
+        scheduler.sum_of_hole_time = sum(self.hole)
+        scheduler.makespan = max(self.last_finish)
+        scheduler.last_finish_time = scheduler.makespan
+        scheduler.schedule_heatmap[:] = 0
+        scheduler.schedule_heatmap[:, -1] = -1
+        if scheduler.schedule_busy_time is not None:
+            scheduler.schedule_busy_time[:] = 0
+        for operation in scheduler.current_schedule:
+            scheduler._mark_schedule_heatmap(operation.machine, operation)
+        # rgb_array render에 그려 둔 사각형은 옛 schedule이므로 다음 render에서 새로 만든다
+        scheduler.render_state = None
+        scheduler._update_costs()
+        return scheduler.cal_final_cost()
@@ -0,0 +1,182 @@
+import itertools
+import numpy as np
+
+# 저장된 schedule을 다시 돌리지 않고 cost weight만 바꿔서 재채점하기 위한 모듈
+# cost는 weight에 대해 선형이므로 schedule마다 아래 4개 합계만 구해두면
+# (deadline 초과 시간, hole 시간, processing 시간, makespan) weight grid 전체를 한번에 계산할 수 있다
+
+# weight 순서 : customRepeatableScheduler의 인자 순서와 동일
+COST_WEIGHT_NAMES = ("cost_deadline_per_time", "cost_hole_per_time", "cost_processing_per_time", "cost_makespan_per_time", "profit_per_time")
+# RJSPEnv의 기본값
+DEFAULT_COST_WEIGHTS = (5, 1, 2, 10, 10)
+
+
+class ScheduleRecord():
+    # 한 episode의 schedule을 operation 단위 배열로 저장한다
+    def __init__(self, machine, job, repeat, operation, start, finish, repeat_job, repeat_deadline, repeat_finish, num_machines, profit_time):
+        # operation 단위 (배치된 순서)
+        self.machine = np.asarray(machine, dtype=np.int32)
+        self.job = np.asarray(job, dtype=np.int32)
+        self.repeat = np.asarray(repeat, dtype=np.int32)
+        self.operation = np.asarray(operation, dtype=np.int32)
+        self.start = np.asarray(start, dtype=np.int64)
+        self.finish = np.asarray(finish, dtype=np.int64)
+        # repeat 단위 : 끝나지 않은 repeat은 finish = -1
+        self.repeat_job = np.asarray(repeat_job, dtype=np.int32)
+        self.repeat_deadline = np.asarray(repeat_deadline, dtype=np.int64)
+        self.repeat_finish = np.asarray(repeat_finish, dtype=np.int64)
+        self.num_machines = int(num_machines)
+        # calculate_final_reward의 total_up_time (100 단위, job별 내림 후 repeat 곱)
+        self.profit_time = int(profit_time)
+
+    def __len__(self):
+        return len(self.machine)
+
+    @classmethod
+    def from_scheduler(cls, scheduler):
+        operations = scheduler.current_schedule
+        repeat_job, repeat_deadline, repeat_finish = [], [], []
+        for job_id, job_list in enumerate(scheduler.jobs):
+            for job in sorted(job_list, key=lambda x: x.index):
+                last_operation = job.operation_queue[-1]
+                repeat_job.append(job_id)
+                repeat_deadline.append(job.deadline)
+                repeat_finish.append(last_operation.finish if last_operation.finish is not None else -1)
+
+        profit_time = 0
+        for i, repeat in enumerate(scheduler.current_repeats):
+            profit_time += scheduler.jobs[i][0].total_duration // 100 * repeat
+
+        return cls(
+            machine=[op.machine for op in operations],
+            job=[int(op.job) for op in operations],
+            repeat=[op.job_index for op in operations],
+            operation=[op.index for op in operations],
+            start=[op.start for op in operations],
+            finish=[op.finish for op in operations],
+            repeat_job=repeat_job,
+            repeat_deadline=repeat_deadline,
+            repeat_finish=repeat_finish,
+            num_machines=len(scheduler.machines),
+            profit_time=profit_time,
+        )
+
+    def cost_totals(self):
+        return ScheduleBatch([self]).cost_totals()[0]
+
+
+class ScheduleBatch():
+    # 여러 ScheduleRecord를 CSR 형태(이어붙인 배열 + offset)로 묶는다
+    OPERATION_FIELDS = ("machine", "job", "repeat", "operation", "start", "finish")
+    REPEAT_FIELDS = ("repeat_job", "repeat_deadline", "repeat_finish")
+
+    def __init__(self, records=None, arrays=None):
+        if arrays is None:
+            arrays = self._concatenate(records or [])
+        self.arrays = arrays
+
+    @classmethod
+    def _concatenate(cls, records):
+        arrays = {}
+        for field in cls.OPERATION_FIELDS + cls.REPEAT_FIELDS:
+            values = [getattr(record, field) for record in records]
+            arrays[field] = np.concatenate(values) if values else np.zeros(0, dtype=np.int64)
+        arrays["operation_offsets"] = np.cumsum([0] + [len(record.machine) for record in records]).astype(np.int64)
+        arrays["repeat_offsets"] = np.cumsum([0] + [len(record.repeat_job) for record in records]).astype(np.int64)
+        arrays["num_machines"] = np.array([record.num_machines for record in records], dtype=np.int64)
+        arrays["profit_time"] = np.array([record.profit_time for record in records], dtype=np.int64)
+        return arrays
+
+    def __len__(self):
+        return len(self.arrays["num_machines"])
+
+    def __getitem__(self, index):
+        a = self.arrays
+        op_slice = slice(a["operation_offsets"][index], a["operation_offsets"][index + 1])
+        repeat_slice = slice(a["repeat_offsets"][index], a["repeat_offsets"][index + 1])
+        kwargs = {field: a[field][op_slice] for field in self.OPERATION_FIELDS}
+        kwargs.update({field: a[field][repeat_slice] for field in self.REPEAT_FIELDS})
+        return ScheduleRecord(num_machines=a["num_machines"][index], profit_time=a["profit_time"][index], **kwargs)
+
+    def save(self, path):
+        np.savez_compressed(path, **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(arrays={key: data[key] for key in data.files})
+
+    def cost_totals(self):
+        # schedule별 [deadline 초과 시간, hole 시간, processing 시간, makespan] (시간 단위 그대로)
+        a = self.arrays
+        num_schedules = len(self)
+        totals = np.zeros((num_schedules, 4), dtype=np.int64)
+        if num_schedules == 0:
+            return totals
+
+        # operation이 속한 schedule 번호
+        op_owner = np.repeat(np.arange(num_schedules), np.diff(a["operation_offsets"]))
+        repeat_owner = np.repeat(np.arange(num_schedules), np.diff(a["repeat_offsets"]))
+
+        # 1. deadline 초과 시간 : 끝난 repeat만 합산
+        finished = a["repeat_finish"] >= 0
+        exceeded = np.where(finished, np.maximum(0, a["repeat_finish"] - a["repeat_deadline"]), 0)
+        totals[:, 0] = np.bincount(repeat_owner, weights=exceeded, minlength=num_schedules).astype(np.int64)
+
+        # 2, 3. 머신별 (마지막 finish - 첫 start - up time)의 합 / up time의 합
+        duration = a["finish"] - a["start"]
+        up_time = np.bincount(op_owner, weights=duration, minlength=num_schedules).astype(np.int64)
+        max_machines = int(a["num_machines"].max())
+        slot = op_owner * max_machines + a["machine"]
+        first_start = np.full(num_schedules * max_machines, np.iinfo(np.int64).max, dtype=np.int64)
+        last_finish = np.full(num_schedules * max_machines, np.iinfo(np.int64).min, dtype=np.int64)
+        np.minimum.at(first_start, slot, a["start"])
+        np.maximum.at(last_finish, slot, a["finish"])
+        used = last_finish > np.iinfo(np.int64).min
+        span = np.where(used, last_finish - first_start, 0).reshape(num_schedules, max_machines).sum(axis=1)
+        totals[:, 1] = span - up_time
+        totals[:, 2] = up_time
+
+        # 4. makespan
+        totals[:, 3] = np.where(used, last_finish, 0).reshape(num_schedules, max_machines).max(axis=1)
+        return totals
+
+
+def make_weight_grid(**axes):
+    # make_weight_grid(cost_deadline_per_time=[1, 5, 10], profit_per_time=[10, 20])
+    # 지정하지 않은 weight는 DEFAULT_COST_WEIGHTS를 사용한다
+    for name in axes:
+        if name not in COST_WEIGHT_NAMES:
+            raise ValueError(f"Unknown cost weight : {name}")
+    values = [np.atleast_1d(axes.get(name, default)) for name, default in zip(COST_WEIGHT_NAMES, DEFAULT_COST_WEIGHTS)]
+    return np.array(list(itertools.product(*values)), dtype=np.float64)
+
+
+def evaluate_cost_grid(schedules, weights):
+    # schedules : ScheduleBatch 또는 ScheduleRecord 리스트
+    # weights : (W, 5) 배열, 순서는 COST_WEIGHT_NAMES
+    # return : schedule x weight 별 cost 항목 / final cost / final reward
+    if not isinstance(schedules, ScheduleBatch):
+        schedules = ScheduleBatch(schedules)
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    totals = schedules.cost_totals()[:, None, :].astype(np.float64)
+    profit_time = schedules.arrays["profit_time"][:, None].astype(np.float64)
+
+    # customRepeatableScheduler.cal_*_cost와 같은 연산 순서를 유지한다
+    cost_deadline = totals[..., 0] / 100 * weights[None, :, 0]
+    cost_hole = totals[..., 1] * weights[None, :, 1] / 100
+    cost_processing = totals[..., 2] * weights[None, :, 2] / 100
+    cost_makespan = totals[..., 3] * weights[None, :, 3] / 100
+    final_cost = cost_deadline + (cost_hole + cost_processing) + cost_makespan
+
+    profit = profit_time * weights[None, :, 4]
+    final_reward = ((profit - final_cost) / profit) * 100
+
+    return {
+        "cost_deadline": cost_deadline,
+        "cost_hole": cost_hole,
+        "cost_processing": cost_processing,
+        "cost_makespan": cost_makespan,
+        "final_cost": final_cost,
+        "final_reward": final_reward,
+    }
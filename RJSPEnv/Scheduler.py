@@ -1,16 +1,10 @@
 import copy
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from matplotlib.figure import Figure
-from stable_baselines3.common.env_checker import check_env
-import matplotlib.colors as mcolors
-import seaborn as sns # type: ignore
 import heapq
-from PIL import Image
-import io
+
+# pandas / matplotlib은 render 할 때만 import 한다 (SubprocVecEnv worker의 import 비용 절감)
+
+HEATMAP_MODES = ("dense", "pooled", "pyramid", "packed")
 
 def type_encoding(type):
     type_code = {'A': 0, 'B': 1, 'C': 2, 'D': 3, 'E': 4, 'F': 5, 'G': 6, 'H': 7, 'I': 8, 'J': 9, 'K': 10, 'L': 11, 'M': 12,
@@ -24,6 +18,12 @@ class Machine():
         self.ability = self.ability_encoding(
             machines_dictionary['ability'])  # "A, B, C, ..."
         self.operation_rate = 0.0
+        # cost 계산용 누적 지표 (operation이 배치될 때마다 갱신)
+        self.working_time = 0
+        self.first_start = None
+        self.last_finish = 0
+        # streaming에서 advance_horizon으로 버린 operation 중 마지막 것을 대신하는 자리 (없으면 None)
+        self.compacted_operation = None
 
     def __str__(self):
         # str_to_operations = [str(operation) for operation in self.operation_schedule]
@@ -33,21 +33,26 @@ class Machine():
     def ability_encoding(self, ability):
         return [type_encoding(type) for type in ability]
 
+    def add_operation(self, operation):
+        # operation을 배치하면서 누적 지표도 같이 갱신한다
+        # operation_schedule은 start 순으로 유지한다 (대부분 맨 뒤에 붙으므로 뒤에서부터 자리를 찾는다)
+        index = len(self.operation_schedule)
+        while index > 0 and self.operation_schedule[index - 1].start > operation.start:
+            index -= 1
+        self.operation_schedule.insert(index, operation)
+        self.working_time += operation.duration
+        if self.first_start is None or operation.start < self.first_start:
+            self.first_start = operation.start
+        self.last_finish = max(self.last_finish, operation.finish)
+
     def cal_last_finish_time(self):
-        if self.operation_schedule:
-            return max([op.finish for op in self.operation_schedule])
-        else:
-            return 0
+        return self.last_finish
         
     def cal_idle_time(self):
         # 선택된 machine에 idle time이 있는지 확인
-        if not self.operation_schedule:
+        if self.first_start is None:
             return 0
-        self.operation_schedule.sort(key=lambda x: x.start)
-        first_start = self.operation_schedule[0].start
-        last_finish = self.operation_schedule[-1].finish
-        total_duration = sum(op.duration for op in self.operation_schedule)
-        hole_time = last_finish - first_start - total_duration
+        hole_time = self.last_finish - self.first_start - self.working_time
         return hole_time
     
     def encode_ability(self):
@@ -74,6 +79,9 @@ class Machine():
         
         operation_schedule = self.operation_schedule[::]
         operation_schedule.sort(key=lambda x: x.start)
+        if self.compacted_operation is not None:
+            # operation이 2개 이상이면 첫 operation 앞 구간은 보지 않으므로 버린 operation 자리를 남겨서 compaction 전과 같은 값을 낸다
+            operation_schedule.insert(0, self.compacted_operation)
 
         best_start_time = 0
         if len(operation_schedule) == 1:
@@ -103,6 +111,14 @@ class Machine():
         return best_start_time + op_duration
             
 
+class CompactedOperation():
+    # advance_horizon으로 버린 operation들의 끝 (start = finish = 마지막 finish)
+    # cal_best_finish_time / kernel 배열에서 버린 operation들 대신 맨 앞에 둔다
+    def __init__(self, finish):
+        self.start = finish
+        self.finish = finish
+
+
 class JobInfo:
     def __init__(self, name, color, operations, index = None):
         self.name = name
@@ -171,7 +187,7 @@ class Operation():
         return f"job : {self.job}, index : {self.index} | ({self.start}, {self.finish})"
     
 class customRepeatableScheduler():
-    def __init__(self, jobs, machines, cost_deadline_per_time, cost_hole_per_time, cost_processing_per_time, cost_makespan_per_time, profit_per_time, current_repeats, max_time = 150, num_of_types = 4) -> None:
+    def __init__(self, jobs, machines, cost_deadline_per_time, cost_hole_per_time, cost_processing_per_time, cost_makespan_per_time, profit_per_time, current_repeats, max_time = 150, num_of_types = 4, heatmap_mode = "dense", heatmap_pool = 8, heatmap_levels = ((1, 16), (4, 8), (16, 8)), streaming = False, kernel_backend = "python") -> None:
         self.machines = [Machine(machine_info)
                           for machine_info in machines]
         self.job_infos = [JobInfo(job_info["name"], job_info["color"], job_info["operations"]) for job_info in jobs]
@@ -202,6 +218,44 @@ class customRepeatableScheduler():
         self.profit_per_time = profit_per_time
 
         self.current_repeats = current_repeats
+        self.original_current_repeats = list(current_repeats)
+
+        # streaming mode
+        # inject_repeat으로 episode 중에 job repeat (주문)을 추가하고
+        # advance_horizon으로 frozen horizon을 옮기면 horizon 이전에 끝난 operation / repeat은 요약 통계만 남기고 버린다
+        # observation의 시간 지표와 heatmap은 horizon 기준 상대 시간이 된다
+        self.streaming = streaming
+        self.job_configs = jobs
+        self.horizon = 0
+        self.next_repeat_index = [len(job_info['deadline']) for job_info in jobs]
+        self.window_working_time = np.zeros(len(self.machines), dtype=np.int64)  # horizon 이후 머신별 작업 시간
+        self.compacted_operations_per_machine = np.zeros(len(self.machines), dtype=np.int64)
+        self.compacted_working_time_per_machine = np.zeros(len(self.machines), dtype=np.int64)
+        self.compacted_repeats_per_job = np.zeros(len_jobs, dtype=np.int64)
+        self.compacted_time_exceeded_per_job = np.zeros(len_jobs, dtype=np.int64)
+
+        # branch-and-bound pruning
+        # incumbent_cost (지금까지 찾은 가장 좋은 final cost)를 주면 배치할 때마다 cal_lower_bound_cost()를 계산하고
+        # lower bound가 incumbent 이상이면 pruned = True (남은 배치를 해도 incumbent보다 좋아질 수 없다)
+        self.incumbent_cost = None
+        self.pruned = False
+        self.lower_bound = None
+
+        # kernel backend
+        # "python" : 지금 구현 그대로 (Machine.operation_schedule을 매번 훑는다)
+        # "numpy" / "numba" : 머신별 (start, finish)를 start 순으로 담은 배열 (machine_starts / machine_finishes, 앞쪽 machine_counts칸)을 유지하고
+        #                     빈 구간 탐색과 repeat별 tardiness 추정을 RJSPEnv.Kernels로 계산한다 (결과는 "python"과 같다)
+        self.kernel_backend = kernel_backend
+        self.kernels = None
+        if kernel_backend != "python":
+            from RJSPEnv.Kernels import Kernels
+            self.kernels = Kernels(kernel_backend)
+        self.machine_starts = None
+        self.machine_finishes = None
+        self.machine_counts = None
+        self.machine_versions = None  # 머신 schedule이 바뀔 때마다 1씩 증가
+        self._capable_rows = {}  # type -> 처리 가능한 머신 index 배열
+        self._best_finish_cache = {}  # (duration, type, earliest_start) -> [머신별 best finish, 계산할 때의 machine_versions]
         
         self.schedule_buffer = [[-1, -1] for _ in range(len_jobs)]
         self.max_time = max_time
@@ -219,6 +273,25 @@ class customRepeatableScheduler():
         self.job_state = None
         # self.machine_types = None
         self.schedule_heatmap = None
+
+        # observation의 schedule_heatmap encoding
+        # "dense" : (M, max_time) 100 단위 칸마다 0/1, 마지막 칸은 -1
+        # "pooled" : (M, ceil(max_time / heatmap_pool)) heatmap_pool 칸을 묶은 점유율 (0 ~ 1)
+        # "pyramid" : frontier (가장 먼저 비는 머신의 마지막 finish) 앞뒤로 heatmap_levels [(칸 너비, 칸 수), ...] 순서대로
+        #             가까운 곳은 촘촘하게, 먼 곳은 성기게 나눈 점유율. 크기가 max_time과 무관하다
+        # "packed" : dense의 점유 여부를 8칸씩 bit로 묶은 (M, ceil(max_time / 8)) uint8
+        if heatmap_mode not in HEATMAP_MODES:
+            raise ValueError(f"Unknown heatmap_mode : {heatmap_mode}")
+        self.heatmap_mode = heatmap_mode
+        self.heatmap_pool = heatmap_pool
+        self.heatmap_levels = tuple(tuple(level) for level in heatmap_levels)
+        # pyramid 칸 경계 (frontier 기준, 100 단위)
+        forward_edges = np.cumsum([0] + [width for width, count in self.heatmap_levels for _ in range(count)])
+        self.heatmap_span = int(forward_edges[-1])
+        self.heatmap_edges = np.concatenate([-forward_edges[::-1], forward_edges[1:]])
+        self.heatmap_cell_time = np.diff(self.heatmap_edges) * 100
+        # pooled / pyramid용 머신별 실제 작업 시간 (칸 경계에 걸친 operation도 정확히 나눠서 더한다)
+        self.schedule_busy_time = None
         # self.action_space = spaces.MultiDiscrete([len_machines, len_jobs])
         
         self.action_mask = np.ones(
@@ -226,6 +299,18 @@ class customRepeatableScheduler():
         self.legal_actions = np.ones(
             shape=(len(self.machines), len(self.jobs)), dtype=bool)
 
+        # legal action 목록 (sparse)
+        # job별 operation마다 처리할 수 있는 머신 mask는 고정이므로 미리 만들어 두고
+        # schedule_buffer에서 frontier operation이 바뀐 job의 열만 다시 채운다
+        self.capable_machines = [
+            [np.array([machine.can_process_operation(operation.type) for machine in self.machines]) for operation in job_info.operation_queue]
+            for job_info in self.job_infos
+        ]
+        self.legal_count_per_job = np.zeros(len(self.jobs), dtype=np.int64)
+        self.legal_count_per_machine = np.zeros(len(self.machines), dtype=np.int64)
+        self._legal_operation_index = [None] * len(self.jobs)  # 열을 채울 때 사용한 frontier operation index (-1 : 없음)
+        self._legal_action_list = None
+
         self.current_schedule = []
         self.num_scheduled_operations = 0
         self.num_steps = 0
@@ -242,11 +327,22 @@ class customRepeatableScheduler():
         self.cost_hole = 0
         self.cost_processing = 0
         self.cost_makespan = 0
+
+        # cost를 매 step 전체 재계산하지 않도록 누적값을 유지한다
+        self.sum_of_time_exceeded = 0
+        self.sum_of_hole_time = 0
+        self.sum_of_up_time = 0
+        self.makespan = 0
+        # 직전 step 대비 cost 변화량 [deadline, hole, processing, makespan]
+        self.cost_delta = np.zeros(4)
         
         # type별 지표 추가
         self.num_of_types = num_of_types
         self.remain_op_duration_per_type = [[] for _ in range(self.num_of_types)]
 
+        # rgb_array render용 figure (처음 render할 때 생성해서 계속 재사용)
+        self.render_state = None
+
     def reset(self, seed=None, options=None):
         """
         Important: the observation must be a numpy array
@@ -256,8 +352,19 @@ class customRepeatableScheduler():
         self.jobs = copy.deepcopy(self.original_jobs)
         self.machines = copy.deepcopy(self.original_machines)
         self.operations = copy.deepcopy(self.original_operations)
+        self.current_repeats = self.original_current_repeats[::]
         # self.current_job_details = copy.deepcopy(self.original_job_details)
 
+        self.horizon = 0
+        self.next_repeat_index = [len(job_info['deadline']) for job_info in self.job_configs]
+        self.window_working_time[:] = 0
+        self.compacted_operations_per_machine[:] = 0
+        self.compacted_working_time_per_machine[:] = 0
+        self.compacted_repeats_per_job[:] = 0
+        self.compacted_time_exceeded_per_job[:] = 0
+        self.pruned = False
+        self.lower_bound = None
+
         self.schedule_buffer = [[-1, -1] for _ in range(len(self.jobs))]
 
 
@@ -274,11 +381,19 @@ class customRepeatableScheduler():
             (len(self.machines), self.max_time), dtype=np.int8)
         # schedule_heatmap의 각 행의 맨 끝 값은 -1로 세팅
         self.schedule_heatmap[:, -1] = -1
+        if self.heatmap_mode == "pooled":
+            self.schedule_busy_time = np.zeros((len(self.machines), -(-self.max_time // self.heatmap_pool)), dtype=np.int64)
+        elif self.heatmap_mode == "pyramid":
+            self.schedule_busy_time = np.zeros((len(self.machines), self.max_time), dtype=np.int64)
 
         self.legal_actions = np.ones(
             (len(self.machines), len(self.jobs)), dtype=bool)
         self.action_mask = np.ones(
             (len(self.machines) * len(self.jobs)), dtype=bool)
+        self.legal_count_per_job = np.full(len(self.jobs), len(self.machines), dtype=np.int64)
+        self.legal_count_per_machine = np.full(len(self.machines), len(self.jobs), dtype=np.int64)
+        self._legal_operation_index = [None] * len(self.jobs)
+        self._legal_action_list = None
 
         self.machine_operation_rate = np.zeros(
             len(self.machines), dtype=np.float32)
@@ -286,6 +401,8 @@ class customRepeatableScheduler():
         # type별 지표 추가
         self.remain_op_duration_per_type = [[] for _ in range(self.num_of_types)]
 
+        if self.kernels is not None:
+            self.rebuild_machine_arrays()
 
         self.update_state(None)
 
@@ -301,7 +418,14 @@ class customRepeatableScheduler():
         self.cost_processing = 0
         self.cost_makespan = 0
 
-        
+        self.sum_of_time_exceeded = 0
+        self.sum_of_hole_time = 0
+        self.sum_of_up_time = 0
+        self.makespan = 0
+        self.cost_delta = np.zeros(4)
+
+        self._clear_render_canvas()
+
         return self.get_observation(), self.get_info() 
 
     def action_masks(self):
@@ -309,12 +433,26 @@ class customRepeatableScheduler():
 
     def _update_action_masks(self, action):
         self._update_legal_actions(action)
-        result = []  # 빈 리스트
-        for legal_action in self.legal_actions:
-            result.extend(legal_action)  # 각 legal_action을 result에 추가
-        self.action_mask = np.array(result)  # 
+        # machine 순서로 이어 붙인 mask (매번 새 배열을 만들어 이전 observation이 바뀌지 않게 한다)
+        self.action_mask = self.legal_actions.flatten()
         return self.action_mask
 
+    def legal_action_list(self):
+        # legal action (machine * len(jobs) + job) 오름차순 배열 = np.flatnonzero(action_mask)
+        if self._legal_action_list is None:
+            machine_indices, job_indices = np.nonzero(self.legal_actions)
+            self._legal_action_list = machine_indices * len(self.jobs) + job_indices
+        return self._legal_action_list
+
+    def legal_action_pairs(self):
+        # legal [machine, job] 목록, (L, 2)
+        legal_actions = self.legal_action_list()
+        return np.stack([legal_actions // len(self.jobs), legal_actions % len(self.jobs)], axis=1)
+
+    def legal_machines(self, job_index):
+        # job의 frontier operation을 처리할 수 있는 머신 index
+        return np.flatnonzero(self.legal_actions[:, job_index])
+
     def update_state(self, action=None):
         if action is not None:
             self.valid_count += 1
@@ -325,6 +463,8 @@ class customRepeatableScheduler():
             self._update_action_masks(action)
             self._update_machine_state(action)
             self.last_finish_time = self._get_final_operation_finish()
+            self._update_costs()
+            self._check_prune()
         else:
             self._update_operation_state(action)
             self._update_schedule_buffer()
@@ -332,6 +472,39 @@ class customRepeatableScheduler():
             self._update_job_state()
             self._update_action_masks(action)
 
+    def can_apply(self, action):
+        # action mask를 거치지 않고 [machine, job] 배치 가능 여부를 확인한다 (update_state_batch 중간에 사용)
+        repeat_index, operation_index = self.schedule_buffer[action[1]]
+        if repeat_index == -1:
+            return False
+        return self.machines[action[0]].can_process_operation(self.job_infos[action[1]].operation_queue[operation_index].type)
+
+    def update_state_batch(self, actions):
+        # 여러 배치를 한 step에 적용한다
+        # actions는 [machine, job]을 하나씩 내주는 iterable (generator라면 직전 배치가 반영된 상태를 보고 다음 배치를 정할 수 있다)
+        # None이 나오거나 배치할 수 없는 action이 나오면 멈춘다
+        # 다음 배치 대상을 정하는 job state / schedule_buffer는 배치마다 갱신하고
+        # action mask, 머신 가동률, cost는 마지막에 한 번만 계산한다 (cost_delta는 batch 전체의 변화량)
+        applied = []
+        for action in actions:
+            if action is None or not self.can_apply(action):
+                break
+            self.valid_count += 1
+            self._update_operation_state(action)
+            self._schedule_operation(action)
+            self._update_job_state()
+            self._update_schedule_buffer()
+            self._mark_schedule_heatmap(action[0], self.current_schedule[-1])
+            applied.append(action)
+
+        if applied:
+            self._update_action_masks(applied[-1])
+            self._update_machine_rates()
+            self.last_finish_time = self._get_final_operation_finish()
+            self._update_costs()
+            self._check_prune()
+        return applied
+
     def _update_operation_state(self, action):
         # action이 없다면 초기화
         if action is None:
@@ -365,18 +538,21 @@ class customRepeatableScheduler():
         #         else:
         #             self.legal_actions[machine_index, job_index] = False
         # else:
-        for machine_index in range(len(self.machines)):
-            machine = self.machines[machine_index]
-            for job_index in range(len(self.jobs)):
-                if self.schedule_buffer[job_index] == [-1, -1]:
-                    self.legal_actions[:, job_index] = False
-                    continue
-                operation_index = self.schedule_buffer[job_index][1]
-                operation = self.job_infos[job_index].operation_queue[operation_index]
-                if machine.can_process_operation(operation.type):
-                    self.legal_actions[machine_index, job_index] = True
-                else:
-                    self.legal_actions[machine_index, job_index] = False
+        # frontier operation이 바뀐 job의 열만 다시 채운다
+        for job_index, (repeat_index, operation_index) in enumerate(self.schedule_buffer):
+            if repeat_index == -1:
+                operation_index = -1
+            if operation_index == self._legal_operation_index[job_index]:
+                continue
+            self._legal_operation_index[job_index] = operation_index
+            self.legal_count_per_machine -= self.legal_actions[:, job_index]
+            if operation_index == -1:
+                self.legal_actions[:, job_index] = False
+            else:
+                self.legal_actions[:, job_index] = self.capable_machines[job_index][operation_index]
+            self.legal_count_per_machine += self.legal_actions[:, job_index]
+            self.legal_count_per_job[job_index] = np.count_nonzero(self.legal_actions[:, job_index])
+            self._legal_action_list = None
 
     def _update_machine_state(self, action=None):
         if action is None:
@@ -385,18 +561,22 @@ class customRepeatableScheduler():
             #         1 if i in machine.ability else 0 for i in range(25)]
             return
     
-        machine = self.machines[action[0]]
-        operation_schedule = machine.operation_schedule
-        self.schedule_heatmap[action[0]] = np.array(self._schedule_to_array(operation_schedule))
+        # 이번 step에 배치된 operation이 차지하는 칸만 갱신한다
+        # (operation끼리 겹치지 않으므로 _schedule_to_array로 행 전체를 다시 그린 것과 같다)
+        self._mark_schedule_heatmap(action[0], self.current_schedule[-1])
+        self._update_machine_rates()
 
+    def _update_machine_rates(self):
         # 선택된 리소스의 스케줄링된 Operation들
+        final_operation_finish = self._get_final_operation_finish()
         for machine in self.machines:
-            working_time = sum([operation.duration for operation in machine.operation_schedule])
-            machine.operation_rate = working_time / self._get_final_operation_finish()
+            machine.operation_rate = machine.working_time / final_operation_finish
             
         self.machine_operation_rate = np.array([machine.operation_rate for machine in self.machines])
 
     def _update_job_state(self):
+        if self.kernels is not None:
+            return self._update_job_state_kernels()
         for job_list in self.jobs:
             for job in job_list:
                 remaining_operations = [op for op in job.operation_queue if op.finish is None]
@@ -440,6 +620,87 @@ class customRepeatableScheduler():
             # Rebuild the heap based on the updated estimated tardiness values
             heapq.heapify(job_list)
 
+    def _update_job_state_kernels(self):
+        # _update_job_state와 같은 계산
+        # 아직 시작하지 않은 repeat들은 같은 첫 operation을 보므로 (duration, type, earliest_start)별로 한 번만 계산하고
+        # 머신별 best finish는 step을 넘어 cache 해서 그 사이 schedule이 바뀐 머신만 다시 계산한다
+        approx_best_finish_times = {}
+        for job_list in self.jobs:
+            for job in job_list:
+                remaining_operations = [op for op in job.operation_queue if op.finish is None]
+
+                if not remaining_operations:
+                    job.tardiness = job.operation_queue[-1].finish - job.deadline
+                    job.time_exceeded = max(0, job.operation_queue[-1].finish - job.deadline)
+                    job.estimated_tardiness = float(job.tardiness)
+                    job.is_done = True
+                    continue
+
+                earliest_operation = remaining_operations[0]
+                key = (earliest_operation.duration, earliest_operation.type, earliest_operation.earliest_start)
+                if key not in approx_best_finish_times:
+                    best_finish_times = self._cached_best_finish_times(key)
+                    approx_best_finish_times[key] = int(int(best_finish_times.sum()) / len(best_finish_times))
+                approx_best_finish_time = approx_best_finish_times[key]
+
+                scaled_rate = (job.total_duration - sum(op.duration for op in remaining_operations[1:])) / job.total_duration
+                tardiness = approx_best_finish_time - job.deadline
+                job.estimated_tardiness = tardiness * scaled_rate
+
+            heapq.heapify(job_list)
+
+    def _cached_best_finish_times(self, key):
+        duration, operation_type, earliest_start = key
+        rows = self._get_capable_rows(operation_type)
+        versions = self.machine_versions[rows]
+        entry = self._best_finish_cache.get(key)
+        if entry is None:
+            entry = [self.kernels.best_finish_rows(self.machine_starts, self.machine_finishes, self.machine_counts, rows, duration, earliest_start), versions]
+            self._best_finish_cache[key] = entry
+        else:
+            stale = entry[1] != versions
+            if stale.any():
+                entry[0][stale] = self.kernels.best_finish_rows(self.machine_starts, self.machine_finishes, self.machine_counts, rows[stale], duration, earliest_start)
+                entry[1] = versions
+        return entry[0]
+
+    def _get_capable_rows(self, operation_type):
+        if operation_type not in self._capable_rows:
+            self._capable_rows[operation_type] = np.flatnonzero([machine.can_process_operation(operation_type) for machine in self.machines])
+        return self._capable_rows[operation_type]
+
+    def rebuild_machine_arrays(self):
+        # Machine.operation_schedule에서 kernel용 배열을 다시 만든다 (schedule을 직접 바꾼 뒤 호출, 예: advance_horizon, LocalSearch.apply)
+        capacity = max(1, len(self.operations), max(len(machine.operation_schedule) for machine in self.machines) + 1)
+        self.machine_starts = np.zeros((len(self.machines), capacity), dtype=np.int64)
+        self.machine_finishes = np.zeros((len(self.machines), capacity), dtype=np.int64)
+        self.machine_counts = np.zeros(len(self.machines), dtype=np.int64)
+        self.machine_versions = np.zeros(len(self.machines), dtype=np.int64)
+        self._best_finish_cache = {}
+        for machine_index, machine in enumerate(self.machines):
+            operations = sorted(machine.operation_schedule, key=lambda operation: operation.start)
+            if machine.compacted_operation is not None:
+                # Machine.cal_best_finish_time과 같이 버린 operation 자리를 맨 앞에 둔다
+                operations.insert(0, machine.compacted_operation)
+            self.machine_counts[machine_index] = len(operations)
+            self.machine_starts[machine_index, :len(operations)] = [operation.start for operation in operations]
+            self.machine_finishes[machine_index, :len(operations)] = [operation.finish for operation in operations]
+
+    def _insert_machine_array(self, machine_index, start, finish):
+        # Machine.add_operation과 같은 위치 (start가 같으면 뒤)에 넣는다
+        count = int(self.machine_counts[machine_index])
+        if count == self.machine_starts.shape[1]:
+            # streaming에서 repeat이 계속 추가되면 늘린다
+            self.machine_starts = np.pad(self.machine_starts, ((0, 0), (0, count)))
+            self.machine_finishes = np.pad(self.machine_finishes, ((0, 0), (0, count)))
+        starts, finishes = self.machine_starts[machine_index], self.machine_finishes[machine_index]
+        index = int(np.searchsorted(starts[:count], start, side="right"))
+        starts[index + 1:count + 1] = starts[index:count].copy()
+        finishes[index + 1:count + 1] = finishes[index:count].copy()
+        starts[index], finishes[index] = start, finish
+        self.machine_counts[machine_index] = count + 1
+        self.machine_versions[machine_index] += 1
+
     # job 8번의 estimated가 잘 계산되고 있는지 test
     def test_cal_estimated_tardiness(self):
         for job in self.jobs[7]:
@@ -458,6 +719,52 @@ class customRepeatableScheduler():
 
     
 
+    def _mark_schedule_heatmap(self, machine_index, operation):
+        # heatmap은 horizon 기준 상대 시간 (streaming이 아니면 horizon = 0)
+        operation_start = max(operation.start - self.horizon, 0)
+        operation_finish = operation.finish - self.horizon
+        start = min(self.max_time, operation_start // 100)
+        finish = min(self.max_time, operation_finish // 100)
+        self.schedule_heatmap[machine_index, start:finish] = 1
+        self.schedule_heatmap[machine_index, -1] = -1
+
+        if self.heatmap_mode == "pooled":
+            self._add_busy_time(machine_index, operation_start, operation_finish, self.heatmap_pool * 100)
+        elif self.heatmap_mode == "pyramid":
+            self._add_busy_time(machine_index, operation_start, operation_finish, 100)
+
+    def _add_busy_time(self, machine_index, start, finish, cell_time):
+        finish = min(finish, self.schedule_busy_time.shape[1] * cell_time)
+        if start >= finish:
+            return
+        first, last = start // cell_time, (finish - 1) // cell_time
+        row = self.schedule_busy_time[machine_index]
+        row[first:last + 1] += cell_time
+        row[first] -= start - first * cell_time
+        row[last] -= (last + 1) * cell_time - finish
+
+    def get_heatmap_frontier(self):
+        # pyramid heatmap의 기준 시각
+        return min(machine.last_finish for machine in self.machines)
+
+    def get_heatmap_observation(self):
+        if self.heatmap_mode == "dense":
+            return self.schedule_heatmap
+        if self.heatmap_mode == "packed":
+            return np.packbits(self.schedule_heatmap == 1, axis=1)
+        if self.heatmap_mode == "pooled":
+            return (self.schedule_busy_time / (self.heatmap_pool * 100)).astype(np.float32)
+
+        # pyramid : frontier 앞뒤 span 칸만 잘라 누적합을 구하므로 max_time과 관계없이 비용이 같다
+        anchor = max(self.get_heatmap_frontier() - self.horizon, 0) // 100
+        low, high = anchor - self.heatmap_span, anchor + self.heatmap_span
+        window = np.zeros((len(self.machines), 2 * self.heatmap_span + 1), dtype=np.int64)
+        part = self.schedule_busy_time[:, max(low, 0):max(min(high, self.max_time), 0)]
+        offset = max(low, 0) - low
+        window[:, offset + 1:offset + 1 + part.shape[1]] = part
+        cumulative = np.cumsum(window, axis=1)
+        return (np.diff(cumulative[:, self.heatmap_edges + self.heatmap_span], axis=1) / self.heatmap_cell_time).astype(np.float32)
+
     def _schedule_to_array(self, operation_schedule):
         # sort 할 필요는 없으나 미래를 위해 보험을 들어놨다고 보면됨.
         operation_schedule.sort(key = lambda x: x.start)
@@ -529,28 +836,10 @@ class customRepeatableScheduler():
             # Push the job back into the heap
             heapq.heappush(self.jobs[i], job)
 
-    def _schedule_operation(self, action):
-        # Implement the scheduling logic based on the action
-        # You need to update the start and finish times of the operations
-        # based on the selected operation index (action) and the current state.
-
-        # Example: updating start and finish times
-        selected_machine = self.machines[action[0]]
-        selected_job = self.jobs[action[1]][0]
-        selected_operation = selected_job.operation_queue[self.schedule_buffer[action[1]][1]]
-        #print(selected_operation)
-        operation_earliest_start = selected_operation.earliest_start
-        
-        # Check for predecessor's finish time
-        if selected_operation.predecessor is not None:
-            predecessor_operation = next(
-                op for op in selected_job.operation_queue if op.index == selected_operation.predecessor
-            )
-            operation_earliest_start = max(operation_earliest_start, predecessor_operation.finish)
-
-        operation_duration = selected_operation.duration
+    def _find_earliest_start(self, machine, operation_earliest_start, operation_duration):
+        # machine의 빈 구간 중 operation이 들어가는 가장 이른 시작 시각 (kernel_backend="python")
         machine_operations = sorted(
-            selected_machine.operation_schedule, key=lambda operation: operation.start
+            machine.operation_schedule, key=lambda operation: operation.start
         )
 
         open_windows = []
@@ -568,9 +857,6 @@ class customRepeatableScheduler():
 
         # Fit the operation within the first possible window
         window_found = False
-        if operation_earliest_start is None:
-            operation_earliest_start = 0
-
         for window in open_windows:
             # Operation could start before the open window closes
             if operation_earliest_start <= window[1]:
@@ -589,6 +875,42 @@ class customRepeatableScheduler():
             else:
                 min_earliest_start = last_alloc
 
+        return min_earliest_start
+
+    def placement_start(self, action):
+        # action [machine, job]을 지금 적용하면 frontier operation이 시작할 시각 (배치는 하지 않는다)
+        selected_machine = self.machines[action[0]]
+        selected_job = self.jobs[action[1]][0]
+        selected_operation = selected_job.operation_queue[self.schedule_buffer[action[1]][1]]
+        operation_earliest_start = selected_operation.earliest_start
+        
+        # Check for predecessor's finish time
+        if selected_operation.predecessor is not None:
+            predecessor_operation = next(
+                op for op in selected_job.operation_queue if op.index == selected_operation.predecessor
+            )
+            operation_earliest_start = max(operation_earliest_start, predecessor_operation.finish)
+
+        operation_duration = selected_operation.duration
+        if operation_earliest_start is None:
+            operation_earliest_start = 0
+        if self.kernels is not None:
+            return int(self.kernels.fit_start(self.machine_starts[action[0]], self.machine_finishes[action[0]], int(self.machine_counts[action[0]]), operation_duration, operation_earliest_start))
+        return self._find_earliest_start(selected_machine, operation_earliest_start, operation_duration)
+
+    def _schedule_operation(self, action):
+        # Implement the scheduling logic based on the action
+        # You need to update the start and finish times of the operations
+        # based on the selected operation index (action) and the current state.
+
+        # Example: updating start and finish times
+        selected_machine = self.machines[action[0]]
+        selected_job = self.jobs[action[1]][0]
+        selected_operation = selected_job.operation_queue[self.schedule_buffer[action[1]][1]]
+        #print(selected_operation)
+        operation_duration = selected_operation.duration
+        min_earliest_start = self.placement_start(action)
+
         # schedule it
         selected_operation.sequence = self.num_scheduled_operations + 1
         selected_operation.start = min_earliest_start
@@ -596,9 +918,22 @@ class customRepeatableScheduler():
         selected_operation.machine = action[0]
 
         self.current_schedule.append(selected_operation)
-        selected_machine.operation_schedule.append(selected_operation)
+        hole_time_before = selected_machine.cal_idle_time()
+        selected_machine.add_operation(selected_operation)
+        if self.kernels is not None:
+            self._insert_machine_array(action[0], selected_operation.start, selected_operation.finish)
         self.num_scheduled_operations += 1
 
+        self.window_working_time[action[0]] += operation_duration
+
+        # cost 누적값 갱신
+        self.sum_of_up_time += operation_duration
+        self.sum_of_hole_time += selected_machine.cal_idle_time() - hole_time_before
+        self.makespan = max(self.makespan, selected_operation.finish)
+        if selected_operation is selected_job.operation_queue[-1]:
+            # 마지막 operation이 배치되면 해당 repeat의 deadline 초과분이 확정된다
+            self.sum_of_time_exceeded += max(0, selected_operation.finish - selected_job.deadline)
+
         # Update the earliest_start for the next operation in the job
         current_op_index = selected_job.operation_queue.index(selected_operation)
         if current_op_index + 1 < len(selected_job.operation_queue):
@@ -634,7 +969,11 @@ class customRepeatableScheduler():
         num_remaining_op = []
         remaining_working_time = []
         for i, elem in enumerate(self.schedule_buffer):
-            schedule_buffer_job_repeat.append(elem[0])
+            if self.streaming and elem[0] != -1:
+                # streaming에서는 repeat index가 계속 커지므로 compaction 후 남아 있는 가장 오래된 repeat 기준으로 센다
+                schedule_buffer_job_repeat.append(elem[0] - min(job.index for job in self.jobs[i]))
+            else:
+                schedule_buffer_job_repeat.append(elem[0])
             schedule_buffer_operation_index.append(elem[1])
             if elem[0] == -1:
                 earliest_start_per_operation.append(-1)
@@ -644,20 +983,27 @@ class customRepeatableScheduler():
                 num_remaining_op.append(0)
                 remaining_working_time.append(0)
             else:
-                earliest_start_per_operation.append(self.jobs[i][0].operation_queue[elem[1]].earliest_start // 100)
-                job_deadline.append(self.jobs[i][0].deadline // 100)
+                earliest_start = (self.jobs[i][0].operation_queue[elem[1]].earliest_start - self.horizon) // 100
+                deadline = (self.jobs[i][0].deadline - self.horizon) // 100
+                if self.streaming:
+                    # horizon이 deadline / earliest start를 지나가면 음수가 되므로 observation_space 범위 [-1, max_time]로 자른다
+                    earliest_start = min(max(earliest_start, -1), self.max_time)
+                    deadline = min(max(deadline, -1), self.max_time)
+                earliest_start_per_operation.append(earliest_start)
+                job_deadline.append(deadline)
                 op_duration.append(self.jobs[i][0].operation_queue[elem[1]].duration // 100)
                 op_type.append(self.jobs[i][0].operation_queue[elem[1]].type)
                 num_remaining_op.append(len([op for op in self.jobs[i][0].operation_queue if op.finish is None]))
                 # remaining_working_time은 끝나지 않은 op들의 duration의 총합
                 remaining_working_time.append(sum([op.duration // 100 for op in self.jobs[i][0].operation_queue if op.finish is None]))
 
-        self.cal_job_deadline_cost()
-        self.cal_machine_cost()
-        self.cal_entire_cost()
-
         # 머신 별 hole의 길이 계산
-        hole_length_per_machine = [machine.cal_idle_time() // 100 + min(machine.operation_schedule, key = lambda x : x.start).start // 100 if machine.operation_schedule else 0 for machine in self.machines]
+        if self.streaming:
+            # horizon 이후 구간의 idle time (horizon ~ last finish 중 작업하지 않은 시간)
+            hole_length_per_machine = [(max(machine.last_finish - self.horizon, 0) - self.window_working_time[i]) // 100 for i, machine in enumerate(self.machines)]
+        else:
+            hole_length_per_machine = [machine.cal_idle_time() // 100 + machine.first_start // 100 if machine.operation_schedule else 0 for machine in self.machines]
+        last_finish_time_per_machine = [max(machine.cal_last_finish_time() - self.horizon, 0) // 100 for machine in self.machines]
         # 머신 별 ablity_encode
         machine_ability = [machine.encode_ability() for machine in self.machines]
 
@@ -674,13 +1020,13 @@ class customRepeatableScheduler():
             "mean_operation_duration_per_type": np.array(mean_operation_duration_per_type),
             "std_operation_duration_per_type": np.array(std_operation_duration_per_type),
             # 현 scheduling 상황 관련 지표
-            'last_finish_time_per_machine' : np.array([machine.cal_last_finish_time()//100 for machine in self.machines]),
+            'last_finish_time_per_machine' : np.array(last_finish_time_per_machine),
             'machine_ability' : np.array(machine_ability),
             'hole_length_per_machine' : np.array(hole_length_per_machine),
             "machine_utilization_rate": np.array(self.machine_operation_rate),
             'remaining_repeats': np.array(remaining_repeats),
             # schedule_heatmap
-            'schedule_heatmap': self.schedule_heatmap,
+            'schedule_heatmap': self.get_heatmap_observation(),
             # schedule_buffer 관련 지표
             'schedule_buffer_job_repeat': np.array(schedule_buffer_job_repeat),
             'schedule_buffer_operation_index':  np.array(schedule_buffer_operation_index),
@@ -703,7 +1049,7 @@ class customRepeatableScheduler():
             "mean_operation_duration_per_type": np.array(mean_operation_duration_per_type),
             "std_operation_duration_per_type": np.array(std_operation_duration_per_type),
             # 현 scheduling 상황 관련 지표
-            'last_finish_time_per_machine' : np.array([machine.cal_last_finish_time()//100 for machine in self.machines]),
+            'last_finish_time_per_machine' : np.array(last_finish_time_per_machine),
             'machine_ability' : np.array(machine_ability),
             'hole_length_per_machine' : np.array(hole_length_per_machine),
             "machine_utilization_rate": np.array(self.machine_operation_rate),
@@ -732,7 +1078,7 @@ class customRepeatableScheduler():
             "mean_operation_duration_per_type": np.array(mean_operation_duration_per_type),
             "std_operation_duration_per_type": np.array(std_operation_duration_per_type),
             # 현 scheduling 상황 관련 지표
-            'last_finish_time_per_machine' : np.array([machine.cal_last_finish_time()//100 for machine in self.machines]),
+            'last_finish_time_per_machine' : np.array(last_finish_time_per_machine),
             'machine_ability' : np.array(machine_ability),
             'hole_length_per_machine' : np.array(hole_length_per_machine),
             "machine_utilization_rate": np.array(self.machine_operation_rate),
@@ -761,7 +1107,7 @@ class customRepeatableScheduler():
             "mean_operation_duration_per_type": np.array(mean_operation_duration_per_type),
             "std_operation_duration_per_type": np.array(std_operation_duration_per_type),
             # 현 scheduling 상황 관련 지표
-            'last_finish_time_per_machine' : np.array([machine.cal_last_finish_time()//100 for machine in self.machines]),
+            'last_finish_time_per_machine' : np.array(last_finish_time_per_machine),
             'machine_ability' : np.array(machine_ability),
             'hole_length_per_machine' : np.array(hole_length_per_machine),
             'schedule_heatmap': self.schedule_heatmap,
@@ -787,6 +1133,100 @@ class customRepeatableScheduler():
         
         return observation_v4
 
+    def inject_repeat(self, job_index, deadline, release_time=0):
+        # job_index의 repeat 하나를 새로 추가한다 (release_time 이전, horizon 이전에는 시작할 수 없다)
+        job = Job(self.job_configs[job_index], self.next_repeat_index[job_index], deadline)
+        self.next_repeat_index[job_index] += 1
+        job.operation_queue[0].earliest_start = max(job.operation_queue[0].earliest_start, release_time, self.horizon)
+        for operation in job.operation_queue:
+            self.remain_op_duration_per_type[operation.type].append(operation.duration // 100)
+        heapq.heappush(self.jobs[job_index], job)
+        self.operations.extend(job.operation_queue)
+        # env가 넘겨준 list를 바꾸지 않도록 복사해서 갱신한다 (profit 계산에 사용)
+        self.current_repeats = self.current_repeats[::]
+        self.current_repeats[job_index] += 1
+
+        self._update_job_state()
+        self._update_schedule_buffer()
+        self._update_action_masks(None)
+        return job.index
+
+    def get_freeze_time(self):
+        # 아직 배치되지 않은 operation이 시작할 수 있는 가장 이른 시각
+        # 이 시각 이전의 schedule은 더 이상 바뀌지 않으므로 horizon을 여기까지 옮겨도 결과가 같다
+        earliest_starts = [
+            next(op.earliest_start for op in job.operation_queue if op.finish is None)
+            for job_list in self.jobs for job in job_list if not job.is_done
+        ]
+        return min(earliest_starts) if earliest_starts else self.makespan
+
+    def advance_horizon(self, time):
+        # horizon 이전에 끝난 operation과 끝난 repeat을 요약 통계로 옮기고 버린다
+        # 배치되지 않은 operation은 horizon 이전에 시작할 수 없게 된다
+        time = time // 100 * 100
+        if time <= self.horizon:
+            return self.horizon
+        self.horizon = time
+
+        self.window_working_time[:] = 0
+        for machine_index, machine in enumerate(self.machines):
+            kept = [operation for operation in machine.operation_schedule if operation.finish > time]
+            dropped = [operation for operation in machine.operation_schedule if operation.finish <= time]
+            self.compacted_operations_per_machine[machine_index] += len(dropped)
+            self.compacted_working_time_per_machine[machine_index] += sum(operation.duration for operation in dropped)
+            self.window_working_time[machine_index] = sum(operation.finish - max(operation.start, time) for operation in kept)
+            if dropped:
+                last_finish = max(operation.finish for operation in dropped)
+                if machine.compacted_operation is not None:
+                    last_finish = max(last_finish, machine.compacted_operation.finish)
+                machine.compacted_operation = CompactedOperation(last_finish)
+            machine.operation_schedule = kept
+        self.current_schedule = [operation for operation in self.current_schedule if operation.finish > time]
+        self.operations = [operation for operation in self.operations if operation.finish is None or operation.finish > time]
+        if self.kernels is not None:
+            self.rebuild_machine_arrays()
+
+        for job_index, job_list in enumerate(self.jobs):
+            finished = [job for job in job_list if job.is_done and job.operation_queue[-1].finish <= time]
+            kept = [job for job in job_list if not (job.is_done and job.operation_queue[-1].finish <= time)]
+            if not kept:
+                # heap이 비지 않도록 마지막으로 끝난 repeat 하나는 남겨 둔다
+                last_job = max(finished, key=lambda job: job.index)
+                finished.remove(last_job)
+                kept.append(last_job)
+            self.compacted_repeats_per_job[job_index] += len(finished)
+            self.compacted_time_exceeded_per_job[job_index] += sum(job.time_exceeded for job in finished)
+            for job in kept:
+                for operation in job.operation_queue:
+                    if operation.finish is None:
+                        operation.earliest_start = max(operation.earliest_start, time)
+            heapq.heapify(kept)
+            self.jobs[job_index] = kept
+
+        # heatmap을 새 horizon 기준으로 다시 그린다
+        self.schedule_heatmap[:] = 0
+        self.schedule_heatmap[:, -1] = -1
+        if self.schedule_busy_time is not None:
+            self.schedule_busy_time[:] = 0
+        for operation in self.current_schedule:
+            self._mark_schedule_heatmap(operation.machine, operation)
+
+        self._update_job_state()
+        self._update_schedule_buffer()
+        self._update_action_masks(None)
+        return self.horizon
+
+    def get_streaming_summary(self):
+        return {
+            'horizon': self.horizon,
+            'compacted_operations_per_machine': self.compacted_operations_per_machine.copy(),
+            'compacted_working_time_per_machine': self.compacted_working_time_per_machine.copy(),
+            'compacted_repeats_per_job': self.compacted_repeats_per_job.copy(),
+            'compacted_time_exceeded_per_job': self.compacted_time_exceeded_per_job.copy(),
+            'num_active_operations': len(self.current_schedule),
+            'num_active_repeats': sum(len(job_list) for job_list in self.jobs),
+        }
+
     def test_cal_best_finish_time(self):
         # machine 0에 대해서만 테스트
         machine = self.machines[0]
@@ -794,14 +1234,24 @@ class customRepeatableScheduler():
             operation = self.jobs[i][0].operation_queue[elem[1]]
             print(f"Job {i} - Operation {elem[1]} Best Finish Time : {machine.cal_best_finish_time(operation.duration, operation.type, operation.earliest_start)}")
 
-    def get_info(self):
+    def get_info(self, mode="full"):
+        # mode="minimal" : counter만 반환 (매 step 호출해도 부담 없음)
+        # mode="full" : repeat별 list까지 포함한 전체 정보
+        if mode == "minimal":
+            return {
+                'finish_time': self.last_finish_time,
+                'num_scheduled_operations': self.num_scheduled_operations,
+                'valid_count': self.valid_count,
+            }
         return {
             'jobs' : self.jobs,
             'finish_time': self.last_finish_time,
+            'num_scheduled_operations': self.num_scheduled_operations,
+            'valid_count': self.valid_count,
             'legal_actions': self.legal_actions,
             'action_mask': self.action_mask,
             'machine_score': self.machine_term,
-            'machine_operation_rate': [machine.operation_rate for machine in self.machines],
+            'machine_operation_rate': self.machine_operation_rate,
             'schedule_buffer': self.schedule_buffer,
             'job_estimated_tardiness': [job.estimated_tardiness for job_list in self.jobs for job in job_list],
             'current_schedule': self.current_schedule,
@@ -812,10 +1262,18 @@ class customRepeatableScheduler():
             'cost_hole': self.cost_hole,
             'cost_processing': self.cost_processing,
             'cost_makespan': self.cost_makespan,
+            'cost_delta': self.cost_delta,
             'heatmap': self.schedule_heatmap,
         }
     
     def render(self, mode="seaborn", num_steps=0):
+        if mode == "rgb_array":
+            return self._render_rgb_array(num_steps)
+
+        import pandas as pd
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as mpatches
+
         current_schedule = [operation.to_dict() for operation in self.current_schedule]
         scheduled_df = list(filter(lambda operation: operation['sequence'] is not None, current_schedule))
         scheduled_df = pd.DataFrame(scheduled_df)
@@ -837,17 +1295,20 @@ class customRepeatableScheduler():
 
         legend_jobs = []
 
+        # job-repeat별 머신 경로는 한 번에 계산해둔다
+        machine_paths = {
+            key: ' -> '.join(map(str, group.sort_values(by='sequence')['machine'].tolist()))
+            for key, group in scheduled_df.groupby(['job', 'job_index'])
+        }
+
         for i in range(len(self.machines)):
             machine_operations = scheduled_df[scheduled_df['machine'] == i]
             for index, operation in machine_operations.iterrows():
-                base_color = mcolors.to_rgba(operation['color'])
                 job_index = operation["job_index"]
-                shade_factor = (job_index + 1) / (len(self.jobs[0]) + 1)
-                shaded_color = tuple([min(max(shade * shade_factor, 0), 1) if idx < 3 else shade for idx, shade in enumerate(base_color)])
+                shaded_color = self._shaded_color(operation['color'], job_index)
 
                 # Build operation sequence string
-                operation_sequences = scheduled_df[(scheduled_df['job'] == operation['job']) & (scheduled_df['job_index'] == operation['job_index'])].sort_values(by='sequence')
-                operation_info = ' -> '.join(map(str, operation_sequences['machine'].tolist()))
+                operation_info = machine_paths[(operation['job'], operation['job_index'])]
 
                 job_label = f'Job {int(operation["job"]) + 1} - Repeat{job_index + 1} - ({operation_info})'
                 legend = (int(operation["job"]) + 1, job_label, shaded_color)
@@ -867,6 +1328,91 @@ class customRepeatableScheduler():
 
         plt.show()
 
+    def _shaded_color(self, color, job_index):
+        import matplotlib.colors as mcolors
+
+        base_color = mcolors.to_rgba(color)
+        shade_factor = (job_index + 1) / (len(self.jobs[0]) + 1)
+        return tuple([min(max(shade * shade_factor, 0), 1) if idx < 3 else shade for idx, shade in enumerate(base_color)])
+
+    def _init_render_canvas(self):
+        import matplotlib.patches as mpatches
+        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        n_machines = len(self.machines)
+        figure = Figure(figsize=(12, 6))
+        canvas = FigureCanvas(figure)
+        ax = figure.add_subplot(111)
+        figure.subplots_adjust(left=0.15, right=0.82)
+        ax.set_title('Operation Schedule Visualization')
+        ax.set_yticks(range(n_machines))
+        ax.set_yticklabels([f'Machine {i}\n ability:{self.machines[i].ability}' for i in range(n_machines)])
+        ax.set_ylim(-1, n_machines)
+        ax.set_xlim(0, max(self.max_time * 100, self.last_finish_time, 1))
+        legend_patches = [mpatches.Patch(color=job_info.color, label=job_info.name) for job_info in self.job_infos]
+        ax.legend(handles=legend_patches, bbox_to_anchor=(1.01, 1), loc='upper left')
+        # step 표시는 매 frame 바뀌므로 background에 포함시키지 않는다
+        step_text = ax.text(0.01, 0.98, '', transform=ax.transAxes, va='top', animated=True)
+        self.render_state = {'figure': figure, 'canvas': canvas, 'ax': ax, 'step_text': step_text, 'patches': [], 'last_sequence': 0, 'background': None}
+        self._redraw_render_canvas()
+
+    def _redraw_render_canvas(self):
+        canvas = self.render_state['canvas']
+        canvas.draw()
+        self.render_state['background'] = canvas.copy_from_bbox(self.render_state['figure'].bbox)
+
+    def _clear_render_canvas(self):
+        if self.render_state is None:
+            return
+        for patch in self.render_state['patches']:
+            patch.remove()
+        self.render_state['patches'] = []
+        self.render_state['last_sequence'] = 0
+        self._redraw_render_canvas()
+
+    def _render_rgb_array(self, num_steps=0):
+        # 지난 frame 이후 새로 배치된 operation의 사각형만 background 위에 그린다
+        import matplotlib.patches as mpatches
+
+        if self.render_state is None:
+            self._init_render_canvas()
+        state = self.render_state
+        ax, canvas = state['ax'], state['canvas']
+
+        # streaming compaction으로 current_schedule 앞부분이 빠질 수 있으므로 index 대신 sequence로 찾는다
+        new_operations = []
+        for operation in reversed(self.current_schedule):
+            if operation.sequence <= state['last_sequence']:
+                break
+            new_operations.append(operation)
+        new_operations.reverse()
+        if new_operations:
+            state['last_sequence'] = new_operations[-1].sequence
+        new_patches = []
+        for operation in new_operations:
+            op_block = mpatches.Rectangle(
+                (operation.start, operation.machine - 0.5), operation.finish - operation.start, 1, facecolor=self._shaded_color(operation.color, operation.job_index), edgecolor='black', linewidth=1)
+            ax.add_patch(op_block)
+            new_patches.append(op_block)
+        state['patches'].extend(new_patches)
+
+        if new_operations and self.last_finish_time > ax.get_xlim()[1]:
+            # x축 범위를 넘어가면 두 배로 늘리고 전체를 다시 그린다
+            ax.set_xlim(0, max(ax.get_xlim()[1] * 2, self.last_finish_time))
+            self._redraw_render_canvas()
+        elif new_patches:
+            canvas.restore_region(state['background'])
+            for patch in new_patches:
+                ax.draw_artist(patch)
+            state['background'] = canvas.copy_from_bbox(state['figure'].bbox)
+        else:
+            canvas.restore_region(state['background'])
+
+        state['step_text'].set_text(f'steps = {num_steps}')
+        ax.draw_artist(state['step_text'])
+        return np.asarray(canvas.buffer_rgba())[..., :3].copy()
+
     def is_legal(self, action):
         return self.action_mask[action[0]*len(self.jobs) + action[1]]
         return self.legal_actions[action[0], action[1]]
@@ -878,10 +1424,7 @@ class customRepeatableScheduler():
         return not np.any(self.action_mask) or all([job.operation_queue[-1].finish is not None for job_list in self.jobs for job in job_list])
 
     def _get_final_operation_finish(self):
-        if self.current_schedule:
-            return max(self.current_schedule, key=lambda x: x.finish).finish
-        else:
-            return 0
+        return self.makespan
 
     def calculate_step_reward(self, action):
         # 머신 가동률의 평균을 reward로 사용
@@ -911,59 +1454,96 @@ class customRepeatableScheduler():
         #     self.machine_term = np.mean(self.machine_operation_rate)
         # return self.machine_term
 
-    def calculate_final_reward(self):
+    def cal_profit(self):
         total_up_time = 0
         for i, repeat in enumerate(self.current_repeats):
             total_duration_per_job = self.jobs[i][0].total_duration // 100
             total_up_time += total_duration_per_job * repeat
 
-        profit = total_up_time * self.profit_per_time
+        return total_up_time * self.profit_per_time
+
+    def set_incumbent(self, cost):
+        # None이면 pruning을 끈다
+        self.incumbent_cost = cost
+        self._check_prune()
+
+    def _check_prune(self):
+        # streaming은 episode가 끝나지 않으므로 pruning하지 않는다
+        if self.incumbent_cost is None or self.streaming or self.is_done():
+            return
+        self.lower_bound = self.cal_lower_bound_cost()
+        self.pruned = self.lower_bound >= self.incumbent_cost
+
+    def cal_lower_bound_cost(self):
+        # 지금까지의 배치를 유지한 채 남은 operation을 어떻게 배치하더라도 final cost가 이 값보다 작아질 수 없다 (admissible)
+        # deadline : 끝난 repeat은 확정값, 남은 repeat은 (다음 operation earliest start + 남은 chain) 기준 초과 시간
+        # hole : 머신별 지금 hole - 그 머신이 처리할 수 있는 남은 작업량 (hole을 최대한 메우는 경우)
+        # processing : 전체 duration 합 (고정)
+        # makespan : 지금 makespan, 남은 repeat의 chain, type별 / 전체 작업량을 처리 가능한 머신 수로 나눈 값 중 최대
+        time_exceeded = self.sum_of_time_exceeded
+        makespan = self.makespan
+        remaining_work = 0
+        remaining_work_per_type = {}
+        for job_list in self.jobs:
+            for job in job_list:
+                if job.is_done:
+                    continue
+                remaining = [operation for operation in job.operation_queue if operation.finish is None]
+                chain = sum(operation.duration for operation in remaining)
+                finish = (remaining[0].earliest_start or 0) + chain
+                time_exceeded += max(0, finish - job.deadline)
+                makespan = max(makespan, finish)
+                remaining_work += chain
+                for operation in remaining:
+                    remaining_work_per_type[operation.type] = remaining_work_per_type.get(operation.type, 0) + operation.duration
+
+        hole_time = 0
+        for machine in self.machines:
+            absorbable = sum(remaining_work_per_type.get(t, 0) for t in machine.ability)
+            hole_time += max(0, machine.cal_idle_time() - absorbable)
+
+        type_sets = [[t] for t in remaining_work_per_type] + [list(remaining_work_per_type)]
+        for type_set in type_sets:
+            capable = [machine for machine in self.machines if any(t in machine.ability for t in type_set)]
+            if capable:
+                work = sum(machine.working_time for machine in capable) + sum(remaining_work_per_type[t] for t in type_set)
+                makespan = max(makespan, int(np.ceil(work / len(capable))))
+
+        up_time = self.sum_of_up_time + remaining_work
+        return time_exceeded / 100 * self.cost_deadline_per_time + hole_time * self.cost_hole_per_time / 100 + up_time * self.cost_processing_per_time / 100 + makespan * self.cost_makespan_per_time / 100
+
+    def calculate_final_reward(self):
+        profit = self.cal_profit()
         cost = self.cal_final_cost()
         return ((profit - cost) / profit) * 100
 
+    def calculate_dense_reward(self):
+        # 이번 step에서 늘어난 cost만큼을 음의 보상으로 준다
+        # episode 종료 시 100 (= profit / profit * 100)을 더하면 합이 calculate_final_reward와 같다
+        return -float(np.sum(self.cost_delta)) / self.cal_profit() * 100
+
+    def _update_costs(self):
+        previous_costs = np.array([self.cost_deadline, self.cost_hole, self.cost_processing, self.cost_makespan])
+        self.cal_final_cost()
+        current_costs = np.array([self.cost_deadline, self.cost_hole, self.cost_processing, self.cost_makespan])
+        self.cost_delta = current_costs - previous_costs
+
     def cal_job_deadline_cost(self):
-        sum_of_time_exceed = 0
-        deadline_cost_per_job = []
-        for job_list in self.jobs:
-            deadline_cost = [job.time_exceeded for job in job_list]
-            deadline_cost_per_job.append(sum(deadline_cost))
-            sum_of_time_exceed += sum(deadline_cost)
-        self.cost_deadline = sum_of_time_exceed / 100 * self.cost_deadline_per_time
+        # 끝난 repeat의 deadline 초과 시간은 _schedule_operation에서 누적된다
+        self.cost_deadline = self.sum_of_time_exceeded / 100 * self.cost_deadline_per_time
 
         return self.cost_deadline
     
     def cal_machine_cost(self):
-        up_time_cost_per_machine = []
-        hole_time_cost_per_machine = []
-        sum_of_hole_time = 0
-        sum_of_up_time = 0
-        for machine in self.machines:
-            up_time = 0
-            hole_time = 0
-            if not machine.operation_schedule:
-                continue
-            machine.operation_schedule.sort(key = lambda x: x.start)
-            first_start = machine.operation_schedule[0].start
-            last_finish = machine.operation_schedule[-1].finish
-
-            for op in machine.operation_schedule:
-                up_time += op.duration
-
-            hole_time = last_finish - first_start - up_time
-            sum_of_up_time += up_time
-            sum_of_hole_time += hole_time
-
-            up_time_cost_per_machine.append(up_time)
-            hole_time_cost_per_machine.append(hole_time)
-        
-        self.cost_hole = sum_of_hole_time * self.cost_hole_per_time / 100
-        self.cost_processing = sum_of_up_time * self.cost_processing_per_time / 100
+        # 머신별 up time / hole time은 operation 배치 시점에 누적된다
+        self.cost_hole = self.sum_of_hole_time * self.cost_hole_per_time / 100
+        self.cost_processing = self.sum_of_up_time * self.cost_processing_per_time / 100
 
         return self.cost_hole + self.cost_processing
 
     def cal_entire_cost(self):
-            self.cost_makespan = self._get_final_operation_finish() * self.cost_makespan_per_time / 100
-            return self.cost_makespan
+        self.cost_makespan = self._get_final_operation_finish() * self.cost_makespan_per_time / 100
+        return self.cost_makespan
 
     def cal_final_cost(self):
         # 반도체 공장
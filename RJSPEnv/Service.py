@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import collections
+import json
+import time
+import numpy as np
+
+from RJSPEnv.Env import RJSPEnv
+from RJSPEnv.Evaluation import RULE_PREFIX, env_kwargs_from_space
+from RJSPEnv.Heuristics import DISPATCHING_RULES, dispatch_action
+
+# 로컬 scheduling service (asyncio, 표준 라이브러리만 사용하므로 offline에서 동작한다)
+# 요청마다 미리 만들어 둔 env pool에서 env를 하나 빌려 episode를 끝까지 돌리고
+# 여러 요청의 policy forward는 micro-batch로 묶어서 한 번에 계산한다
+#
+#   python -m RJSPEnv.Service --checkpoint policy.pt --machines instances/Machines/v0-12x8.json --jobs instances/Jobs/v0-12x8-12.json --port 8080
+#   python -m RJSPEnv.Service --checkpoint rule:edd ... --unix /tmp/rjsp.sock
+#
+#   POST /schedule  {"repeats": [3, 2, ...], "seed": 0}
+#       -> {"placements": [{machine, job, repeat, operation, start, finish}, ...], "costs": {...}, "makespan": ..., "reward": ...}
+#   GET  /metrics   -> latency p50 / p99, queue depth, batch 크기
+#   GET  /health
+#
+# checkpoint : MaskablePPO .zip, RJSPEnv.Export로 만든 .pt / .onnx, 또는 rule:<dispatching rule>
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _load_policy(checkpoint):
+    # (batch forward 함수, policy가 기대하는 env kwargs)
+    # batch forward : (observation list, mask 배열 (B, A)) -> action 배열 (B, ...)
+    if checkpoint.startswith(RULE_PREFIX):
+        return None, {}
+    if checkpoint.endswith(".zip"):
+        from sb3_contrib import MaskablePPO
+
+        model = MaskablePPO.load(checkpoint, device="cpu")
+
+        def forward(observations, masks):
+            if isinstance(observations[0], dict):
+                batch = {key: np.stack([observation[key] for observation in observations]) for key in observations[0]}
+            else:
+                batch = np.stack(observations)
+            return model.predict(batch, deterministic=True, action_masks=masks)[0]
+        return forward, env_kwargs_from_space(model.observation_space)
+
+    from RJSPEnv.Export import PolicyRunner
+
+    runner = PolicyRunner(checkpoint)
+    env_kwargs = {}
+    if "schedule_heatmap" in runner.layout:
+        env_kwargs["max_time"] = int(runner.layout["schedule_heatmap"][2][-1])
+    if "total_count_per_type" in runner.layout:
+        env_kwargs["num_of_types"] = int(runner.layout["total_count_per_type"][2][0])
+
+    def forward(observations, masks):
+        return runner.predict(np.stack([runner.flatten(observation) for observation in observations]), masks)
+    return forward, env_kwargs
+
+
+class _PolicyBatcher():
+    # 동시에 들어온 요청들의 (observation, mask)를 max_batch개 또는 max_wait 동안 모아서 한 번에 forward 한다
+    def __init__(self, forward, max_batch=32, max_wait=0.002):
+        self.forward = forward
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batch_sizes = collections.deque(maxlen=10000)
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, observation, mask):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((observation, mask, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # torch forward는 GIL을 놓으므로 thread에서 돌리는 동안 다른 요청의 env step을 진행할 수 있다
+            observations = [observation for observation, _, _ in items]
+            masks = np.stack([mask for _, mask, _ in items])
+            try:
+                actions = await loop.run_in_executor(None, self.forward, observations, masks)
+            except Exception as error:
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.batch_sizes.append(len(items))
+            for (_, _, future), action in zip(items, actions):
+                if not future.done():
+                    future.set_result(action)
+
+
+class SchedulingService():
+    def __init__(self, machine_config_path, job_config_path, checkpoint, num_envs=4, max_batch=32, max_wait_ms=2.0, env_kwargs=None):
+        self.forward, policy_kwargs = _load_policy(checkpoint)
+        self.rule = checkpoint[len(RULE_PREFIX):] if self.forward is None else None
+        if self.forward is None and self.rule not in DISPATCHING_RULES:
+            raise ValueError(f"Unknown dispatching rule : {self.rule}")
+        self.env_kwargs = {**policy_kwargs, **(env_kwargs or {})}
+        self.num_envs = num_envs
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        # pre-warm : env 생성 (JSON 로드, observation space 구성)은 요청 전에 끝낸다
+        with open(job_config_path, "r") as file:
+            self.max_repeats = [len(job["deadline"]) for job in json.load(file)["jobs"]]
+        self.envs = [RJSPEnv(machine_config_path, job_config_path, [(1, 0)] * len(self.max_repeats), test_mode=True, info_mode="minimal", **self.env_kwargs) for _ in range(num_envs)]
+        for env in self.envs:
+            env.reset(seed=0)
+
+        self.env_pool = None
+        self.batcher = None
+        self.latencies = collections.deque(maxlen=10000)
+        self.num_requests = 0
+        self.num_errors = 0
+        self.num_waiting = 0  # env를 기다리는 요청 수
+
+    async def start(self):
+        self.env_pool = asyncio.Queue()
+        for env in self.envs:
+            self.env_pool.put_nowait(env)
+        if self.forward is not None:
+            self.batcher = _PolicyBatcher(self.forward, self.max_batch, self.max_wait)
+            self.batcher.start()
+
+    def _validate(self, request):
+        if not isinstance(request, dict):
+            raise ServiceError(400, "request body must be a JSON object")
+        repeats = request.get("repeats")
+        if not isinstance(repeats, list) or len(repeats) != len(self.max_repeats):
+            raise ServiceError(400, f"repeats must be a list of {len(self.max_repeats)} integers")
+        for job_index, (repeat, limit) in enumerate(zip(repeats, self.max_repeats)):
+            if not isinstance(repeat, int) or isinstance(repeat, bool) or not 1 <= repeat <= limit:
+                raise ServiceError(400, f"repeats[{job_index}] must be between 1 and {limit}")
+        # bool은 int의 subclass이므로 따로 거른다, reset(seed=...)는 음수를 받지 않는다
+        seed = request.get("seed", 0)
+        if not isinstance(seed, int) or isinstance(seed, bool) or seed < 0:
+            raise ServiceError(400, "seed must be a non-negative integer")
+        return repeats, seed
+
+    async def schedule(self, request):
+        repeats, seed = self._validate(request)
+        start_time = time.perf_counter()
+        self.num_waiting += 1
+        env = await self.env_pool.get()
+        self.num_waiting -= 1
+        try:
+            env.current_repeats = list(repeats)
+            observation, _ = env.reset(seed=seed)
+            rng = np.random.default_rng(seed)
+            total_reward = 0.0
+            while True:
+                if self.batcher is None:
+                    action = dispatch_action(env, self.rule, rng)
+                else:
+                    action = await self.batcher.submit(observation, env.action_masks().copy())
+                observation, reward, terminated, truncated, _ = env.step(action)
+                total_reward += reward
+                if terminated or truncated:
+                    break
+                if self.batcher is None:
+                    await asyncio.sleep(0)  # rule만 쓸 때도 다른 요청이 진행되도록 양보한다
+
+            scheduler = env.custom_scheduler
+            total_cost = scheduler.cal_final_cost()
+            response = {
+                "placements": [
+                    {"machine": op.machine, "job": int(op.job), "repeat": op.job_index, "operation": op.index, "start": op.start, "finish": op.finish}
+                    for op in scheduler.current_schedule
+                ],
+                "costs": {
+                    "deadline": scheduler.cost_deadline,
+                    "hole": scheduler.cost_hole,
+                    "processing": scheduler.cost_processing,
+                    "makespan": scheduler.cost_makespan,
+                    "total": total_cost,
+                },
+                "makespan": scheduler.makespan,
+                "target_time": env.target_time,
+                "reward": total_reward,
+                "truncated": bool(truncated),
+            }
+        finally:
+            self.env_pool.put_nowait(env)
+        self.latencies.append(time.perf_counter() - start_time)
+        return response
+
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000
+        batch_sizes = np.array(self.batcher.batch_sizes) if self.batcher else np.zeros(0)
+        return {
+            "num_requests": self.num_requests,
+            "num_errors": self.num_errors,
+            "latency_ms_p50": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "latency_ms_p99": float(np.percentile(latencies, 99)) if len(latencies) else None,
+            "queue_depth_env": self.num_waiting,
+            "queue_depth_policy": self.batcher.queue.qsize() if self.batcher else 0,
+            "batch_size_mean": float(batch_sizes.mean()) if len(batch_sizes) else None,
+            "batch_size_max": int(batch_sizes.max()) if len(batch_sizes) else None,
+            "num_envs": self.num_envs,
+        }
+
+    async def handle(self, method, path, body):
+        # (status, response dict)
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics()
+        if method == "POST" and path == "/schedule":
+            self.num_requests += 1
+            try:
+                return 200, await self.schedule(json.loads(body or b"{}"))
+            except ServiceError as error:
+                self.num_errors += 1
+                return error.status, {"error": str(error)}
+            except json.JSONDecodeError as error:
+                self.num_errors += 1
+                return 400, {"error": f"invalid JSON : {error}"}
+            except Exception as error:
+                # episode 중 오류 (잘못된 rule 이름 등)도 연결을 끊지 않고 500으로 돌려준다
+                self.num_errors += 1
+                return 500, {"error": f"{type(error).__name__}: {error}"}
+        return 404, {"error": f"unknown endpoint : {method} {path}"}
+
+    async def _serve_connection(self, reader, writer):
+        # 최소한의 HTTP/1.1 (요청 하나 처리 후 연결 종료)
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) < 2:
+                return
+            method, path = request_line[0], request_line[1]
+            content_length = 0
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                if name.strip().lower() == "content-length":
+                    content_length = int(value.strip())
+            body = await reader.readexactly(content_length) if content_length else b""
+            status, response = await self.handle(method, path, body)
+            payload = json.dumps(response, default=lambda value: value.item() if isinstance(value, np.generic) else str(value)).encode()
+            reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}.get(status, "Error")
+            writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080, unix_path=None):
+        await self.start()
+        if unix_path:
+            server = await asyncio.start_unix_server(self._serve_connection, path=unix_path)
+        else:
+            server = await asyncio.start_server(self._serve_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local RJSP scheduling service")
+    parser.add_argument("--checkpoint", required=True, help="MaskablePPO .zip, exported .pt / .onnx, or rule:<name>")
+    parser.add_argument("--machines", required=True)
+    parser.add_argument("--jobs", required=True)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="serve on this Unix socket path instead of TCP")
+    parser.add_argument("--envs", type=int, default=4)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--max-time", type=int, default=None)
+    parser.add_argument("--num-of-types", type=int, default=None)
+    args = parser.parse_args()
+
+    env_kwargs = {name: value for name, value in (("max_time", args.max_time), ("num_of_types", args.num_of_types)) if value is not None}
+    service = SchedulingService(args.machines, args.jobs, args.checkpoint, args.envs, args.max_batch, args.max_wait_ms, env_kwargs)
+    print(f"serving on {args.unix or f'http://{args.host}:{args.port}'}")
+    asyncio.run(service.serve(args.host, args.port, args.unix))
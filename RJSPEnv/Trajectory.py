@@ -0,0 +1,294 @@
+import json
+import os
+import struct
+import numpy as np
+import gymnasium as gym
+
+from RJSPEnv.Scheduler import customRepeatableScheduler
+
+# episode 진행 과정을 고정 길이 binary record로 기록하고 다시 재생하는 모듈
+#
+# 파일 구조 (append-only)
+#   [MAGIC 8 bytes][header 길이 uint32][header JSON : instance, cost, max_time 등]
+#   이후 chunk의 연속 : [tag 4 bytes][episode uint32][count uint32][payload]
+#     b"EPIS" : episode 시작, payload = current_repeats (int32 x count)
+#     b"STEP" : payload = TRAJECTORY_RECORD_DTYPE record x count
+#     b"INJT" : streaming inject_repeat, payload = TRAJECTORY_INJECT_DTYPE record x count
+#     b"HRZN" : streaming advance_horizon, payload = TRAJECTORY_HORIZON_DTYPE record x count
+# STEP chunk의 payload는 np.memmap으로 바로 읽을 수 있다
+# INJT / HRZN의 position은 그 event 전에 기록된 이번 episode의 STEP record 수 (replay에서 그 record 앞에 적용한다)
+
+TRAJECTORY_MAGIC = b"RJSPTRJ1"
+CHUNK_HEADER = struct.Struct("<4sII")
+EPISODE_TAG = b"EPIS"
+STEP_TAG = b"STEP"
+INJECT_TAG = b"INJT"
+HORIZON_TAG = b"HRZN"
+
+# placement 하나당 record 하나. illegal action은 machine/job만 기록하고 나머지는 -1
+# 한 step에 여러 placement가 생기면 같은 step 번호로 여러 record가 쌓이고 reward는 마지막 record에 기록된다
+# reset 중에 자동으로 배치된 operation (decision_mode forced / event)은 step -1, action -1로 기록된다
+TRAJECTORY_RECORD_DTYPE = np.dtype([
+    ("step", "<i4"),
+    ("action", "<i4"),
+    ("machine", "<i2"),
+    ("job", "<i2"),
+    ("repeat", "<i2"),
+    ("operation", "<i2"),
+    ("start", "<i8"),
+    ("finish", "<i8"),
+    ("reward", "<f4"),
+])
+
+TRAJECTORY_INJECT_DTYPE = np.dtype([
+    ("position", "<i8"),
+    ("job", "<i4"),
+    ("deadline", "<i8"),
+    ("release", "<i8"),
+])
+
+TRAJECTORY_HORIZON_DTYPE = np.dtype([
+    ("position", "<i8"),
+    ("horizon", "<i8"),
+])
+
+EVENT_DTYPES = {INJECT_TAG: TRAJECTORY_INJECT_DTYPE, HORIZON_TAG: TRAJECTORY_HORIZON_DTYPE}
+
+
+def _read_header(file):
+    magic = file.read(len(TRAJECTORY_MAGIC))
+    if magic != TRAJECTORY_MAGIC:
+        raise ValueError("Not a trajectory file")
+    (header_length,) = struct.unpack("<I", file.read(4))
+    return json.loads(file.read(header_length).decode("utf-8"))
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    def __init__(self, env, path, chunk_size=1024):
+        super().__init__(env)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.buffer = np.zeros(chunk_size, dtype=TRAJECTORY_RECORD_DTYPE)
+        self.buffer_count = 0
+        self.num_steps = 0
+        self.num_records = 0  # 이번 episode에 기록한 STEP record 수
+
+        # 기존 파일이 있으면 이어서 기록한다
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self.episode = TrajectoryReader(path).num_episodes
+            self.file = open(path, "ab")
+        else:
+            self.episode = 0
+            self.file = open(path, "wb")
+            header = json.dumps(self._make_header(self.env.unwrapped)).encode("utf-8")
+            self.file.write(TRAJECTORY_MAGIC)
+            self.file.write(struct.pack("<I", len(header)))
+            self.file.write(header)
+            self.file.flush()
+        self.episode_started = False
+
+    def _make_header(self, env):
+        return {
+            "version": 1,
+            "machines": env.machine_config,
+            "jobs": env.jobs,
+            "cost_deadline_per_time": env.cost_deadline_per_time,
+            "cost_hole_per_time": env.cost_hole_per_time,
+            "cost_processing_per_time": env.cost_processing_per_time,
+            "cost_makespan_per_time": env.cost_makespan_per_time,
+            "profit_per_time": env.profit_per_time,
+            "max_time": env.max_time,
+            "num_of_types": env.num_of_types,
+            "streaming": env.streaming,
+        }
+
+    def reset(self, **kwargs):
+        self.flush()
+        if self.episode_started:
+            self.episode += 1
+        obs, info = self.env.reset(**kwargs)
+        repeats = np.asarray(self.env.unwrapped.current_repeats, dtype="<i4")
+        self.file.write(CHUNK_HEADER.pack(EPISODE_TAG, self.episode, len(repeats)))
+        self.file.write(repeats.tobytes())
+        self.episode_started = True
+        self.num_steps = -1
+        self.num_records = 0
+        for operation in self.env.unwrapped.custom_scheduler.current_schedule:
+            self._append(-1, operation.machine, int(operation.job), operation.job_index, operation.index, operation.start, operation.finish, 0.0)
+        self.num_steps = 0
+        return obs, info
+
+    def inject_repeat(self, job_index, deadline, release_time=0):
+        repeat_index = self.env.unwrapped.inject_repeat(job_index, deadline, release_time)
+        self._write_event(INJECT_TAG, (self.num_records, job_index, deadline, release_time))
+        return repeat_index
+
+    def advance_horizon(self, time):
+        horizon_before = self.env.unwrapped.custom_scheduler.horizon
+        horizon = self.env.unwrapped.advance_horizon(time)
+        if horizon != horizon_before:
+            self._write_event(HORIZON_TAG, (self.num_records, horizon))
+        return horizon
+
+    def _write_event(self, tag, values):
+        event = np.array([values], dtype=EVENT_DTYPES[tag])
+        self.file.write(CHUNK_HEADER.pack(tag, self.episode, 1))
+        self.file.write(event.tobytes())
+
+    def step(self, action):
+        scheduler = self.env.unwrapped.custom_scheduler
+        num_scheduled_before = scheduler.num_scheduled_operations
+        horizon_before = scheduler.horizon
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        if scheduler.horizon != horizon_before:
+            # streaming_horizon_lag에 의한 자동 advance_horizon은 이번 step의 placement 전에 일어난다
+            self._write_event(HORIZON_TAG, (self.num_records, scheduler.horizon))
+
+        # streaming mode에서는 step 중에 current_schedule 앞부분이 compaction으로 빠질 수 있으므로 sequence로 찾는다
+        placed = []
+        for operation in reversed(scheduler.current_schedule):
+            if operation.sequence <= num_scheduled_before:
+                break
+            placed.append(operation)
+        placed.reverse()
+        if placed:
+            # reward는 마지막 record에 기록한다 (_append가 chunk를 flush 하기 전에 넣어야 한다)
+            for i, operation in enumerate(placed):
+                self._append(action, operation.machine, int(operation.job), operation.job_index, operation.index, operation.start, operation.finish, reward if i == len(placed) - 1 else 0.0)
+        else:
+            machine, job = self.env.unwrapped.decode_action(action)
+            self._append(action, machine, job, -1, -1, -1, -1, reward)
+
+        self.num_steps += 1
+        if terminated or truncated:
+            self.flush()
+        return obs, reward, terminated, truncated, info
+
+    def _append(self, action, machine, job, repeat, operation, start, finish, reward):
+        record = self.buffer[self.buffer_count]
+        record["step"] = self.num_steps
+        # factorized mode의 [job, machine]은 machine * len_jobs + job으로 기록한다
+        action = np.asarray(action)
+        record["action"] = int(action) if action.ndim == 0 else int(action[1]) * self.env.unwrapped.len_jobs + int(action[0])
+        record["machine"] = machine
+        record["job"] = job
+        record["repeat"] = repeat
+        record["operation"] = operation
+        record["start"] = start
+        record["finish"] = finish
+        record["reward"] = reward
+        self.buffer_count += 1
+        self.num_records += 1
+        if self.buffer_count == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer_count:
+            self.file.write(CHUNK_HEADER.pack(STEP_TAG, self.episode, self.buffer_count))
+            self.file.write(self.buffer[:self.buffer_count].tobytes())
+            self.buffer_count = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+        super().close()
+
+
+class TrajectoryReader():
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.header = _read_header(file)
+            self.episodes = []
+            file_size = os.fstat(file.fileno()).st_size
+            while True:
+                chunk_offset = file.tell()
+                raw = file.read(CHUNK_HEADER.size)
+                if len(raw) < CHUNK_HEADER.size:
+                    break
+                tag, episode, count = CHUNK_HEADER.unpack(raw)
+                payload_offset = chunk_offset + CHUNK_HEADER.size
+                if tag == EPISODE_TAG:
+                    payload_size = count * 4
+                elif tag == STEP_TAG:
+                    payload_size = count * TRAJECTORY_RECORD_DTYPE.itemsize
+                elif tag in EVENT_DTYPES:
+                    payload_size = count * EVENT_DTYPES[tag].itemsize
+                else:
+                    raise ValueError(f"Unknown chunk tag {tag!r} at offset {chunk_offset}")
+                # 기록 중 끊긴 마지막 chunk는 무시한다
+                if payload_offset + payload_size > file_size:
+                    break
+                if tag == EPISODE_TAG:
+                    repeats = np.frombuffer(file.read(payload_size), dtype="<i4").tolist()
+                    self.episodes.append({"repeats": repeats, "chunks": [], "events": []})
+                elif tag in EVENT_DTYPES:
+                    for event in np.frombuffer(file.read(payload_size), dtype=EVENT_DTYPES[tag]):
+                        self.episodes[episode]["events"].append((tag, event))
+                else:
+                    self.episodes[episode]["chunks"].append((payload_offset, count))
+                    file.seek(payload_size, os.SEEK_CUR)
+
+    @property
+    def num_episodes(self):
+        return len(self.episodes)
+
+    def records(self, episode):
+        chunks = [
+            np.memmap(self.path, dtype=TRAJECTORY_RECORD_DTYPE, mode="r", offset=offset, shape=(count,))
+            for offset, count in self.episodes[episode]["chunks"]
+        ]
+        if len(chunks) == 1:
+            return chunks[0]
+        if not chunks:
+            return np.zeros(0, dtype=TRAJECTORY_RECORD_DTYPE)
+        return np.concatenate(chunks)
+
+    def make_scheduler(self, episode):
+        header = self.header
+        repeats = self.episodes[episode]["repeats"]
+        repeat_jobs = []
+        for job, repeat in zip(header["jobs"], repeats):
+            repeat_jobs.append({
+                'name': job['name'],
+                'color': job['color'],
+                'operations': job['operations'],
+                'deadline': job['deadline'][:repeat],
+            })
+        return customRepeatableScheduler(jobs=repeat_jobs, machines=header["machines"], cost_deadline_per_time=header["cost_deadline_per_time"], cost_hole_per_time=header["cost_hole_per_time"], cost_processing_per_time=header["cost_processing_per_time"], cost_makespan_per_time=header["cost_makespan_per_time"], profit_per_time=header["profit_per_time"], current_repeats=repeats, max_time=header["max_time"], num_of_types=header["num_of_types"], streaming=header.get("streaming", False))
+
+    def replay(self, episode, step=None):
+        # step번째 step까지 (step 미포함) 기록된 placement를 다시 적용한 scheduler를 반환한다
+        # policy는 필요 없고, 기록된 (machine, job) 순서대로 update_state만 호출한다
+        scheduler = self.make_scheduler(episode)
+        scheduler.reset()
+        events = self.episodes[episode]["events"]
+        event_index = 0
+        for position, record in enumerate(self.records(episode)):
+            if step is not None and record["step"] >= step:
+                break
+            event_index = self._apply_events(scheduler, events, event_index, position)
+            if record["repeat"] < 0:
+                continue
+            action = [int(record["machine"]), int(record["job"])]
+            scheduler.update_state(action)
+            operation = scheduler.current_schedule[-1]
+            if operation.job_index != record["repeat"] or operation.start != record["start"] or operation.finish != record["finish"]:
+                raise ValueError(f"Replay diverged at step {record['step']} : recorded {record}, replayed {operation}")
+        else:
+            # 마지막 record 뒤에 일어난 event
+            self._apply_events(scheduler, events, event_index, len(self.records(episode)))
+        return scheduler
+
+    def _apply_events(self, scheduler, events, event_index, position):
+        # position 이전 (position 포함)에 기록된 streaming event를 기록된 순서대로 적용한다
+        while event_index < len(events) and events[event_index][1]["position"] <= position:
+            tag, event = events[event_index]
+            if tag == INJECT_TAG:
+                scheduler.inject_repeat(int(event["job"]), int(event["deadline"]), int(event["release"]))
+            else:
+                scheduler.advance_horizon(int(event["horizon"]))
+            event_index += 1
+        return event_index
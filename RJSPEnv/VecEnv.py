@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+# 한 process 안에서 N개의 RJSPEnv를 thread pool로 동시에 step 하는 VecEnv
+# SubprocVecEnv와 달리 observation / action을 pickle 하지 않고 env마다 process를 띄우지 않는다
+# step / reset의 auto-reset, info, seed 처리는 DummyVecEnv와 같고 env별 작업만 thread에서 돈다
+#
+#   env = ThreadVecEnv([lambda: RJSPEnv(..., kernel_backend="numpy") for _ in range(16)], num_threads=8)
+#   model = MaskablePPO("MultiInputPolicy", env)
+#
+# Python 코드는 GIL 때문에 동시에 돌지 않으므로 numpy / numba kernel (kernel_backend)처럼 GIL을 놓는 구간이 길수록 빨라진다
+# env의 random은 모두 env.np_random을 쓰므로 (sample_job_repeats 포함) thread 순서와 관계없이 seed만으로 재현된다
+
+
+class ThreadVecEnv(DummyVecEnv):
+    def __init__(self, env_fns, num_threads=None):
+        super().__init__(env_fns)
+        self.num_threads = num_threads or self.num_envs
+        self.executor = ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix="rjsp-env")
+        self.futures = None
+
+    def _step_env(self, env_index, action):
+        # DummyVecEnv.step_wait의 env 하나 분량 (env_index별 buffer 칸만 건드리므로 thread끼리 겹치지 않는다)
+        env = self.envs[env_index]
+        observation, self.buf_rews[env_index], terminated, truncated, self.buf_infos[env_index] = env.step(action)
+        self.buf_dones[env_index] = terminated or truncated
+        self.buf_infos[env_index]["TimeLimit.truncated"] = truncated and not terminated
+        if self.buf_dones[env_index]:
+            self.buf_infos[env_index]["terminal_observation"] = observation
+            observation, self.reset_infos[env_index] = env.reset()
+        self._save_obs(env_index, observation)
+
+    def _reset_env(self, env_index):
+        options = {"options": self._options[env_index]} if self._options[env_index] else {}
+        observation, self.reset_infos[env_index] = self.envs[env_index].reset(seed=self._seeds[env_index], **options)
+        self._save_obs(env_index, observation)
+
+    def step_async(self, actions):
+        # 바로 thread에 넘기므로 step_wait 전에 policy 쪽 작업을 겹쳐서 할 수 있다
+        self.actions = actions
+        self.futures = [self.executor.submit(self._step_env, env_index, actions[env_index]) for env_index in range(self.num_envs)]
+
+    def step_wait(self):
+        for future in self.futures:
+            future.result()
+        self.futures = None
+        return self._obs_from_buf(), np.copy(self.buf_rews), np.copy(self.buf_dones), deepcopy(self.buf_infos)
+
+    def reset(self):
+        for future in [self.executor.submit(self._reset_env, env_index) for env_index in range(self.num_envs)]:
+            future.result()
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs_from_buf()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        super().close()
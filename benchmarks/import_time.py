@@ -0,0 +1,58 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# RJSPEnv import 시간 측정
+# 새 interpreter에서 module을 import해 걸린 시간과, 그 과정에서 로드된 무거운 package를 확인한다
+# 기준을 넘거나 무거운 package가 딸려오면 exit code 1 (CI에서 regression 감지용)
+#   python benchmarks/import_time.py
+#   python benchmarks/import_time.py --module RJSPEnv.Scheduler --max-seconds 0.5
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "matplotlib", "seaborn", "PIL", "stable_baselines3", "sb3_contrib", "torch")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat):
+    results = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure RJSPEnv import time in a fresh interpreter")
+    parser.add_argument("--module", action="append", help="module to import (default: RJSPEnv.Env, RJSPEnv.Scheduler)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=1.0, help="fail if the median import time exceeds this")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.module or ["RJSPEnv.Env", "RJSPEnv.Scheduler"]:
+        results = measure(module, args.repeat)
+        median = statistics.median(result["seconds"] for result in results)
+        loaded = sorted(set(name for result in results for name in result["loaded"]))
+        status = "ok"
+        if loaded:
+            status = f"FAIL (loaded {', '.join(loaded)})"
+            failed = True
+        elif median > args.max_seconds:
+            status = f"FAIL (> {args.max_seconds:.2f}s)"
+            failed = True
+        print(f"{module:<24} median {median * 1000:8.1f} ms over {args.repeat} runs  {status}")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+
+# kernel_backend별 env.step 시간 비교 (12x8 instance와 synthetic 100x50 shop)
+# 같은 seed의 random legal action을 둬서 backend마다 같은 schedule을 만들고, 마지막 cost가 다르면 exit code 1
+#   python benchmarks/kernel_step.py
+#   python benchmarks/kernel_step.py --shops 100x50 --steps 500 --backends python numba
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from RJSPEnv.Env import RJSPEnv
+from RJSPEnv.Generator import generate_instance, suggest_env_params, write_instance
+from RJSPEnv.Kernels import numba
+
+
+def instance_paths(shop, directory, repeats):
+    # "12x8"은 instances/의 v0 instance, 그 외 "<jobs>x<machines>"는 Generator로 만든다
+    instance_jobs = os.path.join(REPO_ROOT, "instances", "Jobs")
+    names = sorted(name for name in os.listdir(instance_jobs) if name.startswith(f"v0-{shop}-"))
+    if names:
+        job_config_path = os.path.join(instance_jobs, names[0])
+        machine_config_path = os.path.join(REPO_ROOT, "instances", "Machines", f"v0-{shop}.json")
+    else:
+        num_jobs, num_machines = (int(value) for value in shop.split("x"))
+        jobs, machines = generate_instance(num_jobs, num_machines, num_repeats=repeats, seed=0)
+        job_config_path = os.path.join(directory, "Jobs", f"syn-{shop}-{repeats}.json")
+        machine_config_path = os.path.join(directory, "Machines", f"syn-{shop}.json")
+        write_instance(jobs, machines, job_config_path, machine_config_path)
+    with open(job_config_path, "r") as job_file, open(machine_config_path, "r") as machine_file:
+        jobs, machines = json.load(job_file), json.load(machine_file)
+    job_repeats = [min(repeats, len(job["deadline"])) for job in jobs["jobs"]]
+    return machine_config_path, job_config_path, job_repeats, suggest_env_params(jobs, machines, job_repeats)
+
+
+def run(machine_config_path, job_config_path, job_repeats, env_params, backend, steps, seed):
+    env = RJSPEnv(machine_config_path, job_config_path, [(repeat, 0) for repeat in job_repeats], test_mode=True, info_mode="minimal", kernel_backend=backend, **env_params)
+    env.reset(seed=seed)
+    rng = np.random.default_rng(seed)
+    latencies = []
+    for _ in range(steps):
+        action = int(rng.choice(np.flatnonzero(env.action_masks())))
+        start = time.perf_counter()
+        _, _, terminated, truncated, _ = env.step(action)
+        latencies.append(time.perf_counter() - start)
+        if terminated or truncated:
+            break
+    return latencies, env.custom_scheduler.cal_final_cost()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-step latency of the scheduler kernel backends")
+    parser.add_argument("--shops", nargs="+", default=("12x8", "100x50"))
+    parser.add_argument("--backends", nargs="+", default=("python", "numpy", "numba"))
+    parser.add_argument("--repeats", type=int, default=5, help="repeats per job (synthetic shops are generated with this many deadlines)")
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backends = [backend for backend in args.backends if backend != "numba" or numba is not None]
+    if len(backends) != len(args.backends):
+        print("numba is not installed, skipping kernel_backend='numba'")
+
+    mismatches = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for shop in args.shops:
+            paths = instance_paths(shop, directory, args.repeats)
+            print(f"{shop} (repeats {args.repeats}, {args.steps} steps)")
+            baseline, reference_cost = None, None
+            for backend in backends:
+                if backend == "numba":
+                    run(*paths, backend, 2, args.seed)  # compile 시간은 제외한다
+                latencies, cost = run(*paths, backend, args.steps, args.seed)
+                mean = statistics.fmean(latencies)
+                baseline = baseline or mean
+                reference_cost = cost if reference_cost is None else reference_cost
+                same = cost == reference_cost
+                mismatches += not same
+                print(f"  {backend:<8} {mean * 1e3:8.2f} ms/step (p50 {statistics.median(latencies) * 1e3:7.2f}, last 10% {statistics.fmean(latencies[-max(1, len(latencies) // 10):]) * 1e3:7.2f})  x{baseline / mean:5.2f}  cost {cost}{'' if same else '  MISMATCH'}")
+    sys.exit(1 if mismatches else 0)
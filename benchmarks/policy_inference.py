@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+
+# MaskablePPO.predict vs export한 TorchScript policy 추론 시간 비교
+# 한 episode의 observation / mask를 모아서 1개씩 (serving) 과 batch로 각각 측정한다
+#   python benchmarks/policy_inference.py --checkpoint models/.../best_model.zip --instance 5x3 --max-time 50
+#   python benchmarks/policy_inference.py --instance 12x8     (checkpoint 없으면 학습하지 않은 MaskablePPO로 측정)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from sb3_contrib import MaskablePPO
+
+from RJSPEnv.Env import RJSPEnv
+from RJSPEnv.Export import PolicyRunner, export_torchscript
+
+
+def collect(env, model, num_episodes):
+    observations, masks = [], []
+    for episode in range(num_episodes):
+        observation, _ = env.reset(seed=episode)
+        while True:
+            mask = env.action_masks().copy()
+            action, _ = model.predict(observation, deterministic=True, action_masks=mask)
+            # schedule_heatmap 등은 env가 step마다 in-place로 갱신하므로 복사해서 모은다
+            observations.append({key: np.array(value) for key, value in observation.items()})
+            masks.append(mask)
+            observation, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                break
+    return observations, masks
+
+
+def timed(function, repeat):
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        results.append(time.perf_counter() - start)
+    return statistics.median(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare SB3 predict with the exported TorchScript policy")
+    parser.add_argument("--checkpoint", default=None)
+    parser.add_argument("--instance", default="12x8")
+    parser.add_argument("--max-time", type=int, default=150)
+    parser.add_argument("--num-of-types", type=int, default=4)
+    parser.add_argument("--episodes", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    job_config_path = next(os.path.join("instances", "Jobs", name) for name in sorted(os.listdir(os.path.join("instances", "Jobs"))) if name.startswith(f"v0-{args.instance}-"))
+    with open(job_config_path, "r") as file:
+        num_jobs = len(json.load(file)["jobs"])
+    env = RJSPEnv(os.path.join("instances", "Machines", f"v0-{args.instance}.json"), job_config_path, [(3, 1)] * num_jobs, test_mode=True, info_mode="minimal", max_time=args.max_time, num_of_types=args.num_of_types)
+
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint = args.checkpoint
+        if checkpoint is None:
+            checkpoint = os.path.join(directory, "model.zip")
+            MaskablePPO("MultiInputPolicy", env, device="cpu").save(checkpoint)
+        model = MaskablePPO.load(checkpoint, device="cpu")
+        export_torchscript(checkpoint, os.path.join(directory, "policy.pt"))
+        runner = PolicyRunner(os.path.join(directory, "policy.pt"))
+
+    observations, masks = collect(env, model, args.episodes)
+    flat_observations = np.stack([runner.flatten(observation) for observation in observations])
+    batch_masks = np.stack(masks)
+    num_samples = len(observations)
+
+    # 같은 action을 고르는지 먼저 확인
+    expected = np.array([model.predict(observation, deterministic=True, action_masks=mask)[0] for observation, mask in zip(observations, masks)])
+    mismatches = int(np.sum(runner.predict(flat_observations, batch_masks) != expected))
+
+    results = {
+        "sb3 predict (single)": timed(lambda: [model.predict(observation, deterministic=True, action_masks=mask) for observation, mask in zip(observations, masks)], args.repeat),
+        "torchscript (single, dict)": timed(lambda: [runner.predict(observation, mask) for observation, mask in zip(observations, masks)], args.repeat),
+        "torchscript (single, flat)": timed(lambda: [runner.predict(observation, mask) for observation, mask in zip(flat_observations, batch_masks)], args.repeat),
+        "torchscript (batch)": timed(lambda: runner.predict(flat_observations, batch_masks), args.repeat),
+    }
+    baseline = results["sb3 predict (single)"]
+    print(f"{num_samples} decisions, action mismatches vs sb3 : {mismatches}")
+    for name, seconds in results.items():
+        print(f"{name:<28} {seconds / num_samples * 1e6:9.1f} us/decision  x{baseline / seconds:6.1f}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+# DummyVecEnv / ThreadVecEnv / SubprocVecEnv의 steps/s 비교
+# 모든 VecEnv에 같은 seed와 같은 random legal action을 줘서 reward 합이 같은지도 확인한다 (다르면 exit code 1)
+#   python benchmarks/vec_env.py --envs 8 --steps 200
+#   python benchmarks/vec_env.py --instance 12x8 --kernel-backend numpy --threads 4
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+
+from RJSPEnv.Env import RJSPEnv
+from RJSPEnv.VecEnv import ThreadVecEnv
+
+
+def make_env(instance, kernel_backend):
+    def _init():
+        job_config_path = next(os.path.join(REPO_ROOT, "instances", "Jobs", name) for name in sorted(os.listdir(os.path.join(REPO_ROOT, "instances", "Jobs"))) if name.startswith(f"v0-{instance}-"))
+        with open(job_config_path, "r") as file:
+            num_jobs = len(json.load(file)["jobs"])
+        # test_mode=False : reset마다 sample_job_repeats가 env.np_random으로 repeat을 뽑는다
+        return RJSPEnv(os.path.join(REPO_ROOT, "instances", "Machines", f"v0-{instance}.json"), job_config_path, [(3, 1)] * num_jobs, info_mode="minimal", max_time=600, num_of_types=12, kernel_backend=kernel_backend)
+    return _init
+
+
+def run(vec_env, steps, seed):
+    vec_env.seed(seed)
+    vec_env.reset()
+    rng = np.random.default_rng(seed)
+    total_reward = np.zeros(vec_env.num_envs)
+    start = time.perf_counter()
+    for _ in range(steps):
+        masks = np.stack(vec_env.env_method("action_masks"))
+        actions = np.array([rng.choice(np.flatnonzero(mask)) for mask in masks])
+        _, rewards, _, _ = vec_env.step(actions)
+        total_reward += rewards
+    elapsed = time.perf_counter() - start
+    vec_env.close()
+    return steps * vec_env.num_envs / elapsed, total_reward
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare in-process, thread-pool and subprocess vectorized RJSPEnv stepping")
+    parser.add_argument("--instance", default="12x8")
+    parser.add_argument("--envs", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--kernel-backend", default="numpy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-subproc", action="store_true")
+    args = parser.parse_args()
+
+    env_fns = [make_env(args.instance, args.kernel_backend) for _ in range(args.envs)]
+    factories = {
+        "DummyVecEnv": lambda: DummyVecEnv(env_fns),
+        "ThreadVecEnv": lambda: ThreadVecEnv(env_fns, args.threads),
+        "ThreadVecEnv (rerun)": lambda: ThreadVecEnv(env_fns, args.threads),
+    }
+    if not args.no_subproc:
+        factories["SubprocVecEnv"] = lambda: SubprocVecEnv(env_fns)
+
+    reference = None
+    mismatches = 0
+    for name, factory in factories.items():
+        steps_per_second, total_reward = run(factory(), args.steps, args.seed)
+        reference = total_reward if reference is None else reference
+        # DummyVecEnv 계열은 reward를 float32 buffer에 담고 SubprocVecEnv는 float64로 돌려주므로 float32 정밀도로 비교한다
+        same = np.allclose(total_reward, reference, rtol=1e-5, atol=1e-4)
+        mismatches += not same
+        print(f"{name:<22} {steps_per_second:9.1f} env steps/s  reward sum {total_reward.sum():10.3f}{'' if same else '  MISMATCH'}")
+    sys.exit(1 if mismatches else 0)
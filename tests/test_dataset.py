@@ -0,0 +1,25 @@
+import os
+import numpy as np
+
+from RJSPEnv.Dataset import BCDataset, generate_bc_dataset
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_episode_samples_keep_their_own_heatmap(tmp_path):
+    # 각 sample은 action을 두기 전의 observation이어야 한다 (step 0은 빈 schedule)
+    generate_bc_dataset(
+        str(tmp_path),
+        os.path.join(REPO_ROOT, "instances", "Machines", "v0-5x5.json"),
+        os.path.join(REPO_ROOT, "instances", "Jobs", "v0-5x5-5.json"),
+        [(3, 1)] * 5,
+        num_episodes=1,
+        rules=("edd", ),
+        num_workers=1,
+        env_kwargs={"test_mode": True},
+    )
+    dataset = BCDataset(str(tmp_path))
+    first, last = dataset[0]["observation"], dataset[len(dataset) - 1]["observation"]
+    assert len(dataset) > 1
+    assert not np.any(first["schedule_heatmap"] == 1)
+    assert np.any(last["schedule_heatmap"] == 1)
@@ -0,0 +1,121 @@
+import os
+import numpy as np
+import pytest
+
+from RJSPEnv.Env import RJSPEnv
+from RJSPEnv.LocalSearch import LocalSearch
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSTANCES = [
+    ("v0-5x5", "v0-5x5-5", [(3, 1)] * 5),
+    ("v0-12x8", "v0-12x8-12", [(8, 2)] * 12),
+]
+
+
+def _make_env(instance, **kwargs):
+    machines, jobs, job_repeats_params = instance
+    return RJSPEnv(os.path.join(REPO_ROOT, "instances", "Machines", f"{machines}.json"), os.path.join(REPO_ROOT, "instances", "Jobs", f"{jobs}.json"), job_repeats_params, test_mode=True, info_mode="minimal", **kwargs)
+
+
+def _random_episode(env, seed, callback=None):
+    # random legal action으로 episode를 끝까지 진행한다, step마다 callback(env, reward)
+    env.reset(seed=seed)
+    rng = np.random.default_rng(seed)
+    while True:
+        _, reward, terminated, truncated, _ = env.step(int(rng.choice(np.flatnonzero(env.action_masks()))))
+        if callback is not None:
+            callback(env, reward)
+        if terminated or truncated:
+            return
+
+
+def _recomputed_costs(scheduler):
+    # 누적값을 쓰지 않고 지금 schedule에서 cost를 처음부터 다시 계산한다
+    time_exceeded = sum(max(0, job.operation_queue[-1].finish - job.deadline) for job_list in scheduler.jobs for job in job_list if job.operation_queue[-1].finish is not None)
+    hole_time, up_time, makespan = 0, 0, 0
+    for machine in scheduler.machines:
+        if not machine.operation_schedule:
+            continue
+        working_time = sum(operation.duration for operation in machine.operation_schedule)
+        first_start = min(operation.start for operation in machine.operation_schedule)
+        last_finish = max(operation.finish for operation in machine.operation_schedule)
+        hole_time += last_finish - first_start - working_time
+        up_time += working_time
+        makespan = max(makespan, last_finish)
+    return (
+        time_exceeded / 100 * scheduler.cost_deadline_per_time,
+        hole_time * scheduler.cost_hole_per_time / 100,
+        up_time * scheduler.cost_processing_per_time / 100,
+        makespan * scheduler.cost_makespan_per_time / 100,
+    )
+
+
+def _incremental_costs(scheduler):
+    return (scheduler.cost_deadline, scheduler.cost_hole, scheduler.cost_processing, scheduler.cost_makespan)
+
+
+@pytest.mark.parametrize("instance", INSTANCES)
+def test_incremental_costs_match_full_recompute(instance):
+    def check(env, reward):
+        scheduler = env.custom_scheduler
+        assert _incremental_costs(scheduler) == pytest.approx(_recomputed_costs(scheduler))
+
+    env = _make_env(instance)
+    for seed in range(3):
+        _random_episode(env, seed, check)
+
+
+@pytest.mark.parametrize("instance", INSTANCES)
+def test_dense_rewards_sum_to_terminal_reward(instance):
+    # dense reward의 합 (종료 시 +100 포함)은 terminal reward와 같아야 한다
+    rewards = []
+    env = _make_env(instance, reward_mode="dense")
+    for seed in range(3):
+        rewards.clear()
+        _random_episode(env, seed, lambda env, reward: rewards.append(reward))
+        assert sum(rewards) == pytest.approx(env.custom_scheduler.calculate_final_reward())
+
+
+@pytest.mark.parametrize("instance", INSTANCES)
+def test_incremental_legal_actions_match_rebuild(instance):
+    def check(env, reward):
+        scheduler = env.custom_scheduler
+        expected = np.zeros_like(scheduler.legal_actions)
+        for job_index, (repeat_index, operation_index) in enumerate(scheduler.schedule_buffer):
+            if repeat_index == -1:
+                continue
+            operation = scheduler.jobs[job_index][0].operation_queue[operation_index]
+            expected[:, job_index] = [machine.can_process_operation(operation.type) for machine in scheduler.machines]
+        np.testing.assert_array_equal(scheduler.legal_actions, expected)
+        np.testing.assert_array_equal(scheduler.action_masks(), expected.flatten())
+        np.testing.assert_array_equal(scheduler.legal_count_per_job, expected.sum(axis=0))
+        np.testing.assert_array_equal(scheduler.legal_count_per_machine, expected.sum(axis=1))
+
+    env = _make_env(instance)
+    for seed in range(3):
+        _random_episode(env, seed, check)
+
+
+@pytest.mark.parametrize("instance", INSTANCES)
+def test_lower_bound_never_exceeds_final_cost(instance):
+    bounds = []
+    env = _make_env(instance)
+    for seed in range(3):
+        bounds.clear()
+        _random_episode(env, seed, lambda env, reward: bounds.append(env.custom_scheduler.cal_lower_bound_cost()))
+        final_cost = env.custom_scheduler.cal_final_cost()
+        assert max(bounds) <= final_cost + 1e-9
+
+
+@pytest.mark.parametrize("instance", INSTANCES)
+def test_local_search_apply_matches_recompute(instance):
+    env = _make_env(instance)
+    _random_episode(env, 0)
+    scheduler = env.custom_scheduler
+    search = LocalSearch(scheduler)
+    result = search.run(time_budget=10.0, seed=0, max_moves=300)
+    cost = search.apply(scheduler)
+    recomputed = _recomputed_costs(scheduler)
+    assert _incremental_costs(scheduler) == pytest.approx(recomputed)
+    assert cost == pytest.approx(sum(recomputed)) == pytest.approx(result["cost"])
+    assert cost <= result["initial_cost"]
@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pytest
+
+from RJSPEnv.Env import RJSPEnv
+from RJSPEnv.Heuristics import dispatch
+from RJSPEnv.Trajectory import TrajectoryReader, TrajectoryRecorder
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MACHINES = os.path.join(REPO_ROOT, "instances", "Machines", "v0-12x8.json")
+JOBS = os.path.join(REPO_ROOT, "instances", "Jobs", "v0-12x8-12.json")
+
+
+def _streaming_run(streaming_horizon_lag, num_steps=1000, kernel_backend="python"):
+    # 4 step마다 repeat을 하나씩 추가하면서 estimated tardiness 순 dispatching rule로 배치한다 (heap 순서에 민감하다)
+    # step마다 (schedule_buffer, 배치된 operation)을 모은다
+    env = RJSPEnv(MACHINES, JOBS, [(2, 0)] * 12, test_mode=True, info_mode="minimal", streaming=True, streaming_horizon_lag=streaming_horizon_lag, kernel_backend=kernel_backend)
+    env.reset(seed=0)
+    scheduler = env.custom_scheduler
+    rng = np.random.default_rng(0)
+    trace = []
+    for step in range(num_steps):
+        if step % 4 == 0:
+            freeze_time = scheduler.get_freeze_time()
+            env.inject_repeat(int(rng.integers(12)), freeze_time + 5000, release_time=freeze_time)
+        if env._is_done():
+            continue
+        machine, job = dispatch(scheduler, "tardiness", env.np_random)
+        env.step(machine * env.len_jobs + job)
+        operation = scheduler.current_schedule[-1]
+        trace.append(([list(elem) for elem in scheduler.schedule_buffer], (operation.machine, int(operation.job), operation.job_index, operation.index, operation.start, operation.finish)))
+    return trace
+
+
+@pytest.mark.parametrize("streaming_horizon_lag", [0, 5])
+@pytest.mark.parametrize("kernel_backend", ["python", "numpy"])
+def test_compaction_does_not_change_the_schedule(streaming_horizon_lag, kernel_backend):
+    # horizon을 freeze time (- lag)까지 옮겨도 compaction 하지 않은 run과 같은 schedule이 나와야 한다
+    reference = _streaming_run(None, kernel_backend=kernel_backend)
+    compacted = _streaming_run(streaming_horizon_lag, kernel_backend=kernel_backend)
+    assert len(reference) == len(compacted)
+    for step, (expected, actual) in enumerate(zip(reference, compacted)):
+        assert expected == actual, f"diverged at step {step}"
+
+
+def test_trajectory_replays_streaming_episode(tmp_path):
+    # inject_repeat / advance_horizon event를 같이 기록해야 streaming episode를 다시 만들 수 있다
+    path = str(tmp_path / "streaming.trj")
+    env = TrajectoryRecorder(RJSPEnv(MACHINES, JOBS, [(2, 0)] * 12, test_mode=True, info_mode="minimal", streaming=True, streaming_horizon_lag=0), path, chunk_size=64)
+    env.reset(seed=0)
+    scheduler = env.unwrapped.custom_scheduler
+    rng = np.random.default_rng(0)
+    for step in range(300):
+        if step % 4 == 0:
+            freeze_time = scheduler.get_freeze_time()
+            env.inject_repeat(int(rng.integers(12)), freeze_time + 5000, release_time=freeze_time)
+        if env.unwrapped._is_done():
+            continue
+        machine, job = dispatch(scheduler, "tardiness", env.unwrapped.np_random)
+        env.step(machine * env.unwrapped.len_jobs + job)
+    env.close()
+
+    replayed = TrajectoryReader(path).replay(0)
+    schedule = lambda scheduler: sorted((operation.machine, int(operation.job), operation.job_index, operation.index, operation.start, operation.finish) for operation in scheduler.current_schedule)
+    assert replayed.horizon == scheduler.horizon > 0
+    assert schedule(replayed) == schedule(scheduler)